@@ -0,0 +1,95 @@
+# === AnswerStream.py ===
+# Turns a stream of LLM text deltas into incremental GUI updates and
+# sentence-sized speech, so the user hears the first sentence while the
+# rest of the answer is still being generated.
+
+# === Imports ===
+import re
+import queue
+import threading
+
+# Sentence end: terminal punctuation (optionally closed by a quote/bracket) followed by whitespace
+_SENTENCE_END = re.compile(r"""[.!?]+["')\]]*\s+|\n+""")
+_ABBREVIATIONS = {"mr.", "mrs.", "ms.", "dr.", "prof.", "sr.", "jr.", "st.", "vs.", "etc.", "e.g.", "i.e.", "no."}
+MIN_SENTENCE_CHARS = 12  # Shorter fragments are merged into the next sentence
+
+
+# === Sentence Splitting ===
+def _is_abbreviation(text, end):
+    words = text[:end].rstrip().split()
+    return bool(words) and words[-1].lower() in _ABBREVIATIONS
+
+
+def SplitSentences(deltas):
+    """Yield complete sentences from an iterable of text deltas as soon as each one ends."""
+    buffer = ""
+    for delta in deltas:
+        buffer += delta
+        start = 0
+        for match in _SENTENCE_END.finditer(buffer):
+            end = match.end()
+            sentence = buffer[start:end].strip()
+            if not sentence or _is_abbreviation(buffer, match.start() + 1):
+                continue
+            if len(sentence) < MIN_SENTENCE_CHARS and "\n" not in match.group():
+                continue
+            yield sentence
+            start = end
+        buffer = buffer[start:]
+
+    if buffer.strip():
+        yield buffer.strip()
+
+
+class _Tee:
+    """Iterate deltas once while recording them and reporting the running text."""
+
+    def __init__(self, deltas, on_partial=None):
+        self.deltas = deltas
+        self.on_partial = on_partial
+        self.text = ""
+
+    def __iter__(self):
+        for delta in self.deltas:
+            if not delta:
+                continue
+            self.text += delta
+            if self.on_partial:
+                self.on_partial(self.text)
+            yield delta
+
+
+# === Streaming Answer Pipeline ===
+def SpeakAnswerStream(deltas, on_partial=None, speak=None):
+    """
+    Consume LLM deltas: report the growing text through on_partial, and hand
+    each finished sentence to speak() on a separate thread so playback overlaps
+    generation. Returns the full text once generation and speech are done.
+    """
+    tee = _Tee(deltas, on_partial)
+    if speak is None:
+        for _ in tee:
+            pass
+        return tee.text
+
+    sentences = queue.Queue()
+
+    def speaker():
+        while True:
+            sentence = sentences.get()
+            if sentence is None:
+                return
+            try:
+                speak(sentence)
+            except Exception as e:
+                print(f"[AnswerStream] Speech failed: {e}")
+
+    worker = threading.Thread(target=speaker, name="AnswerSpeaker", daemon=True)
+    worker.start()
+    try:
+        for sentence in SplitSentences(tee):
+            sentences.put(sentence)
+    finally:
+        sentences.put(None)
+        worker.join()
+    return tee.text
@@ -0,0 +1,202 @@
+# === AudioCapture.py ===
+# One microphone capture thread for the whole assistant. PCM is written into
+# a ring buffer by a single writer; every listener attaches a reader with its
+# own cursor, so the wake word listener, password prompts and confirmations
+# share one open device and one continuously updated noise-floor estimate
+# (Backend/VoiceActivity.py). Each reader gets its own voice-activity
+# detector, so its counters describe only that listener's audio.
+
+# === Imports ===
+import time
+import threading
+import speech_recognition as sr
+from dotenv import dotenv_values
+from Backend.VoiceActivity import FrameEnergy, NoiseFloorTracker, VoiceActivityDetector
+
+# === Load Environment Variables ===
+env_vars = dotenv_values(".env")
+CaptureBufferSeconds = float(env_vars.get("CaptureBufferSeconds", 30))  # Audio kept for late or slow readers
+CapturePrerollSeconds = float(env_vars.get("CapturePrerollSeconds", 0.5))  # History a new reader starts with
+CaptureRetrySeconds = float(env_vars.get("CaptureRetrySeconds", 2))  # Wait before reopening a failed device
+
+
+class CaptureClosed(OSError):
+    """Raised by a reader that was closed (or whose device failed) while waiting for audio."""
+
+
+# === Ring Buffer ===
+class RingBuffer:
+    """
+    Single-writer byte ring. The writer copies data in and then advances
+    `written`; readers copy out without taking a lock and detect overruns
+    from the absolute positions. The condition is only used to wake readers.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._data = bytearray(capacity)
+        self.written = 0  # Absolute number of bytes ever written
+        self._wake = threading.Condition()
+
+    def write(self, chunk: bytes):
+        start = self.written % self.capacity
+        first = min(len(chunk), self.capacity - start)
+        self._data[start:start + first] = chunk[:first]
+        self._data[:len(chunk) - first] = chunk[first:]
+        self.written += len(chunk)  # Publish only after the bytes are in place
+        with self._wake:
+            self._wake.notify_all()
+
+    def read_at(self, position: int, size: int) -> bytes:
+        start = position % self.capacity
+        first = min(size, self.capacity - start)
+        return bytes(self._data[start:start + first]) + bytes(self._data[:size - first])
+
+    def wait(self, position: int, timeout=None):
+        with self._wake:
+            return self._wake.wait_for(lambda: self.written >= position, timeout)
+
+
+# === Capture Thread ===
+class AudioCapture:
+    """
+    Owns the microphone. Started on first use and kept open for the life of
+    the process; start() reopens the device if it failed or was stopped.
+    """
+
+    def __init__(self, device_index=None, buffer_seconds=None):
+        self.device_index = device_index
+        self.buffer_seconds = buffer_seconds or CaptureBufferSeconds
+        self.SAMPLE_RATE = None
+        self.SAMPLE_WIDTH = None
+        self.CHUNK = None
+        self.ring = None
+        self.noise = NoiseFloorTracker()
+        self.error = None
+        self.reopens = 0
+        self._failed_at = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._running = False
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                if self.error and time.monotonic() - self._failed_at < CaptureRetrySeconds:
+                    raise CaptureClosed(f"microphone unavailable: {self.error}")
+                if self._thread is not None:
+                    self.reopens += 1
+                    print(f"[AudioCapture] Reopening microphone (attempt {self.reopens})")
+                self.error = None
+                self._ready.clear()
+                self._running = True
+                self._thread = threading.Thread(target=self._run, name="AudioCapture", daemon=True)
+                self._thread.start()
+        self._ready.wait()
+        if self.error:
+            raise CaptureClosed(f"microphone unavailable: {self.error}")
+        return self
+
+    def stop(self):
+        self._running = False
+        if self.ring:
+            with self.ring._wake:
+                self.ring._wake.notify_all()
+
+    def _run(self):
+        try:
+            microphone = sr.Microphone(device_index=self.device_index)
+            with microphone as source:
+                self.SAMPLE_RATE = source.SAMPLE_RATE
+                self.SAMPLE_WIDTH = source.SAMPLE_WIDTH
+                self.CHUNK = source.CHUNK
+                capacity = int(self.buffer_seconds * self.SAMPLE_RATE) * self.SAMPLE_WIDTH
+                capacity -= capacity % (self.CHUNK * self.SAMPLE_WIDTH)
+                if self.ring is None or self.ring.capacity != capacity:
+                    self.ring = RingBuffer(capacity)  # Same format on reopen keeps the ring and its readers
+                self._ready.set()
+                while self._running:
+                    chunk = source.stream.read(source.CHUNK)
+                    self.noise.add(FrameEnergy(chunk), self.CHUNK / self.SAMPLE_RATE)
+                    self.ring.write(chunk)
+        except Exception as e:
+            self.error = e
+            self._failed_at = time.monotonic()
+            print(f"[AudioCapture] Capture stopped: {e}")
+        finally:
+            self._running = False
+            self._ready.set()
+            self.stop()
+
+    @property
+    def running(self):
+        return self._running
+
+    @property
+    def noise_floor(self):
+        return self.noise.floor
+
+    def energy_threshold(self) -> float:
+        """Energy above which a chunk is treated as speech."""
+        return self.noise.threshold()
+
+    def reader(self, preroll=None):
+        """Attach a new reader starting `preroll` seconds in the past."""
+        self.start()
+        return CaptureReader(self, CapturePrerollSeconds if preroll is None else preroll)
+
+
+# === Readers ===
+class CaptureReader:
+    """An independent cursor into the shared capture ring, with its own voice-activity detector."""
+
+    def __init__(self, capture, preroll=0.0):
+        self.capture = capture
+        self.ring = ring = capture.ring
+        self.vad = VoiceActivityDetector(capture.noise)
+        back = int(preroll * capture.SAMPLE_RATE) * capture.SAMPLE_WIDTH
+        back -= back % capture.SAMPLE_WIDTH
+        self.position = max(0, ring.written - min(back, ring.capacity // 2))
+        self.overruns = 0
+        self.closed = False
+
+    def read(self, size: int) -> bytes:
+        """Block until size bytes past the cursor exist, then return them."""
+        ring = self.ring
+        while not ring.wait(self.position + size, timeout=0.1):
+            if self.closed or not self.capture.running or self.capture.ring is not ring:
+                raise CaptureClosed("capture reader closed")
+        if self.closed:
+            raise CaptureClosed("capture reader closed")
+        in_flight = self.capture.CHUNK * self.capture.SAMPLE_WIDTH  # Region the writer may be filling
+        while True:
+            oldest = ring.written - ring.capacity + in_flight
+            if self.position < oldest:
+                # Reader fell a whole buffer behind; skip to the oldest audio still held
+                self.overruns += 1
+                self.position = oldest
+            data = ring.read_at(self.position, size)
+            if self.position >= ring.written - ring.capacity + in_flight:
+                break  # Not overwritten while copying
+        self.position += size
+        return data
+
+    def skip_to_live(self):
+        self.position = self.ring.written
+
+    def close(self):
+        self.closed = True
+
+
+_capture = None
+_capture_lock = threading.Lock()
+
+
+def GetAudioCapture():
+    """Return the shared capture instance (the device is opened on first reader)."""
+    global _capture
+    with _capture_lock:
+        if _capture is None:
+            _capture = AudioCapture()
+    return _capture
@@ -52,6 +52,7 @@ def Content(Topic):
         subprocess.Popen([default_text_editor, File])
     
     def ContentWriterAI(prompt):
+        """Yield the content as it is generated."""
         messages.append({"role": "user", "content": f"{prompt}"})
 
         completion = client.chat.completions.create(
@@ -66,18 +67,20 @@ def Content(Topic):
 
         Answer = ""
         for chunk in completion:
-            if chunk.choices[0].delta.content:
-                Answer += chunk.choices[0].delta.content
+            delta = chunk.choices[0].delta.content
+            if delta:
+                delta = delta.replace("</s>", "")
+                Answer += delta
+                yield delta
         
-        Answer = Answer.replace("</s>", "")
         messages.append({"role": "assistant", "content": Answer})
-        return Answer
     
     Topic = Topic.replace("Content ", "")
-    ContentByAI = ContentWriterAI(Topic)
 
+    # Write the content to disk as it streams in
     with open(rf"Data\{Topic.lower().replace(' ','')}.txt", "w", encoding="utf-8") as file:
-        file.write(ContentByAI)
+        for delta in ContentWriterAI(Topic):
+            file.write(delta)
     
     OpenNotepad(rf"Data\{Topic.lower().replace(' ','')}.txt")
     return True
@@ -0,0 +1,179 @@
+# === BargeIn.py ===
+# Watches the shared microphone capture while the assistant is answering and
+# cancels the turn as soon as the user talks over it. Cancelling the turn's
+# token stops speech output, closes the LLM stream and abandons intent
+# classification (Backend/Cancellation.py).
+#
+# There is no echo cancellation, so the assistant's own voice reaches the
+# microphone. "wake" mode only reacts to the wake word and is immune to that;
+# without wake word templates it is off. "speech" mode reacts to any loud
+# speech, which includes the assistant's own voice, so it only runs when
+# BargeInEchoSuppression says the audio path removes it (headset, OS or
+# hardware echo cancellation).
+
+# === Imports ===
+import time
+import threading
+from dotenv import dotenv_values
+
+# === Load Environment Variables ===
+env_vars = dotenv_values(".env")
+BargeIn = env_vars.get("BargeIn", "wake").lower()                           # "wake", "speech" or "off"
+BargeInEnergyRatio = float(env_vars.get("BargeInEnergyRatio", 3.0))         # Over the VAD threshold, to ride over echo
+BargeInOnsetMs = int(env_vars.get("BargeInOnsetMs", 150))                   # Loud audio needed to interrupt
+BargeInEchoSuppression = env_vars.get("BargeInEchoSuppression", "False") == "True"  # Speaker output never reaches the mic
+
+
+class BargeInMonitor:
+    """
+    Use as a context manager around the stages the user may talk over:
+
+        with BargeInMonitor(token):
+            ...classify, answer, speak...
+
+    The monitor stops when the block exits or the token is cancelled for any
+    other reason. Nested monitors for a token that is already watched do nothing.
+    """
+
+    def __init__(self, token, mode=None):
+        self.token = token
+        self.mode = EffectiveMode(mode or BargeIn)
+        self._owner = False
+        self._stopped = threading.Event()
+        self._reader = None
+        self._thread = None
+        self.triggered = False
+        self.abort_ms = None  # Time taken by the cancellation callbacks
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def start(self):
+        if self.mode == "off" or self.token.cancelled or not _claim(self.token):
+            return self
+        self._owner = True
+        self._thread = threading.Thread(target=self._run, name="BargeIn", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._reader:
+            self._reader.close()
+        if self._owner:
+            self._owner = False
+            _release(self.token)
+
+    def active(self):
+        return not self._stopped.is_set() and self.token.is_active()
+
+    def _run(self):
+        from Backend.AudioCapture import CaptureClosed, GetAudioCapture
+        try:
+            capture = GetAudioCapture().start()
+            if self.mode == "wake":
+                self._watch_wake_word(capture)
+            else:
+                self._watch_speech(capture)
+        except CaptureClosed:
+            return  # No microphone; nothing to watch
+        except Exception as e:
+            print(f"[BargeIn] Monitor stopped: {e}")
+
+    def _watch_wake_word(self, capture):
+        from Backend.WakeWordSpotter import WaitForWakeWord
+        if WaitForWakeWord(_spotter(), capture, self.active):
+            self._trip("wake word")
+
+    def _watch_speech(self, capture):
+        from Backend.AudioCapture import CaptureClosed
+        from Backend.VoiceActivity import FrameEnergy
+
+        self._reader = reader = capture.reader(preroll=0)
+        if self._stopped.is_set():
+            reader.close()  # stop() ran before the reader existed
+        frame_bytes = capture.CHUNK * capture.SAMPLE_WIDTH
+        onset_frames = max(1, round(BargeInOnsetMs / 1000 * capture.SAMPLE_RATE / capture.CHUNK))
+        loud = 0
+        try:
+            while self.active():
+                frame = reader.read(frame_bytes)
+                if FrameEnergy(frame) >= capture.energy_threshold() * BargeInEnergyRatio:
+                    loud += 1
+                    if loud >= onset_frames:
+                        self._trip("speech")
+                        return
+                else:
+                    loud = 0
+        except CaptureClosed:
+            return
+        finally:
+            reader.close()
+
+    def _trip(self, what):
+        if not self.active():
+            return
+        started = time.monotonic()
+        if self.token.cancel("barge-in"):
+            self.triggered = True
+            self.abort_ms = (time.monotonic() - started) * 1000
+            print(f"[BargeIn] User spoke over the answer ({what}); turn cancelled in {self.abort_ms:.0f} ms")
+
+
+# === Mode and Ownership ===
+_modes = {}
+_watched = set()  # ids of tokens with a running monitor
+_state_lock = threading.Lock()
+
+
+def EffectiveMode(mode):
+    """The mode that can actually run: wake needs templates, speech needs echo suppression."""
+    mode = mode.lower()
+    with _state_lock:
+        if mode in _modes:
+            return _modes[mode]
+    effective = mode
+    if mode == "wake" and _spotter() is None:
+        print("[BargeIn] Off: no wake word templates (python -m Backend.WakeWordSpotter --enroll)")
+        effective = "off"
+    elif mode == "speech" and not BargeInEchoSuppression:
+        print("[BargeIn] Off: speech mode needs BargeInEchoSuppression=True, or the assistant's voice would cancel its own answers")
+        effective = "off"
+    elif mode not in ("wake", "speech", "off"):
+        print(f"[BargeIn] Off: unknown mode '{mode}'")
+        effective = "off"
+    with _state_lock:
+        _modes[mode] = effective
+    return effective
+
+
+def _claim(token):
+    with _state_lock:
+        if id(token) in _watched:
+            return False
+        _watched.add(id(token))
+        return True
+
+
+def _release(token):
+    with _state_lock:
+        _watched.discard(id(token))
+
+
+_loaded_spotter = None
+_spotter_lock = threading.Lock()
+
+
+def _spotter():
+    """Wake word templates are loaded once and shared by every monitor."""
+    global _loaded_spotter
+    from Backend.WakeWordSpotter import LoadWakeWordSpotter
+    with _spotter_lock:
+        if _loaded_spotter is None:
+            _loaded_spotter = LoadWakeWordSpotter() or False
+    return _loaded_spotter or None
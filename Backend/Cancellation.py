@@ -0,0 +1,97 @@
+# === Cancellation.py ===
+# Cancellation token shared by every stage of one voice turn (speech
+# recognition, intent classification, LLM streaming and speech output).
+# Tripping it runs the registered callbacks right away, so blocked network
+# reads and audio playback are torn down instead of waiting for a poll.
+
+# === Imports ===
+import threading
+
+
+class TurnCancelled(Exception):
+    """Raised by code that cannot return a partial result once its turn is cancelled."""
+
+
+class CancellationToken:
+    """One-shot flag with callbacks. Safe to trip from any thread, any number of times."""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self.reason = None
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def is_active(self):
+        """False once cancelled; usable directly as an interrupt_check callback."""
+        return not self._event.is_set()
+
+    def cancel(self, reason="cancelled"):
+        with self._lock:
+            if self._event.is_set():
+                return False
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"[Cancellation] Callback error: {e}")
+        return True
+
+    def on_cancel(self, callback):
+        """Run callback when the token trips (immediately if it already has). Returns an unregister function."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._remove(callback)
+        callback()
+        return lambda: None
+
+    def _remove(self, callback):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise TurnCancelled(self.reason)
+
+    def wait(self, timeout=None):
+        return self._event.wait(timeout)
+
+
+class _NeverCancelled(CancellationToken):
+    def cancel(self, reason="cancelled"):
+        return False
+
+
+# A token that never trips, for callers that don't take part in cancellation
+NEVER = _NeverCancelled()
+
+
+# === Current Turn ===
+_turn = NEVER
+_turn_lock = threading.Lock()
+
+
+def BeginTurn(token=None):
+    """Start a new turn (with token, or a fresh one) and return its token."""
+    global _turn
+    with _turn_lock:
+        _turn = token or CancellationToken()
+        return _turn
+
+
+def CurrentTurn():
+    with _turn_lock:
+        return _turn
+
+
+def CancelTurn(reason="cancelled"):
+    """Trip the token of the turn in progress, if any."""
+    return CurrentTurn().cancel(reason)
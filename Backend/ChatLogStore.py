@@ -0,0 +1,321 @@
+# === ChatLogStore.py ===
+# Append-only JSONL chat log shared by ChatBot and RealtimeSearchEngine.
+# One JSON object per line, a sidecar offset index for tail reads,
+# and a lock file so threads and processes never interleave writes.
+
+# === Imports ===
+import os
+import json
+import struct
+import threading
+
+try:
+    import fcntl  # POSIX
+except ImportError:
+    fcntl = None
+try:
+    import msvcrt  # Windows
+except ImportError:
+    msvcrt = None
+
+DEFAULT_CHATLOG_PATH = os.path.join("Data", "ChatLog.json")
+_OFFSET = struct.Struct("<Q")
+
+
+# === Helpers ===
+def _fsync_dir(path):
+    """Flush a directory entry after rename (no-op where unsupported)."""
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    except OSError:
+        pass
+
+
+def atomic_write(path, data: bytes):
+    """Write bytes to a temp file, fsync it and rename it over path."""
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    _fsync_dir(path)
+
+
+def _encode(messages):
+    return b"".join(
+        (json.dumps(m, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        for m in messages
+    )
+
+
+class _FileLock:
+    """Exclusive advisory lock on a sidecar file, held across processes."""
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+
+    def acquire(self):
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        elif msvcrt:
+            os.lseek(self._fd, 0, os.SEEK_SET)
+            msvcrt.locking(self._fd, msvcrt.LK_LOCK, 1)
+
+    def release(self):
+        if self._fd is None:
+            return
+        try:
+            if fcntl:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            elif msvcrt:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+
+# === Store ===
+class ChatLogStore:
+    """Append-only chat log. Per-message write cost is independent of history length."""
+
+    def __init__(self, path):
+        self.path = path
+        self.index_path = path + ".idx"
+        self._thread_lock = threading.RLock()
+        self._file_lock = _FileLock(path + ".lock")
+        self._depth = 0
+        self._offsets = []   # Byte offset of the start of every complete line
+        self._end = 0        # Byte offset just past the last complete line
+        self._identity = None
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._locked():
+            if not os.path.exists(path):
+                atomic_write(path, b"")
+            self._load_index()
+
+    # --- Locking ---
+    def _locked(self):
+        store = self
+
+        class _Guard:
+            def __enter__(self):
+                store._thread_lock.acquire()
+                if store._depth == 0:
+                    store._file_lock.acquire()
+                store._depth += 1
+
+            def __exit__(self, *exc):
+                store._depth -= 1
+                if store._depth == 0:
+                    store._file_lock.release()
+                store._thread_lock.release()
+
+        return _Guard()
+
+    # --- Index maintenance ---
+    def _stat_identity(self):
+        st = os.stat(self.path)
+        return (st.st_ino, st.st_dev), st.st_size
+
+    def _load_index(self):
+        """Load the sidecar index, falling back to a full scan if it does not match the log."""
+        identity, size = self._stat_identity()
+        offsets = []
+        try:
+            with open(self.index_path, "rb") as f:
+                raw = f.read()
+            offsets = [o for (o,) in _OFFSET.iter_unpack(raw[: len(raw) - len(raw) % _OFFSET.size])]
+        except FileNotFoundError:
+            pass
+
+        if offsets and (offsets[-1] >= size or any(b <= a for a, b in zip(offsets, offsets[1:]))):
+            offsets = []
+        if offsets and offsets[-1] > 0:
+            with open(self.path, "rb") as f:
+                f.seek(offsets[-1] - 1)
+                if f.read(1) != b"\n":
+                    offsets = []
+
+        # Re-scan from the last indexed line so its length and any unindexed lines are picked up
+        self._offsets = offsets[:-1] if offsets else []
+        self._end = offsets[-1] if offsets else 0
+        self._identity = identity
+        added = self._scan_from(self._end)
+        if added or len(offsets) != len(self._offsets):
+            self._write_index()
+
+    def _scan_from(self, start):
+        """Index complete lines from start to EOF. Returns how many lines were added."""
+        added = 0
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            position = start
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # Partial line from an interrupted writer
+                self._offsets.append(position)
+                position += len(line)
+                added += 1
+        self._end = position
+        return added
+
+    def _write_index(self):
+        atomic_write(self.index_path, b"".join(_OFFSET.pack(o) for o in self._offsets))
+
+    def _refresh(self):
+        """Pick up lines appended, or a rewrite done, by another process."""
+        identity, size = self._stat_identity()
+        if identity != self._identity or size < self._end:
+            self._rebuild()
+        elif size > self._end:
+            self._scan_from(self._end)  # The writing process maintains the sidecar index
+
+    def _rebuild(self):
+        self._offsets, self._end = [], 0
+        self._identity = self._stat_identity()[0]
+        self._scan_from(0)
+        self._write_index()
+
+    # --- Public API ---
+    def append(self, message: dict):
+        """Append one message."""
+        self.extend([message])
+
+    def extend(self, messages):
+        """Append several messages with a single write and fsync."""
+        data = _encode(messages)
+        if not data:
+            return
+        with self._locked():
+            self._refresh()
+            with open(self.path, "r+b") as f:
+                f.truncate(self._end)  # Drop a torn line left by a crashed writer
+                f.seek(self._end)
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+
+            new_offsets = []
+            position = self._end
+            for line in data.splitlines(keepends=True):
+                new_offsets.append(position)
+                position += len(line)
+            self._offsets.extend(new_offsets)
+            self._end = position
+            with open(self.index_path, "ab") as f:
+                f.write(b"".join(_OFFSET.pack(o) for o in new_offsets))
+
+    def tail(self, n: int):
+        """Return the last n messages, reading only their bytes."""
+        with self._locked():
+            self._refresh()
+            try:
+                return self._read_tail(n)
+            except ValueError:
+                self._rebuild()  # Index pointed mid-line; trust the log, not the index
+                return self._read_tail(n)
+
+    def _read_tail(self, n):
+        if n <= 0 or not self._offsets:
+            return []
+        start = self._offsets[max(0, len(self._offsets) - n)]
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            data = f.read(self._end - start)
+        return [json.loads(line) for line in data.decode("utf-8").splitlines() if line.strip()]
+
+    def read_range(self, start: int, stop: int):
+        """Return messages[start:stop] without reading anything outside that range."""
+        with self._locked():
+            self._refresh()
+            stop = min(stop, len(self._offsets))
+            if start >= stop:
+                return []
+            begin = self._offsets[start]
+            end = self._offsets[stop] if stop < len(self._offsets) else self._end
+            with open(self.path, "rb") as f:
+                f.seek(begin)
+                data = f.read(end - begin)
+        return [json.loads(line) for line in data.decode("utf-8").splitlines() if line.strip()]
+
+    def read_all(self):
+        """Return every message in order."""
+        return self.tail(len(self))
+
+    def __len__(self):
+        with self._locked():
+            self._refresh()
+            return len(self._offsets)
+
+    def replace(self, messages):
+        """Atomically replace the whole log."""
+        data = _encode(messages)
+        with self._locked():
+            atomic_write(self.path, data)
+            self._rebuild()
+
+    def clear(self):
+        self.replace([])
+
+
+# === Migration From JSON Array Logs ===
+def jsonl_path_for(path):
+    """Map a legacy ChatLog*.json path to its JSONL counterpart."""
+    root, ext = os.path.splitext(path)
+    return path if ext == ".jsonl" else root + ".jsonl"
+
+
+def migrate_json_log(json_path, jsonl_path=None):
+    """
+    One-time conversion of a JSON array chat log to JSONL.
+    The original file is kept as <name>.json.bak. Returns True if a migration ran.
+    """
+    jsonl_path = jsonl_path or jsonl_path_for(json_path)
+    if os.path.exists(jsonl_path) or not os.path.exists(json_path):
+        return False
+
+    lock = _FileLock(jsonl_path + ".lock")
+    lock.acquire()
+    try:
+        if os.path.exists(jsonl_path) or not os.path.exists(json_path):
+            return False  # Another process migrated while we waited
+        try:
+            with open(json_path, "r", encoding="utf-8") as f:
+                messages = json.load(f)
+            if not isinstance(messages, list):
+                raise ValueError("expected a JSON array")
+        except (ValueError, OSError) as e:
+            print(f"[ChatLog] Could not migrate {json_path}: {e}")
+            messages = []
+
+        atomic_write(jsonl_path, _encode(messages))
+        os.replace(json_path, json_path + ".bak")
+        return True
+    finally:
+        lock.release()
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def open_chat_log(path=None):
+    """Return the shared store for a chat log path, migrating a legacy JSON log first."""
+    jsonl_path = jsonl_path_for(path or DEFAULT_CHATLOG_PATH)
+    key = os.path.abspath(jsonl_path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            migrate_json_log(os.path.splitext(jsonl_path)[0] + ".json", jsonl_path)
+            store = _stores[key] = ChatLogStore(jsonl_path)
+    return store
@@ -1,6 +1,8 @@
 # === Import Required Libraries ===
 from groq import Groq                     # Groq API client for LLM-based responses
-from json import load, dump              # JSON handling for chat logs
+from Backend.ChatLogStore import open_chat_log  # Append-only JSONL chat log
+from Backend.ContextWindow import GetContextManager  # Token-budgeted history window
+from Backend.Cancellation import NEVER   # Turn-wide cancellation (barge-in)
 import datetime                          # For real-time date and time
 from dotenv import dotenv_values         # Load environment variables from .env
 
@@ -13,9 +15,6 @@ GroqAPIKey = env_vars.get("GroqAPIKey")
 # === Initialize Groq Client ===
 client = Groq(api_key=GroqAPIKey)
 
-# === Global Chat Context ===
-messages = []
-
 # === System Prompt for the Assistant ===
 System = f"""Hello, I am {Username}, You are a very accurate and advanced AI chatbot named {Assistantname} which also has real-time up-to-date information from the internet.
 *** Do not tell time until I ask, do not talk too much, just answer the question.***
@@ -26,14 +25,6 @@ System = f"""Hello, I am {Username}, You are a very accurate and advanced AI cha
 # === Groq Prompt Structure ===
 SystemChatBot = [{"role": "system", "content": System}]
 
-# === Load Chat History (if exists) ===
-try:
-    with open(r"Data\ChatLog.json", "r") as f:
-        messages = load(f)
-except FileNotFoundError:
-    with open(r"Data\ChatLog.json", "w") as f:
-        dump([], f)
-
 # === Real-Time Info Helper ===
 def RealtimeInformation():
     current_date_time = datetime.datetime.now()
@@ -57,16 +48,38 @@ def AnswerModifier(Answer):
     modified_answer = '\n'.join(non_empty_lines)
     return modified_answer
 
+# === Rolling Summary for Old Turns ===
+def SummarizeTurns(previous_summary, turns):
+    """Fold older turns into the running summary (called from the background summarizer)."""
+    transcript = "\n".join(f"{t['role']}: {t['content']}" for t in turns)
+    completion = client.chat.completions.create(
+        model="llama3-70b-8192",
+        messages=[
+            {"role": "system", "content": "Update the conversation summary with the new turns. Keep names, facts, preferences and open questions. Reply with the summary only, under 200 words."},
+            {"role": "user", "content": f"Current summary:\n{previous_summary or '(none)'}\n\nNew turns:\n{transcript}"},
+        ],
+        max_tokens=400,
+        temperature=0.2,
+    )
+    return completion.choices[0].message.content or previous_summary
+
 # === Main Chat Function ===
-def ChatBot(Query):
+def ChatBotStream(Query, chatlog_path=None, retries=1, token=NEVER):
+    """
+    Yield the answer as text deltas while Groq generates it; the log is written once it completes.
+    If token is cancelled mid-stream the connection is closed and the partial answer is logged as truncated.
+    """
+    Answer = ""
     try:
-        # Load existing chat history
-        with open(r"Data\ChatLog.json", "r") as f:
-            messages = load(f)
+        # Recent history within the token budget, older turns as a summary
+        chatlog = open_chat_log(chatlog_path)
+        messages = GetContextManager(chatlog, SummarizeTurns).build()
 
         # Add user query to the conversation
         messages.append({"role": "user", "content": f"{Query}"})
 
+        token.raise_if_cancelled()
+
         # Generate AI response using Groq
         completion = client.chat.completions.create(
             model="llama3-70b-8192",
@@ -77,30 +90,48 @@ def ChatBot(Query):
             stream=True,
             stop=None
         )
-        
-        Answer = ""
-
-        # Read the streamed response
-        for chunk in completion:
-            if chunk.choices[0].delta.content:
-                Answer += chunk.choices[0].delta.content
-
-        Answer = Answer.replace("</s>", "")  # Remove stop token if present
-
-        # Save assistant response
-        messages.append({"role": "assistant", "content": Answer})
-
-        # Save updated chat log to file
-        with open(r"Data\ChatLog.json", "w") as f:
-            dump(messages, f, indent=4)
+        unregister = token.on_cancel(completion.close)  # Abort the blocked read on barge-in
+
+        # Forward the streamed response as it arrives
+        try:
+            for chunk in completion:
+                if token.cancelled:
+                    break
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    delta = delta.replace("</s>", "")  # Remove stop token if present
+                    Answer += delta
+                    yield delta
+        finally:
+            unregister()
+
+        # Append both turns to the log in one write
+        if Answer or not token.cancelled:
+            chatlog.extend(ChatLogTurn(Query, Answer, token))
 
-        return AnswerModifier(Answer=Answer)
-    
     except Exception as e:
+        if token.cancelled:
+            if Answer:
+                chatlog.extend(ChatLogTurn(Query, Answer, token))
+            return
         print(f"Error: {e}")
-        with open(r"Data\ChatLog.json", "w") as f:
-            dump([], f, indent=4)
-        return ChatBot(Query)  # Retry once
+        if Answer:
+            return  # Part of the answer was already delivered; don't repeat it
+        if retries <= 0:
+            yield "Sorry, I couldn't get a response right now."
+            return
+        yield from ChatBotStream(Query, chatlog_path=chatlog_path, retries=retries - 1, token=token)  # Retry once
+
+def ChatLogTurn(Query, Answer, token):
+    """Chat log entries for one exchange; answers cut short by cancellation are marked truncated."""
+    reply = {"role": "assistant", "content": Answer}
+    if token.cancelled:
+        reply["truncated"] = True
+    return [{"role": "user", "content": f"{Query}"}, reply]
+
+def ChatBot(Query, chatlog_path=None):
+    """Return the complete answer for callers that don't stream."""
+    return AnswerModifier(Answer="".join(ChatBotStream(Query, chatlog_path=chatlog_path)))
 
 # === Manual Test Runner ===
 if __name__ == "__main__":
@@ -0,0 +1,210 @@
+# === ContextWindow.py ===
+# Token-budgeted sliding window over the chat log.
+# Recent turns are sent verbatim; older turns are folded into a rolling
+# summary by a background worker and cached next to the log.
+
+# === Imports ===
+import os
+import re
+import sys
+import json
+import time
+import queue
+import threading
+from dotenv import dotenv_values
+from Backend.ChatLogStore import atomic_write
+
+# === Load Environment Variables ===
+env_vars = dotenv_values(".env")
+ContextTokenBudget = int(env_vars.get("ContextTokenBudget", 2000))   # Tokens of verbatim history per request
+ContextMaxMessages = int(env_vars.get("ContextMaxMessages", 64))     # Hard cap on messages read per request
+SummaryBatchSize = int(env_vars.get("SummaryBatchSize", 40))         # Messages folded per summarizer call
+
+MESSAGE_OVERHEAD = 4  # Role and separator tokens per chat message
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+# === Token Counting ===
+def CountTokens(text: str) -> int:
+    """Approximate BPE token count: one per word or symbol, plus one per 8 extra characters of long words."""
+    return sum(1 + len(piece) // 8 for piece in _TOKEN_RE.findall(text or ""))
+
+
+def CountMessageTokens(messages) -> int:
+    return sum(CountTokens(m.get("content", "")) + MESSAGE_OVERHEAD for m in messages)
+
+
+# === Context Manager ===
+class ContextManager:
+    """Builds the history part of a prompt from a ChatLogStore within a token budget."""
+
+    def __init__(self, chatlog, summarizer=None, budget=None, max_messages=None):
+        self.chatlog = chatlog
+        self.summarizer = summarizer
+        self.budget = budget or ContextTokenBudget
+        self.max_messages = max_messages or ContextMaxMessages
+        self.summary_path = os.path.splitext(chatlog.path)[0] + ".summary.json"
+        self._lock = threading.Lock()
+        self._summary = self._load_summary()
+        self._jobs = queue.Queue()
+        self._pending = False
+        self._worker = None
+
+    # --- Summary cache ---
+    def _load_summary(self):
+        try:
+            with open(self.summary_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return {"upto": int(data.get("upto", 0)), "summary": str(data.get("summary", ""))}
+        except (OSError, ValueError):
+            return {"upto": 0, "summary": ""}
+
+    def _save_summary(self, summary):
+        atomic_write(self.summary_path, json.dumps(summary, ensure_ascii=False).encode("utf-8"))
+
+    @property
+    def summary(self):
+        with self._lock:
+            return dict(self._summary)
+
+    # --- Hot path ---
+    def build(self, reserve_tokens=0):
+        """
+        Return [summary message] + the most recent messages that fit the budget.
+        Never blocks on summarization; a stale summary is used until the worker catches up.
+        """
+        total = len(self.chatlog)
+        recent = self.chatlog.tail(self.max_messages)
+        budget = self.budget - reserve_tokens
+
+        kept = []
+        used = 0
+        for message in reversed(recent):
+            cost = CountTokens(message.get("content", "")) + MESSAGE_OVERHEAD
+            if kept and used + cost > budget:
+                break
+            kept.append({"role": message["role"], "content": message["content"]})
+            used += cost
+        kept.reverse()
+
+        # Do not open the window on a dangling assistant reply
+        if kept and kept[0]["role"] == "assistant" and len(kept) > 1:
+            kept.pop(0)
+
+        window_start = total - len(kept)
+        summary = self.summary
+        if self.summarizer and summary["upto"] < window_start:
+            self._schedule(window_start)
+
+        context = []
+        if summary["summary"]:
+            context.append({
+                "role": "system",
+                "content": f"Summary of the earlier conversation:\n{summary['summary']}",
+            })
+        return context + kept
+
+    # --- Background summarization ---
+    def _schedule(self, upto):
+        with self._lock:
+            if self._pending:
+                return
+            self._pending = True
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="ContextSummarizer", daemon=True)
+                self._worker.start()
+        self._jobs.put(upto)
+
+    def _run(self):
+        while True:
+            upto = self._jobs.get()
+            try:
+                self._fold_until(upto)
+            except Exception as e:
+                print(f"[Context] Summarization failed: {e}")
+            finally:
+                with self._lock:
+                    self._pending = False
+
+    def _fold_until(self, upto):
+        summary = self.summary
+        while summary["upto"] < upto:
+            stop = min(upto, summary["upto"] + SummaryBatchSize)
+            turns = self.chatlog.read_range(summary["upto"], stop)
+            if not turns:
+                break
+            text = self.summarizer(summary["summary"], turns)
+            summary = {"upto": stop, "summary": text.strip()}
+            self._save_summary(summary)
+            with self._lock:
+                self._summary = summary
+
+    def wait_idle(self, timeout=None):
+        """Block until no summarization is pending (used by tests and benchmarks)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                if not self._pending:
+                    return True
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+def GetContextManager(chatlog, summarizer=None):
+    """Return the shared ContextManager for a chat log."""
+    key = os.path.abspath(chatlog.path)
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None:
+            manager = _managers[key] = ContextManager(chatlog, summarizer)
+        elif summarizer and manager.summarizer is None:
+            manager.summarizer = summarizer
+    return manager
+
+
+# === Benchmark ===
+def Benchmark(history_sizes=(10, 100, 1000, 5000), ms_per_1k_tokens=40.0, base_ms=150.0):
+    """
+    Compare prompt size and simulated time-to-first-token for full history vs. the sliding window.
+    The fake model's TTFT is base_ms + ms_per_1k_tokens * prompt_tokens / 1000.
+    """
+    import tempfile
+    from Backend.ChatLogStore import ChatLogStore
+
+    def fake_summarizer(previous, turns):
+        return (previous + " " + " ".join(t["content"][:20] for t in turns))[-800:]
+
+    print(f"{'turns':>6} | {'full tokens':>11} {'full TTFT':>10} | {'window tokens':>13} {'window TTFT':>11} {'build ms':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in history_sizes:
+            store = ChatLogStore(os.path.join(tmp, f"ChatLog_{size}.jsonl"))
+            store.extend(
+                {"role": "user" if i % 2 == 0 else "assistant",
+                 "content": f"Message {i} about topic {i % 17} with a few more words of detail."}
+                for i in range(size)
+            )
+            manager = ContextManager(store, fake_summarizer)
+            manager.build()
+            manager.wait_idle(timeout=30)
+
+            start = time.perf_counter()
+            window = manager.build()
+            build_ms = (time.perf_counter() - start) * 1000
+
+            full_tokens = CountMessageTokens(store.read_all())
+            window_tokens = CountMessageTokens(window)
+            full_ttft = base_ms + ms_per_1k_tokens * full_tokens / 1000
+            window_ttft = base_ms + ms_per_1k_tokens * window_tokens / 1000 + build_ms
+            print(f"{size:>6} | {full_tokens:>11} {full_ttft:>8.0f}ms | {window_tokens:>13} {window_ttft:>9.0f}ms {build_ms:>8.2f}")
+
+
+if __name__ == "__main__":
+    if "--bench" in sys.argv:
+        Benchmark()
+    else:
+        print("Usage: python -m Backend.ContextWindow --bench")
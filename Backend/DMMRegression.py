@@ -0,0 +1,215 @@
+# === DMMRegression.py ===
+# Offline accuracy/latency regression suite for the decision model prompts
+# (Backend/Model.PROMPTS). Every query in the labeled corpus is classified
+# with each prompt variant and the harness reports intent accuracy, exact
+# matches, input tokens and p50/p95 latency.
+#
+# By default the model is a local stand-in server that speaks Cohere's
+# streaming chat protocol. It answers from the corpus labels and charges
+# latency per input and output token. That makes it measure the cost of a
+# prompt and exercise the full client/parser path, but not prompt quality:
+# every prompt scores 100% by construction, so offline accuracy is shown as
+# N/A and only --live (real API, CohereAPIKey) can judge DMMPromptMode.
+#
+# Usage: python -m Backend.DMMRegression [--live] [--gate] [--corpus PATH] [--modes full,compact]
+#   --gate exits non-zero unless compact is faster at p50 with no loss in accuracy.
+#   It requires --live; offline it always fails.
+
+# === Imports ===
+import os
+import sys
+import json
+import time
+import uuid
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from dotenv import dotenv_values
+from Backend.ContextWindow import CountTokens
+from Backend.DecisionCache import NormalizeKey
+
+# === Load Environment Variables ===
+env_vars = dotenv_values(".env")
+DMMCorpusPath = env_vars.get("DMMCorpusPath", os.path.join("Data", "DMMCorpus.jsonl"))
+StandInBaseMs = float(env_vars.get("StandInBaseMs", 40))              # Network + queueing per request
+StandInPrefillMs = float(env_vars.get("StandInPrefillMs", 0.25))      # Per input token
+StandInDecodeMs = float(env_vars.get("StandInDecodeMs", 12))          # Per output token
+
+
+def LoadCorpus(path=None):
+    """Return [(query, decision)] from a JSONL file of {"query": ..., "decision": [...]}."""
+    with open(path or DMMCorpusPath, "r", encoding="utf-8") as f:
+        return [(item["query"], item["decision"]) for item in map(json.loads, f) if item]
+
+
+def Intents(decision):
+    """The intent of each task, in order: ["open", "general"] for ["open chrome", "general ..."]."""
+    from Backend.Model import funcs
+    ordered = sorted(funcs, key=len, reverse=True)
+    return [next((func for func in ordered if task.startswith(func)), "?") for task in decision]
+
+
+def PromptTokens(system_prompt, history, message):
+    """Input tokens of one chat request, counted the same way as the chat context window."""
+    return CountTokens(system_prompt) + sum(CountTokens(turn["message"]) for turn in history) + CountTokens(message)
+
+
+# === Stand-in Model Server ===
+class StandInModel:
+    """Answers with the corpus label and sleeps for the time a real model would need."""
+
+    def __init__(self, corpus):
+        self.labels = {NormalizeKey(query): decision for query, decision in corpus}
+        self.requests = 0
+
+    def reply(self, body):
+        message = body.get("message", "")
+        tokens = PromptTokens(body.get("preamble") or "", body.get("chat_history") or [], message)
+        decision = self.labels.get(NormalizeKey(message), [f"general {message}"])
+        text = ", ".join(decision)
+        self.requests += 1
+        return text, tokens
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat"):
+            self.send_error(404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        text, tokens = self.server.model.reply(body)
+        time.sleep((StandInBaseMs + tokens * StandInPrefillMs) / 1000)  # Time to first token
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/stream+json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        generation_id = str(uuid.uuid4())
+        self._event({"is_finished": False, "event_type": "stream-start", "generation_id": generation_id})
+        words = text.split(" ")
+        for i, word in enumerate(words):
+            time.sleep(StandInDecodeMs / 1000)
+            self._event({"is_finished": False, "event_type": "text-generation", "text": word if i == 0 else " " + word})
+        self._event({
+            "is_finished": True, "event_type": "stream-end", "finish_reason": "COMPLETE",
+            "response": {
+                "text": text, "generation_id": generation_id, "chat_history": [], "finish_reason": "COMPLETE",
+                "meta": {"billed_units": {"input_tokens": tokens, "output_tokens": len(words)}},
+            },
+        })
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _event(self, event):
+        line = (json.dumps(event) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(line):x}\r\n".encode("ascii") + line + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass  # Keep the report readable
+
+
+def StartStandInServer(corpus):
+    """Serve the stand-in model on a free local port; returns (server, base_url)."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StandInHandler)
+    server.daemon_threads = True
+    server.model = StandInModel(corpus)
+    threading.Thread(target=server.serve_forever, name="DMMStandIn", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+# === Harness ===
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+
+def Evaluate(corpus, mode):
+    """Classify the corpus with one prompt variant and summarize the results."""
+    from Backend import Model
+    system_prompt, history = Model.PROMPTS[mode]
+    latencies, tokens, intent_ok, exact_ok, failures = [], [], 0, 0, []
+    for query, expected in corpus:
+        started = time.perf_counter()
+        decision = Model.FirstLayerDMM(query, mode=mode)
+        latencies.append(time.perf_counter() - started)
+        tokens.append(PromptTokens(system_prompt, history, query))
+        if Intents(decision) == Intents(expected):
+            intent_ok += 1
+            exact_ok += [NormalizeKey(task) for task in decision] == [NormalizeKey(task) for task in expected]
+        else:
+            failures.append((query, expected, decision))
+    return {
+        "mode": mode,
+        "accuracy": intent_ok / len(corpus),
+        "exact": exact_ok / len(corpus),
+        "input_tokens": sum(tokens) / len(tokens),
+        "p50_ms": _percentile(latencies, 0.5) * 1000,
+        "p95_ms": _percentile(latencies, 0.95) * 1000,
+        "failures": failures,
+    }
+
+
+def Gate(results, live=True):
+    """
+    Compact may ship only if it is faster at p50 and at least as accurate as full.
+    Accuracy is only measured against the live model, so offline the gate fails.
+    """
+    full, compact = results.get("full"), results.get("compact")
+    if not full or not compact:
+        return False, "gate needs both the full and compact results"
+    if not live:
+        difference = full["p50_ms"] - compact["p50_ms"]
+        return False, (f"accuracy is N/A against the stand-in (it answers from the labels); "
+                       f"compact is {difference:.0f} ms {'faster' if difference > 0 else 'slower'} at p50. "
+                       f"Run with --live to gate on accuracy")
+    if compact["accuracy"] < full["accuracy"]:
+        return False, f"compact loses accuracy ({compact['accuracy']:.1%} < {full['accuracy']:.1%})"
+    if compact["p50_ms"] >= full["p50_ms"]:
+        return False, f"compact is not faster ({compact['p50_ms']:.0f} ms >= {full['p50_ms']:.0f} ms at p50)"
+    return True, f"compact is {full['p50_ms'] - compact['p50_ms']:.0f} ms faster at p50 with no loss in accuracy"
+
+
+def _argument(name, default=None):
+    if name in sys.argv:
+        index = sys.argv.index(name)
+        if index + 1 < len(sys.argv):
+            return sys.argv[index + 1]
+    return default
+
+
+def Main():
+    import cohere
+    live = "--live" in sys.argv
+    if not live:
+        os.environ.setdefault("CO_API_KEY", "stand-in")  # Lets Backend.Model import without a real key
+    from Backend import Model
+
+    corpus = LoadCorpus(_argument("--corpus"))
+    modes = _argument("--modes", "full,compact").split(",")
+    if not live:
+        server, base_url = StartStandInServer(corpus)
+        Model.co = cohere.Client(api_key="stand-in", base_url=base_url)
+
+    print(f"{len(corpus)} labeled queries, {'live Cohere API' if live else 'local stand-in model'}")
+    print(f"{'mode':8} {'accuracy':>9} {'exact':>7} {'tokens':>7} {'p50 ms':>8} {'p95 ms':>8}")
+    results = {}
+    for mode in modes:
+        result = results[mode] = Evaluate(corpus, mode)
+        accuracy = f"{result['accuracy']:>9.1%} {result['exact']:>7.1%}" if live else f"{'N/A':>9} {'N/A':>7}"
+        print(f"{mode:8} {accuracy} {result['input_tokens']:>7.0f} {result['p50_ms']:>8.0f} {result['p95_ms']:>8.0f}")
+    for mode, result in results.items():
+        for query, expected, decision in result["failures"]:
+            # Offline the stand-in replies with the label, so a mismatch is a client/parser bug
+            print(f"  [{mode}] {query!r}: expected {expected}, got {decision}")
+
+    passed, reason = Gate(results, live)
+    print(("PASS: " if passed else "FAIL: " if live or "--gate" in sys.argv else "INFO: ") + reason)
+    if not live:
+        server.shutdown()
+    if "--gate" in sys.argv and not passed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    Main()
@@ -0,0 +1,247 @@
+# === DecisionCache.py ===
+# Memoizes FirstLayerDMM decisions for repeated queries ("open chrome",
+# "what's the time"). Queries are keyed after normalization, entries expire
+# after a per-intent TTL and are evicted least-recently-used; the cache is
+# persisted to Data/DecisionCache.json a moment after the last change
+# (writes are batched, not done per put). Decisions that route to the chatbot
+# ("general") or search ("realtime") are stored per user and never served
+# to anyone else.
+
+# === Imports ===
+import os
+import re
+import json
+import time
+import atexit
+import threading
+from collections import OrderedDict
+from dotenv import dotenv_values
+from Backend.ChatLogStore import atomic_write
+from Backend.Cancellation import NEVER
+
+# === Load Environment Variables ===
+env_vars = dotenv_values(".env")
+DecisionCachePath = env_vars.get("DecisionCachePath", os.path.join("Data", "DecisionCache.json"))
+DecisionCacheMaxEntries = int(env_vars.get("DecisionCacheMaxEntries", 2000))
+DecisionCacheEnabled = env_vars.get("DecisionCache", "True") == "True"
+DecisionCacheSaveDelay = float(env_vars.get("DecisionCacheSaveDelay", 2))  # Puts within this window share one write
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+# Seconds a decision stays valid, by the intent it starts with. 0 = never cached.
+INTENT_TTL = {
+    "open": 30 * DAY,
+    "close": 30 * DAY,
+    "play": 30 * DAY,
+    "system": 30 * DAY,
+    "google search": 30 * DAY,
+    "youtube search": 30 * DAY,
+    "generate image": 30 * DAY,
+    "content": 30 * DAY,
+    "exit": 30 * DAY,
+    "general": DAY,
+    "realtime": 6 * HOUR,
+    "reminder": 0,  # "remind me tomorrow" means a different day every time
+}
+PER_USER_INTENTS = ("general", "realtime")
+
+
+def NormalizeKey(query: str) -> str:
+    """Lowercase, strip punctuation and collapse whitespace."""
+    text = re.sub(r"[^\w\s]", "", (query or "").lower())
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _intent(task):
+    for name in sorted(INTENT_TTL, key=len, reverse=True):
+        if task.startswith(name):
+            return name
+    return None
+
+
+def DecisionTTL(decision):
+    """Shortest TTL of the intents in a decision; 0 if any part must not be cached."""
+    ttls = [INTENT_TTL.get(_intent(task), 0) for task in decision]
+    return min(ttls) if ttls else 0
+
+
+class DecisionCache:
+    """LRU map of normalized query -> decision, persisted as one JSON document."""
+
+    def __init__(self, path=None, max_entries=None, save_delay=None):
+        self.path = path or DecisionCachePath
+        self.max_entries = max_entries or DecisionCacheMaxEntries
+        self.save_delay = DecisionCacheSaveDelay if save_delay is None else save_delay
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()  # Serializes file writes; never held with _lock during I/O
+        self._timer = None
+        self._dirty = False
+        self.saves = 0
+        self._entries = self._load()
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+            if not isinstance(entries, list):
+                return OrderedDict()
+            now = time.time()
+            return OrderedDict(
+                (entry["key"], entry) for entry in entries
+                if isinstance(entry, dict) and entry.get("expires", 0) > now
+            )
+        except (OSError, ValueError, KeyError):
+            return OrderedDict()
+
+    def _schedule_save(self):
+        """Called with _lock held: write once save_delay after the first unsaved change."""
+        self._dirty = True
+        if self._timer is None:
+            self._timer = threading.Timer(self.save_delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """Write pending changes to disk now."""
+        with self._save_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._dirty:
+                    return
+                entries = [dict(entry) for entry in self._entries.values()]
+                self._dirty = False
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                atomic_write(self.path, json.dumps(entries, ensure_ascii=False).encode("utf-8"))
+                self.saves += 1
+            except OSError as e:
+                print(f"[DecisionCache] Could not save: {e}")
+
+    @staticmethod
+    def _keys(query, user):
+        shared = NormalizeKey(query)
+        return shared, f"{user or ''}\x1f{shared}"
+
+    def get(self, query, user=None):
+        """Return a cached decision for query (as seen by user), or None."""
+        now = time.time()
+        with self._lock:
+            for key in self._keys(query, user):
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                if entry["expires"] <= now:
+                    del self._entries[key]
+                    continue
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self.saved_seconds += entry.get("latency", 0.0)
+                return list(entry["decision"])
+            self.misses += 1
+            return None
+
+    def put(self, query, decision, user=None, latency=0.0):
+        """Store a decision; general/realtime decisions are only visible to the same user."""
+        ttl = DecisionTTL(decision)
+        if not decision or ttl <= 0 or getattr(decision, "fallback", False):
+            return False
+        shared, personal = self._keys(query, user)
+        key = personal if any(_intent(task) in PER_USER_INTENTS for task in decision) else shared
+        with self._lock:
+            self._entries[key] = {
+                "key": key,
+                "decision": list(decision),
+                "expires": time.time() + ttl,
+                "latency": round(latency, 4),
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._schedule_save()
+        return True
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+                "saved_s": round(self.saved_seconds, 2),
+                "writes": self.saves,
+            }
+
+
+class CachedClassifier:
+    """
+    Wraps classify(query, token=...) with the decision cache. user() returns
+    the active username, which scopes general/realtime decisions. on_task is
+    passed on to classify() on a miss; a hit returns the whole decision at once.
+    With store=False (speculative calls on interim transcripts) a fresh decision
+    is only held in memory until commit(query) says the final transcript used it.
+    """
+
+    PENDING_MAX = 8
+
+    def __init__(self, classify, cache=None, user=lambda: None, enabled=None):
+        self.classify = classify
+        self.cache = cache or GetDecisionCache()
+        self.user = user
+        self.enabled = DecisionCacheEnabled if enabled is None else enabled
+        self._pending = OrderedDict()  # (user, key) -> (decision, latency) awaiting commit()
+        self._pending_lock = threading.Lock()
+
+    def __call__(self, query, token=NEVER, on_task=None, store=True):
+        streaming = {"on_task": on_task} if on_task else {}
+        if not self.enabled:
+            return self.classify(query, token=token, **streaming)
+        user = self.user()
+        decision = self.cache.get(query, user)
+        if decision is not None:
+            return decision
+        started = time.monotonic()
+        decision = self.classify(query, token=token, **streaming)
+        if decision and not token.cancelled:
+            latency = time.monotonic() - started
+            if store:
+                self.cache.put(query, decision, user, latency=latency)
+            else:
+                with self._pending_lock:
+                    self._pending[(user, NormalizeKey(query))] = (decision, latency)
+                    while len(self._pending) > self.PENDING_MAX:
+                        self._pending.popitem(last=False)
+        return decision
+
+    def commit(self, query):
+        """Persist the decision an earlier store=False call made for query, if any."""
+        user = self.user()
+        with self._pending_lock:
+            pending = self._pending.pop((user, NormalizeKey(query)), None)
+        if pending is None:
+            return False  # Served locally, from the cache, or already dropped
+        decision, latency = pending
+        return self.cache.put(query, decision, user, latency=latency)
+
+    def stats(self):
+        return self.cache.stats()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def GetDecisionCache():
+    """Return the shared cache instance."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = DecisionCache()
+            atexit.register(_cache.flush)
+    return _cache
@@ -0,0 +1,91 @@
+# === EventBus.py ===
+# In-process publish/subscribe state bus shared by the GUI and backend threads.
+# Threads block on a condition variable instead of polling Frontend/Files.
+
+# === Imports ===
+import threading
+
+# === Topics ===
+MIC = "mic"                    # "True" / "False" microphone state
+STATUS = "status"              # Assistant status line text
+WAKE_TRIGGER = "wake_trigger"  # "True" / "False" wake word toggle
+RESPONSE = "response"          # Latest text shown in the chat view
+PARTIAL = "partial"            # Answer text still being generated ("" when none)
+
+DEFAULTS = {
+    MIC: "False",
+    STATUS: "",
+    WAKE_TRIGGER: "True",
+    RESPONSE: "",
+    PARTIAL: "",
+}
+
+
+class StateBus:
+    """Thread-safe key/value state with change notification."""
+
+    def __init__(self, initial=None):
+        self._state = dict(DEFAULTS)
+        if initial:
+            self._state.update(initial)
+        self._cond = threading.Condition()
+        self._subscribers = {}
+        self._version = 0
+
+    def get(self, topic):
+        """Return the current value of a topic."""
+        with self._cond:
+            return self._state.get(topic, "")
+
+    def snapshot(self):
+        """Return a copy of the whole state."""
+        with self._cond:
+            return dict(self._state)
+
+    def publish(self, topic, value):
+        """Set a topic value, wake waiting threads and run subscribers on change."""
+        with self._cond:
+            if self._state.get(topic) == value:
+                return False
+            self._state[topic] = value
+            self._version += 1
+            callbacks = list(self._subscribers.get(topic, ()))
+            self._cond.notify_all()
+
+        for callback in callbacks:
+            try:
+                callback(value)
+            except Exception as e:
+                print(f"[EventBus] Subscriber error on '{topic}': {e}")
+        return True
+
+    def subscribe(self, topic, callback):
+        """Call callback(value) on the publishing thread whenever topic changes."""
+        with self._cond:
+            self._subscribers.setdefault(topic, []).append(callback)
+
+    def unsubscribe(self, topic, callback):
+        with self._cond:
+            callbacks = self._subscribers.get(topic, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+
+    def notify(self):
+        """Wake waiters so they re-check state that lives outside the bus."""
+        with self._cond:
+            self._version += 1
+            self._cond.notify_all()
+
+    def wait_until(self, predicate, timeout=None):
+        """Block until predicate(state) is true. Returns False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: predicate(self._state), timeout=timeout)
+
+    def wait_for_value(self, topic, value, timeout=None):
+        """Block until topic equals value (case-insensitive for strings)."""
+        wanted = str(value).lower()
+        return self.wait_until(lambda state: str(state.get(topic, "")).lower() == wanted, timeout)
+
+
+# === Shared Instance ===
+bus = StateBus()
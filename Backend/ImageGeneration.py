@@ -65,19 +65,25 @@ async def generate_images(prompt: str):
     image_bytes_list = await asyncio.gather(*tasks)
 
     os.makedirs(DATA_FOLDER, exist_ok=True)
+    saved = []
     for i, image_bytes in enumerate(image_bytes_list):
         if image_bytes:
             file_path = os.path.join(DATA_FOLDER, f"{prompt_sanitized}{i + 1}.jpg")
             with open(file_path, "wb") as f:
                 f.write(image_bytes)
+            saved.append(file_path)
         else:
             print(f"Image {i + 1} generation failed.")
+    return saved
 
 
 # --- Sync Wrapper: Generate and Open ---
 def generate_and_open_images(prompt: str):
-    asyncio.run(generate_images(prompt))
-    open_images(prompt)
+    """Generate, save and open the images; returns the saved paths (empty if every request failed)."""
+    saved = asyncio.run(generate_images(prompt))
+    if saved:
+        open_images(prompt)
+    return saved
 
 
 # --- File Monitoring Loop ---
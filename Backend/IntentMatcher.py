@@ -0,0 +1,310 @@
+# === IntentMatcher.py ===
+# Local fast path in front of the decision model (Backend/Model.FirstLayerDMM).
+# Obvious commands such as "open chrome", "mute" or "play let her go" are
+# matched with compiled patterns over the same vocabulary the model answers
+# with and turned into a Decision list in the model's format. Anything the
+# patterns are not confident about still goes to the model.
+# Benchmark: python -m Backend.IntentMatcher --bench
+
+# === Imports ===
+import re
+import sys
+import time
+import threading
+from collections import deque
+from typing import NamedTuple
+from dotenv import dotenv_values
+from Backend.Cancellation import NEVER
+
+# === Load Environment Variables ===
+env_vars = dotenv_values(".env")
+Assistantname = env_vars.get("Assistantname", "Jarvis")
+IntentFastPath = env_vars.get("IntentFastPath", "True") == "True"          # Route obvious commands locally
+IntentConfidence = float(env_vars.get("IntentConfidence", 0.85))         # Below this the model decides
+IntentKnownApps = env_vars.get("IntentKnownApps", "")                      # Extra ","-separated app names for launch/close
+
+_NAME = re.escape(Assistantname.lower())
+_FILLER = re.compile(rf"^(?:(?:hey|ok|okay)\s+)?(?:{_NAME}\s*,?\s+)?(?:please\s+|(?:can|could|would|will) you\s+(?:please\s+)?)?")
+_TRAILER = re.compile(rf"(?:\s+(?:please|for me|now|{_NAME}))+$")
+_JOINER = re.compile(r"\s*(?:,\s*(?:and\s+)?(?:then\s+)?|\s+and\s+(?:then\s+)?|\s+then\s+)")
+_QUESTION = re.compile(r"\b(?:what|who|whom|whose|why|how|when|where|which|tell me|about)\b")
+_PRONOUNS = {"it", "this", "that", "them", "these", "those", "file"}  # Refer to something the matcher can't resolve
+_PLAYER_WORDS = {"next", "previous", "last", "same", "again", "something", "anything"}  # "play the next song" is a player control
+
+# Apps and sites "launch"/"close"/"quit"/"kill" may target without asking the model
+KNOWN_APPS = {
+    "chrome", "google chrome", "firefox", "edge", "microsoft edge", "brave", "opera", "notepad", "calculator",
+    "paint", "camera", "photos", "settings", "file explorer", "explorer", "task manager", "command prompt", "cmd",
+    "terminal", "powershell", "vs code", "visual studio code", "word", "excel", "powerpoint", "outlook", "teams",
+    "microsoft teams", "whatsapp", "telegram", "discord", "slack", "zoom", "skype", "spotify", "vlc", "steam", "obs",
+    "facebook", "instagram", "twitter", "youtube", "gmail", "netflix",
+} | {app.strip().lower() for app in IntentKnownApps.split(",") if app.strip()}
+
+
+class Match(NamedTuple):
+    decision: list      # e.g. ["open chrome", "system mute"]
+    confidence: float   # Lowest confidence of the commands in the decision
+
+
+class _Rule(NamedTuple):
+    pattern: re.Pattern
+    template: str        # Decision text; {e} is the extracted entity, {q} the whole command
+    confidence: float
+    max_words: int = 0   # Longer entities are suspicious (0 = no limit)
+    apps_only: bool = False  # The verb has other meanings ("quit smoking"); only trust known app names
+
+
+def _rule(pattern, template, confidence, max_words=0, apps_only=False):
+    return _Rule(re.compile(pattern), template, confidence, max_words, apps_only)
+
+
+# Order matters: the first matching rule wins
+RULES = [
+    # --- System ---
+    _rule(r"^(?:mute|silence)(?: (?:the )?(?:volume|sound|audio|speakers?|system))?$", "system mute", 0.98),
+    _rule(r"^unmute(?: (?:the )?(?:volume|sound|audio|speakers?|system))?$", "system unmute", 0.98),
+    _rule(r"^(?:(?:turn|crank) )?(?:the )?volume up$|^(?:increase|raise|turn up) (?:the )?volume$|^louder$", "system volume up", 0.97),
+    _rule(r"^(?:(?:turn) )?(?:the )?volume down$|^(?:decrease|lower|reduce|turn down) (?:the )?volume$|^quieter$", "system volume down", 0.97),
+
+    # --- Exit ---
+    _rule(rf"^(?:bye|goodbye|good bye|bye bye|see you|exit|quit)(?: {_NAME})?$", "exit", 0.97),
+
+    # --- Images ---
+    _rule(r"^(?:generate|create|make|draw) (?:me )?(?:an? |some )?(?:image|picture|photo|drawing)s? (?:of |showing )?(?:an? )?(?P<e>.+)$", "generate image {e}", 0.93),
+
+    # --- YouTube / Google ---
+    _rule(r"^(?:search (?:on )?youtube (?:for )?|youtube search (?:for )?|search for (?=.+ on youtube$))(?P<e>.+?)(?: on youtube)?$", "youtube search {e}", 0.93),
+    _rule(r"^(?:search (?:on )?google (?:for )?|google search (?:for )?|google |search for (?=.+ on google$))(?P<e>.+?)(?: on google)?$", "google search {e}", 0.92),
+    _rule(r"^search (?P<e>.+) on google$", "google search {e}", 0.92),
+    _rule(r"^search (?P<e>.+) on youtube$", "youtube search {e}", 0.93),
+
+    # --- Apps ---
+    _rule(r"^open (?:the |my )?(?P<e>.+?)(?: (?:app|application|website|site))?$", "open {e}", 0.95, max_words=3),
+    _rule(r"^launch (?:the |my )?(?P<e>.+?)(?: (?:app|application|website|site))?$", "open {e}", 0.95, max_words=3, apps_only=True),
+    _rule(r"^(?:close|quit|exit|kill) (?:the |my )?(?P<e>.+?)(?: (?:app|application|website|site))?$", "close {e}", 0.95, max_words=3, apps_only=True),
+
+    # --- Media ---
+    _rule(r"^play (?:the |a )?(?:song |music |track )?(?P<e>.+?)(?: (?:song|on youtube))?$", "play {e}", 0.93, max_words=8),
+
+    # --- Content ---
+    _rule(r"^(?:write|draft|compose) (?:me |us )?(?:an? |the |some )?(?P<e>(?:application|letter|email|e-mail|essay|poem|song|story|note|notes|code|program|script|article|report|speech)\b.*)$", "content {e}", 0.9),
+
+    # --- Conversation that needs no model routing ---
+    _rule(r"^(?:what(?:'s| is) (?:the )?(?:time|date|day)(?: (?:today|now|it is|is it))?|what day is (?:it|today)|what time is it)$", "general {q}", 0.92),
+    _rule(rf"^(?:hi|hello|hey|good (?:morning|afternoon|evening))(?: {_NAME})?$|^how are you(?: doing)?(?: today)?$|^(?:thanks|thank you)(?: so much| very much)?(?: {_NAME})?$", "general {q}", 0.9),
+]
+
+# Verbs that start a new command inside a multi-command sentence
+_COMMAND_START = re.compile(
+    r"^(?:open|launch|close|quit|exit|kill|play|mute|unmute|silence|volume|turn|increase|raise|decrease|lower|reduce"
+    r"|search|google|youtube|generate|create|make|draw|write|draft|compose)\b"
+)
+# Verbs whose objects may be listed without repeating the verb ("open chrome, firefox and notepad")
+_LIST_VERBS = {"open", "close"}
+# Words that start a new clause, not a list item ("open whatsapp and message mom")
+_CLAUSE_STARTS = {
+    "message", "text", "call", "email", "mail", "send", "reply", "delete", "remove", "save", "copy", "paste",
+    "move", "rename", "type", "read", "check", "show", "find", "tell", "give", "set", "start", "stop", "go",
+    "take", "put", "print", "share", "post", "install", "uninstall", "update", "download", "upload", "log",
+    "sign", "add", "edit", "pause", "resume", "skip", "record", "remind", "schedule", "book", "order", "buy",
+    "look", "see", "let", "do", "help", "translate", "explain", "scroll", "click", "refresh", "reload",
+    "minimize", "maximize", "switch", "shut", "restart", "lock", "join", "watch", "listen",
+    "i", "you", "we", "he", "she", "they", "me", "us",
+}
+
+
+def _normalize(query):
+    text = re.sub(r"\s+", " ", (query or "").lower()).strip().rstrip(".?!").strip()
+    text = _FILLER.sub("", text)
+    return _TRAILER.sub("", text).strip(" ,")
+
+
+def _is_list_item(piece):
+    """True if piece is a known app or a plain noun phrase that can take the previous verb."""
+    if re.sub(r"^(?:the|my) ", "", piece) in KNOWN_APPS:
+        return True
+    words = piece.split()
+    return (
+        len(words) <= 3
+        and not _QUESTION.search(piece)
+        and words[0] not in _CLAUSE_STARTS
+        and not any(word in _PRONOUNS for word in words)
+    )
+
+
+def _split_commands(text):
+    """
+    Split on commas/"and"/"then", but only where a new command (or another list item) starts.
+    Returns None when an open/close list continues with something that is not a plain
+    list item ("open whatsapp and message mom"): only the model can split that.
+    """
+    pieces = _JOINER.split(text)
+    joiners = _JOINER.findall(text)
+    commands = [pieces[0]]
+    for joiner, piece in zip(joiners, pieces[1:]):
+        verb = commands[-1].split(" ", 1)[0]
+        if _COMMAND_START.match(piece):
+            commands.append(piece)
+        elif verb in _LIST_VERBS:
+            if not _is_list_item(piece):
+                return None
+            commands.append(f"{verb} {piece}")
+        else:
+            commands[-1] += joiner + piece  # Part of the entity, e.g. "play rock and roll"
+    return commands
+
+
+class IntentMatcher:
+    """Pattern matcher returning a Match in FirstLayerDMM's Decision format, or None."""
+
+    def __init__(self, rules=None):
+        self.rules = rules or RULES
+
+    def match_command(self, command):
+        for rule in self.rules:
+            found = rule.pattern.match(command)
+            if not found:
+                continue
+            entity = (found.groupdict().get("e") or "").strip()
+            if "{e}" in rule.template and not entity:
+                return None
+            confidence = rule.confidence
+            if rule.max_words and len(entity.split()) > rule.max_words:
+                confidence *= 0.6  # Probably a sentence, not an app name or title
+            if entity and _QUESTION.search(entity) and not rule.template.startswith(("google", "youtube", "content", "generate")):
+                confidence *= 0.5  # A question hiding inside a command
+            if rule.apps_only and entity not in KNOWN_APPS:
+                confidence *= 0.6  # "close the deal", "kill all humans"
+            if rule.template.split(" ", 1)[0] in ("open", "close", "play") and entity in _PRONOUNS:
+                return None  # "close it": only the model can tell what "it" is
+            if rule.template.startswith("play") and entity.split(" ", 1)[0] in _PLAYER_WORDS:
+                return None  # "play the next song" controls the player, it names no song
+            return rule.template.format(e=entity, q=command), confidence
+        return None
+
+    def match(self, query):
+        text = _normalize(query)
+        if not text:
+            return None
+        commands = _split_commands(text)
+        if commands is None:
+            return None
+        decision, confidence = [], 1.0
+        for command in commands:
+            found = self.match_command(command)
+            if found is None:
+                return None  # One part needs the model, so the whole query does
+            decision.append(found[0])
+            confidence = min(confidence, found[1])
+        return Match(decision, confidence)
+
+
+class IntentRouter:
+    """
+    Drop-in replacement for FirstLayerDMM: tries the local matcher first and
+    calls classify(query, token=...) only when the match is missing or weak.
+    on_task is passed on to classify(); a local match returns the whole decision at once.
+    store=False is passed on too (speculative calls must not persist anything).
+    """
+
+    def __init__(self, classify, matcher=None, threshold=None, enabled=None):
+        self.classify = classify
+        self.matcher = matcher or IntentMatcher()
+        self.threshold = IntentConfidence if threshold is None else threshold
+        self.enabled = IntentFastPath if enabled is None else enabled
+        self._lock = threading.Lock()
+        self.fast = 0
+        self.model = 0
+        self._latency = {"fast": deque(maxlen=200), "model": deque(maxlen=200)}
+
+    def __call__(self, query, token=NEVER, on_task=None, store=True):
+        started = time.perf_counter()
+        if self.enabled:
+            match = self.matcher.match(query)
+            if match and match.confidence >= self.threshold:
+                self._record("fast", started)
+                return list(match.decision)
+        extra = {"on_task": on_task} if on_task else {}
+        if not store:
+            extra["store"] = False
+        decision = self.classify(query, token=token, **extra)
+        self._record("model", started)
+        return decision
+
+    def _record(self, path, started):
+        with self._lock:
+            if path == "fast":
+                self.fast += 1
+            else:
+                self.model += 1
+            self._latency[path].append(time.perf_counter() - started)
+
+    def stats(self):
+        """Fast-path hit rate and per-path latency (ms)."""
+        with self._lock:
+            total = self.fast + self.model
+            result = {"fast": self.fast, "model": self.model, "hit_rate": round(self.fast / total, 3) if total else 0.0}
+            for path, samples in self._latency.items():
+                ordered = sorted(samples)
+                result[f"{path}_ms_p50"] = round(ordered[len(ordered) // 2] * 1000, 3) if ordered else None
+                result[f"{path}_ms_p95"] = round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 3) if ordered else None
+            return result
+
+
+# === Benchmark ===
+SAMPLES = [
+    ("Open chrome.", ["open chrome"]),
+    ("Mute.", ["system mute"]),
+    ("Play let her go.", ["play let her go"]),
+    ("Open facebook, telegram and close whatsapp.", ["open facebook", "open telegram", "close whatsapp"]),
+    ("Please turn the volume up.", ["system volume up"]),
+    ("Can you open notepad and play believer?", ["open notepad", "play believer"]),
+    ("Search python decorators on google.", ["google search python decorators"]),
+    ("Search lofi beats on youtube.", ["youtube search lofi beats"]),
+    ("Generate an image of a lion in the snow.", ["generate image lion in the snow"]),
+    ("Write an application for sick leave.", ["content application for sick leave"]),
+    ("Play rock and roll.", ["play rock and roll"]),
+    ("What's the time?", ["general what's the time"]),
+    ("Bye jarvis.", ["exit"]),
+    ("Close notepad.", ["close notepad"]),
+    # These should go to the model
+    ("Who is the prime minister of india?", None),
+    ("Open chrome and tell me about mahatma gandhi.", None),
+    ("Tell me about facebook's recent update.", None),
+    ("Can you help me with this math problem?", None),
+    ("Quit smoking.", None),
+    ("Kill all humans.", None),
+    ("Close the deal with john.", None),
+    ("Launch the missiles at noon please.", None),
+    ("Close it.", None),
+    ("Write a song about rain and play it.", None),
+    ("Open whatsapp and message mom.", None),
+    ("Open file explorer and delete it.", None),
+    ("Play the next song.", None),
+]
+
+
+def Benchmark(rounds=2000):
+    router = IntentRouter(lambda query, token=NEVER: ["general " + query])
+    correct = wrong = 0
+    for query, expected in SAMPLES:
+        match = router.matcher.match(query)
+        routed = match.decision if match and match.confidence >= router.threshold else None
+        ok = routed == expected
+        correct += ok
+        wrong += not ok
+        print(f"{'ok ' if ok else 'BAD'} {query!r:50} -> {routed} ({match.confidence if match else '-'})")
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for query, _ in SAMPLES:
+            router.matcher.match(query)
+    per_query = (time.perf_counter() - started) / (rounds * len(SAMPLES))
+    print(f"{correct}/{len(SAMPLES)} routed as expected, {per_query * 1e6:.1f} us per query")
+
+
+if __name__ == "__main__":
+    if "--bench" in sys.argv:
+        Benchmark()
+    else:
+        print("Usage: python -m Backend.IntentMatcher --bench")
@@ -1,15 +1,22 @@
 import cohere  #Import the cohere module for AI services
 from rich import print  #import rich library to enhance terminal outputs
 from dotenv import dotenv_values 
+from Backend.Cancellation import NEVER  # Turn-wide cancellation (barge-in)
+import time
 
 
 env_vars = dotenv_values(".env")
 
 
 CohereAPIKey = env_vars.get("CohereAPIKey")
+CohereBaseURL = env_vars.get("CohereBaseURL")                        # Point at a stand-in server (Backend/DMMRegression.py)
+DMMPromptMode = env_vars.get("DMMPromptMode", "full")                # "full" or "compact" prompt
+DMMRetries = int(env_vars.get("DMMRetries", 2))                      # Extra attempts after a failed or unusable reply
+DMMBackoffSeconds = float(env_vars.get("DMMBackoffSeconds", 0.25))   # Doubles after every retry
+DMMDeadlineSeconds = float(env_vars.get("DMMDeadlineSeconds", 8))    # Whole classification, all attempts included
 
 
-co = cohere.Client(api_key=CohereAPIKey)
+co = cohere.Client(api_key=CohereAPIKey, base_url=CohereBaseURL) if CohereBaseURL else cohere.Client(api_key=CohereAPIKey)
 
 
 funcs = [
@@ -19,9 +26,6 @@ funcs = [
 ]
 
 
-messages = []
-
-
 preamble = """
 You are a very accurate Decision-Making Model, which decides what kind of a query is given to you.
 You will decide whether a query is a 'general' query, a 'realtime' query, or is asking to perform any task or automation like 'open facebook, instagram', 'can you write a application and open it in notepad'
@@ -58,56 +62,134 @@ ChatHistory = [
 ]
 
 
-def FirstLayerDMM(prompt: str = "test"):
-
-    messages.append({"role": "user", "content": f"{prompt}"})
-
-
-    stream = co.chat_stream(
-        model='command-r-plus',
-        message=prompt,
-        temperature=0.7,
-        chat_history=ChatHistory,
-        prompt_truncation='OFF',
-        connectors=[],
-        preamble=preamble
-    )
-
-
-    response = ""
-
-
-    for event in stream:
-        if event.event_type == "text-generation":
-            response += event.text
-    
-
-    response = response.replace("\n", "")
-    response = response.split(",")
-
-
-    response = [i.strip() for i in response]
-
-
-    temp = []
-
-
-    for task in response:
-        for func in funcs:
-            if task.startswith(func):
-                temp.append(task)
-            
-    
-
-
-    response = temp 
+# Same decision format in a fraction of the input tokens. Not the default:
+# switch only after python -m Backend.DMMRegression --live --gate passes
+# (the offline run measures latency only, not accuracy)
+CompactPreamble = """Classify the query. Do not answer it. Reply only with comma-separated tasks, each starting with one of:
+general (query) - chat or knowledge an LLM can answer, incomplete or pronoun-only questions, time/date questions
+realtime (query) - needs up-to-date info: news, current office holders, people, companies, recent events
+open (app or site), close (app), play (song), generate image (prompt), reminder (datetime message),
+system (mute|unmute|volume up|volume down), content (topic to write), google search (topic), youtube search (topic)
+exit - the user says goodbye
+Repeat the verb for every item: 'open chrome and firefox' -> 'open chrome, open firefox'. Never output the word '(query)'; put the user's words there. If unsure, use general."""
 
+CompactChatHistory = [
+    {"role": "User", "message": "open chrome and tell me about mahatma gandhi."},
+    {"role": "Chatbot", "message": "open chrome, general tell me about mahatma gandhi"},
+    {"role": "User", "message": "who is the prime minister of india and mute"},
+    {"role": "Chatbot", "message": "realtime who is the prime minister of india, system mute"},
+    {"role": "User", "message": "remind me at 11pm on 5th aug about my dance performance"},
+    {"role": "Chatbot", "message": "reminder 11:00pm 5th aug dance performance"},
+]
 
-    if "(query)" in response:
-        newresponse = FirstLayerDMM(prompt=prompt)
-        return newresponse
-    else:
-        return response
+PROMPTS = {
+    "full": (preamble, ChatHistory),
+    "compact": (CompactPreamble, CompactChatHistory),
+}
+
+
+class FallbackDecision(list):
+    """Decision made up when the model gave no usable reply; callers should not cache it."""
+
+    fallback = True
+
+
+class DecisionParser:
+    """Incremental parser for the model's comma-separated reply; complete tasks come out as soon as their comma arrives."""
+
+    def __init__(self):
+        self.buffer = ""
+        self.echoed = False  # The model repeated the "(query)" placeholder instead of the query
+
+    def _task(self, text):
+        task = text.replace("\n", "").strip()
+        if "(query)" in task:
+            self.echoed = True
+            return None
+        if any(task.startswith(func) for func in funcs):
+            return task
+        return None
+
+    def feed(self, text):
+        self.buffer += text
+        *complete, self.buffer = self.buffer.split(",")
+        return [task for task in map(self._task, complete) if task]
+
+    def close(self):
+        task, self.buffer = self._task(self.buffer), ""
+        return [task] if task else []
+
+
+def FirstLayerDMMStream(prompt: str = "test", token=NEVER, deadline=None, mode=None):
+    """
+    Yield each task of the decision as soon as it has been generated.
+    Failed or unusable replies are retried up to DMMRetries times with
+    exponential backoff; nothing is yielded after the deadline or once
+    token is cancelled.
+    """
+
+    deadline = deadline or time.monotonic() + DMMDeadlineSeconds
+    backoff = DMMBackoffSeconds
+    system_prompt, history = PROMPTS[mode or DMMPromptMode]
+
+    for attempt in range(DMMRetries + 1):
+        parser = DecisionParser()
+        emitted = 0
+        try:
+            stream = co.chat_stream(
+                model='command-r-plus',
+                message=prompt,
+                temperature=0.7,
+                chat_history=history,
+                prompt_truncation='OFF',
+                connectors=[],
+                preamble=system_prompt
+            )
+
+            for event in stream:
+                if token.cancelled or time.monotonic() >= deadline:
+                    return  # Turn was abandoned or out of time; stop reading the stream
+                if event.event_type == "text-generation":
+                    for task in parser.feed(event.text):
+                        emitted += 1
+                        yield task
+
+            for task in parser.close():
+                emitted += 1
+                yield task
+
+        except Exception as e:
+            if emitted:
+                return  # Part of the decision is already out; a retry would repeat it
+            print(f"[Model] Decision attempt {attempt + 1} failed: {e}")
+
+        if emitted:
+            return
+        if parser.echoed:
+            print(f"[Model] Decision attempt {attempt + 1} echoed the placeholder; retrying")
+        if attempt == DMMRetries or time.monotonic() + backoff >= deadline or token.wait(backoff):
+            return
+        backoff *= 2
+
+
+def FirstLayerDMM(prompt: str = "test", token=NEVER, on_task=None, mode=None):
+    """
+    Return the decision list for prompt. on_task(task) is called for each task
+    as soon as it is parsed, so dispatching can begin before the reply ends.
+    Falls back to treating the prompt as a general query.
+    """
+
+    response = []
+    for task in FirstLayerDMMStream(prompt, token=token, mode=mode):
+        response.append(task)
+        if on_task:
+            on_task(task)
+
+    if not response and not token.cancelled:
+        response = FallbackDecision([f"general {prompt}"])
+        if on_task:
+            on_task(response[0])
+    return response
 
 
 if __name__ == "__main__":
@@ -0,0 +1,289 @@
+# === Mp3Stream.py ===
+# Incremental playback of edge-tts audio. Communicate.stream() chunks are
+# cut on MP3 frame boundaries into short segments, and each segment is
+# decoded and queued on a mixer channel while the rest is still arriving.
+# No temp file is written, so time-to-first-audio no longer depends on
+# how long the utterance is.
+
+# === Imports ===
+import io
+import sys
+import time
+import queue
+import asyncio
+import threading
+from dotenv import dotenv_values
+
+# === Load Environment Variables ===
+env_vars = dotenv_values(".env")
+StreamFirstSegmentMs = int(env_vars.get("StreamFirstSegmentMs", 250))  # Small first segment for a fast start
+StreamSegmentMs = int(env_vars.get("StreamSegmentMs", 1000))           # Later segments are longer to limit seams
+
+# === MP3 Frame Parsing ===
+_BITRATES_V1_L3 = [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320]
+_BITRATES_V2_L3 = [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160]
+_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+
+def ParseFrameHeader(header: bytes):
+    """Return (frame_length, duration_seconds) for a Layer III frame header, or None if invalid."""
+    if len(header) < 4 or header[0] != 0xFF or (header[1] & 0xE0) != 0xE0:
+        return None
+    version = (header[1] >> 3) & 0x03
+    layer = (header[1] >> 1) & 0x03
+    bitrate_index = header[2] >> 4
+    rate_index = (header[2] >> 2) & 0x03
+    padding = (header[2] >> 1) & 0x01
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    sample_rate = _SAMPLE_RATES[version][rate_index]
+    if version == 3:
+        bitrate = _BITRATES_V1_L3[bitrate_index] * 1000
+        length = 144 * bitrate // sample_rate + padding
+        samples = 1152
+    else:
+        bitrate = _BITRATES_V2_L3[bitrate_index] * 1000
+        length = 72 * bitrate // sample_rate + padding
+        samples = 576
+    return length, samples / sample_rate
+
+
+class Mp3FrameSplitter:
+    """Accepts arbitrary byte chunks and yields whole MP3 frames with their durations."""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._skipped_id3 = False
+
+    def feed(self, data: bytes):
+        self._buffer += data
+        return list(self._frames())
+
+    def _frames(self):
+        buf = self._buffer
+        if not self._skipped_id3:
+            if len(buf) < 10:
+                return
+            if buf[:3] == b"ID3":
+                size = (buf[6] << 21) | (buf[7] << 14) | (buf[8] << 7) | buf[9]
+                if len(buf) < 10 + size:
+                    return
+                del buf[:10 + size]
+            self._skipped_id3 = True
+
+        while len(buf) >= 4:
+            parsed = ParseFrameHeader(bytes(buf[:4]))
+            if parsed is None:
+                sync = buf.find(b"\xff", 1)
+                del buf[:sync if sync != -1 else len(buf)]  # Resynchronize on the next candidate
+                continue
+            length, duration = parsed
+            if len(buf) < length:
+                return
+            yield bytes(buf[:length]), duration
+            del buf[:length]
+
+
+class SegmentBuilder:
+    """Groups frames into playable segments: a short first one, then longer ones."""
+
+    def __init__(self, first_ms=None, segment_ms=None):
+        self.first = (first_ms or StreamFirstSegmentMs) / 1000
+        self.later = (segment_ms or StreamSegmentMs) / 1000
+        self._frames = []
+        self._duration = 0.0
+        self._emitted = 0
+
+    def add(self, frame, duration):
+        self._frames.append(frame)
+        self._duration += duration
+        target = self.first if self._emitted == 0 else self.later
+        if self._duration >= target:
+            return self.flush()
+        return None
+
+    def flush(self):
+        if not self._frames:
+            return None
+        segment = b"".join(self._frames)
+        self._frames, self._duration = [], 0.0
+        self._emitted += 1
+        return segment
+
+
+# === Stream Clip ===
+class StreamClip:
+    """A clip whose audio segments are still being produced by the synthesis thread."""
+
+    END = None
+
+    def __init__(self):
+        self.segments = queue.Queue()
+        self.data = []  # Every segment produced, kept for the file-playback fallback
+        self.finished = threading.Event()
+        self.failed = False
+
+    def put(self, segment):
+        self.data.append(segment)
+        self.segments.put(segment)
+
+    def finish(self, failed=False):
+        self.failed = failed
+        self.segments.put(self.END)
+        self.finished.set()
+
+    def audio(self):
+        return b"".join(self.data)
+
+
+async def StreamSegments(chunks, clip, cancelled=lambda: False, first_ms=None, segment_ms=None):
+    """
+    Consume an async iterator of edge-tts stream items, push MP3 segments into
+    clip as they become playable and return the full audio bytes.
+    """
+    splitter = Mp3FrameSplitter()
+    builder = SegmentBuilder(first_ms, segment_ms)
+    audio = bytearray()
+    async for item in chunks:
+        if cancelled():
+            break
+        if item.get("type") != "audio":
+            continue
+        audio += item["data"]
+        for frame, duration in splitter.feed(item["data"]):
+            segment = builder.add(frame, duration)
+            if segment:
+                clip.put(segment)
+    tail = builder.flush()
+    if tail:
+        clip.put(tail)
+    return bytes(audio)
+
+
+# === Playback ===
+def PlayStreamClip(clip, mixer, active=lambda: True, on_first_audio=None, on_underrun=None):
+    """
+    Decode and queue segments on a reserved mixer channel as they arrive.
+    Returns False if the first segment could not be decoded (caller falls back to file playback).
+    """
+    channel = mixer.Channel(0)
+    started = False
+    starving = False
+    while True:
+        try:
+            segment = clip.segments.get(timeout=0.05)
+        except queue.Empty:
+            if not active():
+                channel.stop()
+                return True
+            if started and not starving and not channel.get_busy():
+                starving = True  # Playback ran dry before the next segment arrived
+                if on_underrun:
+                    on_underrun()
+            continue
+        starving = False
+        if segment is StreamClip.END:
+            break
+        try:
+            sound = mixer.Sound(file=io.BytesIO(segment))
+        except Exception as e:
+            if not started:
+                print(f"[Speech] Streaming decode unavailable, using file playback: {e}")
+                return False
+            continue  # Skip one undecodable segment mid-stream
+
+        while channel.get_busy() and channel.get_queue() is not None:
+            if not active():
+                channel.stop()
+                return True
+            time.sleep(0.01)
+        if channel.get_busy():
+            channel.queue(sound)
+        else:
+            channel.play(sound)
+        if not started:
+            started = True
+            if on_first_audio:
+                on_first_audio()
+
+    while channel.get_busy():
+        if not active():
+            channel.stop()
+            break
+        time.sleep(0.02)
+    return True
+
+
+# === Benchmark ===
+def _wait_until_busy(is_busy, timeout=10.0):
+    deadline = time.perf_counter() + timeout
+    while not is_busy():
+        if time.perf_counter() >= deadline:
+            return False
+        time.sleep(0.002)
+    return True
+
+
+def Benchmark(sentence_counts=(1, 4, 16)):
+    """
+    Time to first audible playback of save-then-play vs. streaming, with real
+    edge-tts synthesis and the pygame mixer. Audio counts as audible once the
+    mixer reports it busy; each measurement stops playback right after that.
+    """
+    import os
+    import tempfile
+    import pygame
+    import edge_tts
+
+    voice = env_vars.get("AssistantVoice") or "en-US-AriaNeural"
+    sentence = "This sentence makes the answer a little longer. "
+    pygame.mixer.init()
+    pygame.mixer.set_reserved(1)
+
+    print(f"{'sentences':>9} | {'file TTFA':>10} | {'stream TTFA':>11}")
+    for count in sentence_counts:
+        text = sentence * count
+
+        # File path: save the whole clip, then load and play it
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "speech.mp3")
+            start = time.perf_counter()
+            asyncio.run(edge_tts.Communicate(text, voice).save(path))
+            pygame.mixer.music.load(path)
+            pygame.mixer.music.play()
+            _wait_until_busy(pygame.mixer.music.get_busy)
+            file_ttfa = time.perf_counter() - start
+            pygame.mixer.music.stop()
+            pygame.mixer.music.unload()
+
+        # Streaming path: segments are played while the rest downloads
+        clip = StreamClip()
+        first = {}
+
+        def on_first_audio():
+            _wait_until_busy(pygame.mixer.Channel(0).get_busy)
+            first["t"] = time.perf_counter() - start
+
+        player = threading.Thread(
+            target=PlayStreamClip,
+            args=(clip, pygame.mixer),
+            kwargs={"active": lambda: "t" not in first, "on_first_audio": on_first_audio},
+        )
+        start = time.perf_counter()
+        player.start()
+        try:
+            asyncio.run(StreamSegments(edge_tts.Communicate(text, voice).stream(), clip, lambda: "t" in first))
+        finally:
+            clip.finish()
+            player.join()
+        stream_ttfa = f"{first['t'] * 1000:>9.0f}ms" if "t" in first else f"{'-':>11}"
+        print(f"{count:>9} | {file_ttfa * 1000:>8.0f}ms | {stream_ttfa}")
+    pygame.mixer.quit()
+
+
+if __name__ == "__main__":
+    if "--bench" in sys.argv:
+        Benchmark()
+    else:
+        print("Usage: python -m Backend.Mp3Stream --bench")
@@ -1,7 +1,10 @@
 # === Imports ===
 from googlesearch import search  # For Google-like search results
 from groq import Groq            # LLaMA-3 chat client via Groq API
-from json import load, dump      # For reading/writing chat log JSON
+from Backend.ChatLogStore import open_chat_log  # Append-only JSONL chat log
+from Backend.ContextWindow import GetContextManager, CountTokens  # Token-budgeted history window
+from Backend.Chatbot import SummarizeTurns, ChatLogTurn  # Shared rolling summary of old turns
+from Backend.Cancellation import NEVER  # Turn-wide cancellation (barge-in)
 import datetime                  # For real-time date/time info
 from dotenv import dotenv_values # To load environment variables from .env
 
@@ -19,14 +22,6 @@ System = f"""Hello, I am {Username}, You are a very accurate and advanced AI cha
 *** Provide Answers In a Professional Way, make sure to add full stops, commas, question marks, and use proper grammar.***
 *** Just answer the question from the provided data in a professional way. ***"""
 
-# === Initialize Chat History File ===
-try:
-    with open(r"Data\ChatLog.json", "r") as f:
-        messages = load(f)
-except:
-    with open(r"Data\ChatLog.json", "w") as f:
-        dump([], f)
-
 # === Google Search Helper ===
 def GoogleSearch(query):
     """Perform a Google-style search and return top 5 result titles + descriptions."""
@@ -67,50 +62,65 @@ def Information():
     )
 
 # === Main Function: AI with Web Search & Real-time Data ===
-def RealtimeSearchEngine(prompt):
-    """Main function that combines Google search + real-time data + Groq AI reply."""
-    global SystemChatBot, messages
-
-    # Load chat history
-    with open(r"Data\ChatLog.json", "r") as f:
-        messages = load(f)
+def RealtimeSearchEngineStream(prompt, chatlog_path=None, token=NEVER, search_results=None):
+    """
+    Combine Google search + real-time data + Groq AI reply, yielding text deltas as they arrive.
+    search_results can be passed in when the search was already done (Backend/SearchPrefetch.py).
+    If token is cancelled mid-stream the connection is closed and the partial reply is logged as truncated.
+    """
+
+    # Search result context for this request only
+    search_results = search_results or GoogleSearch(prompt)
+    search_context = [{"role": "system", "content": search_results}]
+    if token.cancelled:
+        return
+
+    # Recent history within the token budget left after the search results
+    chatlog = open_chat_log(chatlog_path)
+    messages = GetContextManager(chatlog, SummarizeTurns).build(reserve_tokens=CountTokens(search_results) // 2)
     
     # Append new user prompt
     messages.append({"role": "user", "content": prompt})
-    
-    # Temporarily add search result context
-    SystemChatBot.append({"role": "system", "content": GoogleSearch(prompt)})
 
     # Generate AI response using Groq
     completion = client.chat.completions.create(
         model="llama3-70b-8192",
-        messages=SystemChatBot + [{"role": "system", "content": Information()}] + messages,
+        messages=SystemChatBot + search_context + [{"role": "system", "content": Information()}] + messages,
         temperature=0.7,
         max_tokens=2048,
         top_p=1,
         stream=True,
         stop=None
     )
+    unregister = token.on_cancel(completion.close)  # Abort the blocked read on barge-in
 
-    # Collect the streamed reply
+    # Forward the streamed reply as it arrives
     Answer = ""
-    for chunk in completion:
-        if chunk.choices[0].delta.content:
-            Answer += chunk.choices[0].delta.content
-
-    # Clean and append assistant's response
-    Answer = Answer.strip().replace("<s>", "")
-    messages.append({"role": "assistant", "content": Answer})
-
-    # Save updated chat log
-    with open(r"Data\ChatLog.json", "w") as f:
-        dump(messages, f, indent=4)
-    
-    # Remove temporary Google search system message
-    SystemChatBot.pop()
-
-    # Return clean reply
-    return AnswerModifier(Answer)
+    try:
+        for chunk in completion:
+            if token.cancelled:
+                break
+            delta = chunk.choices[0].delta.content
+            if delta:
+                delta = delta.replace("<s>", "")
+                if not Answer:
+                    delta = delta.lstrip()
+                Answer += delta
+                yield delta
+    except Exception:
+        if not token.cancelled:
+            raise  # Closing the stream on cancel surfaces as a read error; anything else is real
+    finally:
+        unregister()
+
+    # Clean the reply and append both turns to the log in one write
+    Answer = Answer.strip()
+    if Answer or not token.cancelled:
+        chatlog.extend(ChatLogTurn(prompt, Answer, token))
+
+def RealtimeSearchEngine(prompt, chatlog_path=None):
+    """Return the complete reply for callers that don't stream."""
+    return AnswerModifier("".join(RealtimeSearchEngineStream(prompt, chatlog_path=chatlog_path)))
 
 # === Entry Point for CLI Testing ===
 if __name__ == "__main__":
@@ -0,0 +1,274 @@
+# === Recognizers.py ===
+# One interface for every speech-to-text backend. A recognizer streams
+# Hypothesis(text, is_final) values for a single utterance and can be
+# cancelled from another thread. A cancel sticks until reset(), so one that
+# lands just before stream() starts is not lost. Backends:
+#   chrome  - Web Speech page in headless Chrome (Backend/SpeechToText.py)
+#   google  - shared microphone capture + speech_recognition's recognize_google
+#   replay  - WAV replay in real time, for benchmarks; the transcript is the
+#             .txt next to each file, or recognize_google's with ReplayTranscribe
+# End-to-end turn latency over replayed audio: python -m Backend.TurnLatency
+
+# === Imports ===
+import os
+import time
+import wave
+import threading
+from typing import Iterator, NamedTuple, Optional, Protocol
+from dotenv import dotenv_values
+
+# === Load Environment Variables ===
+env_vars = dotenv_values(".env")
+SpeechBackend = env_vars.get("SpeechBackend", "chrome")               # Backend for user queries
+CommandSpeechBackend = env_vars.get("CommandSpeechBackend", "google")  # Wake word, passwords, confirmations
+ReplayDir = env_vars.get("ReplayDir", os.path.join("Data", "Replay"))  # WAV + .txt pairs for the replay backend
+ReplaySpeed = float(env_vars.get("ReplaySpeed", 1.0))                  # 1.0 = real time, 2.0 = twice as fast, 0 = no waiting
+ReplayTranscribe = env_vars.get("ReplayTranscribe", "False") == "True"  # Transcribe the audio with recognize_google instead of reading .txt
+
+
+# === Results and Errors ===
+class Hypothesis(NamedTuple):
+    text: str
+    is_final: bool
+
+
+class RecognitionError(Exception):
+    """Base class for recognizer failures."""
+
+
+class NoSpeechError(RecognitionError):
+    """Nothing was said before the timeout."""
+
+
+class UnintelligibleError(RecognitionError):
+    """Audio was captured but could not be transcribed."""
+
+
+class BackendUnavailableError(RecognitionError):
+    """The recognition service or device could not be reached."""
+
+
+# === Protocol ===
+class Recognizer(Protocol):
+    name: str
+
+    def stream(self, timeout: Optional[float] = None, phrase_time_limit: Optional[float] = None) -> Iterator[Hypothesis]:
+        """Yield partial hypotheses and finally one final hypothesis for the next utterance."""
+        ...
+
+    def cancel(self) -> None:
+        """Stop the utterance in progress (or the next one); stream() ends without a final hypothesis."""
+        ...
+
+    def reset(self) -> None:
+        """Clear an earlier cancel; call before subscribing to a new turn's token."""
+        ...
+
+
+def listen(recognizer, timeout=None, phrase_time_limit=None, on_partial=None):
+    """
+    Run one utterance through a recognizer and return the final text.
+    Returns "" if the recognizer was cancelled; raises RecognitionError subclasses otherwise.
+    """
+    for hypothesis in recognizer.stream(timeout=timeout, phrase_time_limit=phrase_time_limit):
+        if hypothesis.is_final:
+            return hypothesis.text
+        if on_partial:
+            on_partial(hypothesis.text)
+    if getattr(recognizer, "cancelled", False):
+        return ""
+    raise UnintelligibleError("utterance ended without a final transcript")
+
+
+# === Google (speech_recognition) Backend ===
+class GoogleRecognizer:
+    """
+    Shared microphone capture (Backend/AudioCapture.py) transcribed by recognize_google.
+    Only segments the voice-activity detector accepts as speech are sent.
+    """
+
+    name = "google"
+
+    def __init__(self):
+        import speech_recognition as sr
+        self._sr = sr
+        self._recognizer = sr.Recognizer()
+        self._reader = None
+        self.cancelled = False
+
+    def calibrate(self):
+        """Open the shared capture so the noise floor is being tracked before the first listen."""
+        from Backend.AudioCapture import GetAudioCapture
+        GetAudioCapture().start()
+
+    def stream(self, timeout=None, phrase_time_limit=None):
+        from Backend.AudioCapture import CaptureClosed, GetAudioCapture
+        from Backend.VoiceActivity import CaptureSegments
+        sr = self._sr
+        if self.cancelled:
+            return
+        try:
+            capture = GetAudioCapture().start()
+            self._reader = capture.reader()
+            if self.cancelled:
+                self._reader.close()  # cancel() ran before the reader existed
+            segments = CaptureSegments(capture, max_seconds=phrase_time_limit, start_timeout=timeout, reader=self._reader)
+            pcm = next(segments, None)
+            segments.close()
+            if pcm is None or self.cancelled:
+                return
+            audio = sr.AudioData(pcm, capture.SAMPLE_RATE, capture.SAMPLE_WIDTH)
+            text = self._recognizer.recognize_google(audio)
+        except CaptureClosed as e:
+            if self.cancelled:
+                return
+            raise BackendUnavailableError(str(e)) from e
+        except TimeoutError as e:
+            raise NoSpeechError(str(e)) from e
+        except sr.UnknownValueError as e:
+            raise UnintelligibleError("could not understand audio") from e
+        except sr.RequestError as e:
+            raise BackendUnavailableError(str(e)) from e
+        finally:
+            self._reader = None
+        if not self.cancelled:
+            yield Hypothesis(text, True)
+
+    def cancel(self):
+        self.cancelled = True
+        reader = self._reader
+        if reader:
+            reader.close()  # Ends the blocked segment wait
+
+    def reset(self):
+        self.cancelled = False
+
+
+# === WAV Replay Backend ===
+class WavReplayRecognizer:
+    """
+    Plays back recorded utterances in order: each stream() call consumes the
+    next WAV file and reports the transcript stored next to it (same name, .txt).
+    Partial hypotheses are released word by word over the audio's duration,
+    so latency measurements behave like a live microphone without needing one.
+    With transcribe=True the final text comes from recognize_google on the
+    recording, so the time after the audio ends is real recognition time.
+    audio_end_at and final_at (time.monotonic()) describe the last utterance.
+    """
+
+    name = "replay"
+
+    def __init__(self, paths=None, speed=None, loop=False, transcribe=None):
+        if paths is None:
+            paths = sorted(
+                os.path.join(ReplayDir, f) for f in os.listdir(ReplayDir) if f.lower().endswith(".wav")
+            ) if os.path.isdir(ReplayDir) else []
+        self.paths = list(paths)
+        self.speed = ReplaySpeed if speed is None else speed
+        self.loop = loop
+        self.transcribe = ReplayTranscribe if transcribe is None else transcribe
+        self.path = None  # Recording of the last utterance
+        self.audio_end_at = None
+        self.final_at = None
+        self._index = 0
+        self._cancel = threading.Event()
+        self.cancelled = False
+
+    @staticmethod
+    def duration(path):
+        with wave.open(path, "rb") as w:
+            return w.getnframes() / float(w.getframerate())
+
+    @staticmethod
+    def transcript(path):
+        try:
+            with open(os.path.splitext(path)[0] + ".txt", "r", encoding="utf-8") as f:
+                return f.read().strip()
+        except OSError:
+            return ""
+
+    @property
+    def remaining(self):
+        return len(self.paths) - self._index
+
+    def _next_path(self):
+        if self._index >= len(self.paths):
+            if not self.loop or not self.paths:
+                return None
+            self._index = 0
+        path = self.paths[self._index]
+        self._index += 1
+        return path
+
+    def stream(self, timeout=None, phrase_time_limit=None):
+        if self._cancel.is_set():
+            self.cancelled = True
+            return
+        path = self.path = self._next_path()
+        if path is None:
+            raise NoSpeechError("no more recordings to replay")
+
+        seconds = self.duration(path)
+        if phrase_time_limit:
+            seconds = min(seconds, phrase_time_limit)
+        words = self.transcript(path).split()
+        pace = 1 / self.speed if self.speed else 0
+        start = time.monotonic()
+        for i in range(1, len(words)):
+            # Word i is "heard" once its share of the recording has played
+            if self._wait_until(start + seconds * pace * i / len(words)):
+                return
+            yield Hypothesis(" ".join(words[:i]), False)
+        if self._wait_until(start + seconds * pace):
+            return
+        self.audio_end_at = time.monotonic()
+        text = self._recognize(path) if self.transcribe else " ".join(words)
+        if not text:
+            raise UnintelligibleError(f"no transcript for {os.path.basename(path)}")
+        self.final_at = time.monotonic()
+        yield Hypothesis(text, True)
+
+    def _recognize(self, path):
+        import speech_recognition as sr
+        recognizer = sr.Recognizer()
+        try:
+            with sr.AudioFile(path) as source:
+                return recognizer.recognize_google(recognizer.record(source))
+        except sr.UnknownValueError as e:
+            raise UnintelligibleError("could not understand audio") from e
+        except sr.RequestError as e:
+            raise BackendUnavailableError(str(e)) from e
+
+    def _wait_until(self, deadline):
+        """Sleep in replay time. Returns True if cancelled meanwhile."""
+        delay = deadline - time.monotonic()
+        if delay > 0 and self._cancel.wait(delay):
+            self.cancelled = True
+        return self.cancelled
+
+    def cancel(self):
+        self.cancelled = True
+        self._cancel.set()
+
+    def reset(self):
+        self._cancel.clear()
+        self.cancelled = False
+
+
+# === Factory ===
+def CreateRecognizer(kind=None, **options):
+    """Build a recognizer by name ("chrome", "google", "replay"); defaults to SpeechBackend."""
+    kind = (kind or SpeechBackend).lower()
+    if kind == "chrome":
+        from Backend.SpeechToText import ChromeWebSpeechRecognizer
+        return ChromeWebSpeechRecognizer(**options)
+    if kind == "google":
+        return GoogleRecognizer(**options)
+    if kind == "replay":
+        return WavReplayRecognizer(**options)
+    raise ValueError(f"Unknown speech backend: {kind}")
+
+
+def CreateCommandRecognizer(**options):
+    """Recognizer for short commands and answers (wake word, passwords, yes/no)."""
+    return CreateRecognizer(CommandSpeechBackend, **options)
@@ -0,0 +1,310 @@
+# === Scheduler.py ===
+# Priority job scheduler for everything the assistant does on behalf of the
+# user. Each job class (voice turns, automation, image generation, background
+# maintenance) has a priority and a concurrency limit; a small worker pool
+# always starts the highest-priority job whose class has room. Voice turns
+# keep a reserved worker, so a spoken command never queues behind a
+# long-running content or image job.
+# Benchmark: python -m Backend.Scheduler --bench
+
+# === Imports ===
+import sys
+import time
+import itertools
+import threading
+from collections import deque
+from typing import NamedTuple
+from dotenv import dotenv_values
+from Backend.Cancellation import CancellationToken
+
+# === Load Environment Variables ===
+env_vars = dotenv_values(".env")
+SchedulerWorkers = int(env_vars.get("SchedulerWorkers", 4))                   # Jobs running at once, all classes
+AutomationConcurrency = int(env_vars.get("AutomationConcurrency", 3))         # App control, content writing, searches
+ImageConcurrency = int(env_vars.get("ImageConcurrency", 1))                   # Image generation batches
+AutomationDeadlineSeconds = float(env_vars.get("AutomationDeadlineSeconds", 120))
+ImageDeadlineSeconds = float(env_vars.get("ImageDeadlineSeconds", 300))
+
+# === Job Classes ===
+VOICE = "voice"              # Listening to and answering the user
+AUTOMATION = "automation"    # Commands from the decision model (open, close, system, content, ...)
+IMAGE = "image"              # Image generation
+MAINTENANCE = "maintenance"  # Background housekeeping that nobody is waiting on
+
+
+class JobClass(NamedTuple):
+    name: str
+    priority: int      # Lower runs first
+    concurrency: int   # Most jobs of this class running at once
+    reserved: int = 0  # Workers other classes may not use
+
+
+JOB_CLASSES = {
+    VOICE: JobClass(VOICE, 0, 1, reserved=1),
+    AUTOMATION: JobClass(AUTOMATION, 1, AutomationConcurrency),
+    IMAGE: JobClass(IMAGE, 2, ImageConcurrency),
+    MAINTENANCE: JobClass(MAINTENANCE, 3, 1),
+}
+
+# Job states
+QUEUED, RUNNING, DONE, FAILED, CANCELLED, EXPIRED = "queued", "running", "done", "failed", "cancelled", "expired"
+
+
+class Job:
+    """
+    A submitted unit of work. fn(token) is called on a worker thread and should
+    return early once token is cancelled (by cancel() or by the deadline).
+    """
+
+    def __init__(self, job_class, fn, name, deadline):
+        self.id = None
+        self.job_class = job_class
+        self.fn = fn
+        self.name = name or getattr(fn, "__name__", "job")
+        self.deadline = deadline  # Absolute time.monotonic() value, or None
+        self.token = CancellationToken()
+        self.state = QUEUED
+        self.result = None
+        self.error = None
+        self.submitted_at = time.monotonic()
+        self.started_at = None
+        self.finished_at = None
+        self.done = threading.Event()
+        self._timer = None  # Deadline timer
+
+    def cancel(self, reason="cancelled"):
+        return self.token.cancel(reason)
+
+    def wait(self, timeout=None):
+        """Block until finished, failed, cancelled or expired. Returns True once it has."""
+        return self.done.wait(timeout)
+
+    @property
+    def wait_seconds(self):
+        """Time spent queued (so far, if the job has not started)."""
+        return (self.started_at or time.monotonic()) - self.submitted_at
+
+    def __repr__(self):
+        return f"<Job {self.id} {self.job_class}:{self.name} {self.state}>"
+
+
+class Scheduler:
+    """Fixed worker pool fed from one FIFO queue per job class."""
+
+    def __init__(self, workers=None, classes=None):
+        self.workers = workers or SchedulerWorkers
+        self.classes = dict(classes or JOB_CLASSES)
+        self._cond = threading.Condition()
+        self._queues = {name: deque() for name in self.classes}
+        self._running = {name: 0 for name in self.classes}
+        self._active = set()  # Running jobs
+        self._threads = []
+        self._ids = itertools.count(1)
+        self._closed = False
+        self._counts = {name: {DONE: 0, FAILED: 0, CANCELLED: 0, EXPIRED: 0} for name in self.classes}
+        self._waits = {name: deque(maxlen=200) for name in self.classes}
+
+    # --- Submission ---
+    def submit(self, job_class, fn, name=None, deadline=None):
+        """
+        Queue fn(token) as a job of the given class and return the Job.
+        deadline is in seconds from now; the job is dropped if it has not
+        started by then and its token is cancelled if it is still running.
+        """
+        if job_class not in self.classes:
+            raise ValueError(f"unknown job class: {job_class}")
+        job = Job(job_class, fn, name, time.monotonic() + deadline if deadline else None)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("scheduler is shut down")
+            job.id = next(self._ids)
+            self._queues[job_class].append(job)
+            self._start_workers()
+            self._cond.notify_all()
+        job.token.on_cancel(lambda: self._cancelled(job))
+        if deadline:
+            job._timer = threading.Timer(deadline, job.cancel, args=("deadline",))
+            job._timer.daemon = True
+            job._timer.start()
+        return job
+
+    def _start_workers(self):
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._worker, name=f"Scheduler-{len(self._threads) + 1}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def _cancelled(self, job):
+        """A queued job is finished as soon as it is cancelled; a running one is left to notice its token."""
+        with self._cond:
+            if job.state != QUEUED:
+                return
+            self._queues[job.job_class].remove(job)
+            state = EXPIRED if job.token.reason == "deadline" else CANCELLED
+        self._finish(job, state)
+
+    # --- Dispatch ---
+    def _admissible(self, job_class):
+        spec = self.classes[job_class]
+        if self._running[job_class] >= spec.concurrency:
+            return False
+        held_for_others = sum(
+            max(0, other.reserved - self._running[name])
+            for name, other in self.classes.items() if name != job_class
+        )
+        return sum(self._running.values()) < self.workers - held_for_others
+
+    def _next_job(self):
+        """Highest-priority queued job that may start now (caller holds the lock)."""
+        for spec in sorted(self.classes.values(), key=lambda c: c.priority):
+            if self._queues[spec.name] and self._admissible(spec.name):
+                return self._queues[spec.name].popleft()
+        return None
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        return
+                    job = self._next_job()
+                    if job:
+                        break
+                    self._cond.wait()
+                job.state = RUNNING
+                job.started_at = time.monotonic()
+                self._running[job.job_class] += 1
+                self._active.add(job)
+                self._waits[job.job_class].append(job.started_at - job.submitted_at)
+
+            try:
+                job.result = job.fn(job.token)
+                state = DONE
+            except Exception as e:
+                job.error = e
+                state = FAILED
+                print(f"[Scheduler] {job.job_class} job '{job.name}' failed: {e}")
+            if job.token.cancelled and state == DONE:
+                state = EXPIRED if job.token.reason == "deadline" else CANCELLED
+
+            with self._cond:
+                self._running[job.job_class] -= 1
+                self._active.discard(job)
+                self._cond.notify_all()
+            self._finish(job, state)
+
+    def _finish(self, job, state):
+        job.state = state
+        job.finished_at = time.monotonic()
+        with self._cond:
+            self._counts[job.job_class][state] += 1
+        if job._timer:
+            job._timer.cancel()
+        job.done.set()
+
+    # --- Control ---
+    def cancel_all(self, job_class=None, reason="cancelled"):
+        """Cancel queued and running jobs, optionally of one class only."""
+        with self._cond:
+            jobs = [job for name, queue in self._queues.items() if job_class in (None, name) for job in queue]
+            jobs += [job for job in self._active if job_class in (None, job.job_class)]
+        for job in jobs:
+            job.cancel(reason)
+        return len(jobs)
+
+    def shutdown(self):
+        self.cancel_all(reason="shutdown")
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    # --- Metrics ---
+    def stats(self):
+        """Per class: queue depth, running jobs, outcome counts and queue wait p50/p95 (ms)."""
+        with self._cond:
+            result = {}
+            for name in self.classes:
+                waits = sorted(self._waits[name])
+                result[name] = {
+                    "queued": len(self._queues[name]),
+                    "running": self._running[name],
+                    **self._counts[name],
+                    "wait_ms_p50": round(waits[len(waits) // 2] * 1000, 1) if waits else None,
+                    "wait_ms_p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))] * 1000, 1) if waits else None,
+                }
+            return result
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def GetScheduler():
+    """Return the process-wide scheduler."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = Scheduler()
+    return _scheduler
+
+
+# === Benchmark ===
+def Benchmark(content_seconds=2.0, turns=6):
+    """
+    A content-writing command followed by quick voice commands, e.g. "write an
+    essay" and then "volume up" x5. Compares how long the quick commands wait
+    behind one global lock (old Main) with the scheduler.
+    """
+    def quick(token):
+        time.sleep(0.02)
+
+    def content(token):
+        token.wait(content_seconds)
+
+    # Old behaviour: every turn, including the automation it triggers, runs under one lock
+    lock = threading.Lock()
+    waits = []
+
+    def old_turn(work):
+        submitted = time.monotonic()
+        with lock:
+            waits.append(time.monotonic() - submitted)
+            work(CancellationToken())
+
+    first = threading.Thread(target=old_turn, args=(content,))
+    first.start()
+    time.sleep(0.05)
+    others = [threading.Thread(target=old_turn, args=(quick,)) for _ in range(turns - 1)]
+    for thread in others:
+        thread.start()
+    for thread in [first] + others:
+        thread.join()
+    old_waits = sorted(waits[1:])
+
+    # Scheduler: the voice turn hands the content job to the automation class and returns
+    scheduler = Scheduler(workers=4)
+    scheduler.submit(VOICE, lambda token: scheduler.submit(AUTOMATION, content, "content", deadline=content_seconds * 5), "voice turn")
+    time.sleep(0.05)
+    turns_jobs = [scheduler.submit(VOICE, lambda token: scheduler.submit(AUTOMATION, quick, "volume up"), "voice turn") for _ in range(turns - 1)]
+    commands = []
+    for turn in turns_jobs:
+        turn.wait()
+        commands.append(turn.result)  # The automation job the turn submitted
+    for job in commands:
+        job.wait()
+    # Same measure as the lock case: from the user's turn starting to the command starting
+    new_waits = sorted(job.started_at - turn.submitted_at for turn, job in zip(turns_jobs, commands))
+
+    print(f"quick commands after a {content_seconds:.0f} s content job (turn start to command start):")
+    print(f"global lock: max wait {old_waits[-1] * 1000:.0f} ms, median {old_waits[len(old_waits) // 2] * 1000:.0f} ms")
+    print(f"scheduler:   max wait {new_waits[-1] * 1000:.0f} ms, median {new_waits[len(new_waits) // 2] * 1000:.0f} ms")
+    time.sleep(content_seconds)
+    print(scheduler.stats())
+    scheduler.shutdown()
+
+
+if __name__ == "__main__":
+    if "--bench" in sys.argv:
+        Benchmark()
+    else:
+        print("Usage: python -m Backend.Scheduler --bench")
@@ -0,0 +1,143 @@
+# === SearchPrefetch.py ===
+# Starts the web search for a query while the decision model is still
+# classifying it. A cheap local heuristic guesses whether the query needs
+# up-to-date information; if the answer path later needs search results for
+# the same question, the prefetched ones are used instead of searching again.
+
+# === Imports ===
+import re
+import time
+import threading
+from dotenv import dotenv_values
+from Backend.Cancellation import NEVER
+
+# === Load Environment Variables ===
+env_vars = dotenv_values(".env")
+SearchPrefetchEnabled = env_vars.get("SearchPrefetch", "True") == "True"
+SearchPrefetchOverlap = float(env_vars.get("SearchPrefetchOverlap", 0.8))  # Share of the final prompt's words the prefetch must cover
+
+_REALTIME_WORDS = re.compile(
+    r"\b(?:news|today|today's|tonight|latest|current|currently|recent|recently|now|this (?:week|month|year)|yesterday"
+    r"|weather|forecast|price|prices|stock|score|scores|match|election|headlines?|trending|released?|update|updates)\b"
+)
+_REALTIME_PHRASES = re.compile(
+    r"^(?:who(?:'s| is| are| was| won)|what happened|tell me about|what(?:'s| is) (?:the )?(?:status|net ?worth|population))\b"
+)
+_COMMAND = re.compile(r"^(?:open|close|play|mute|unmute|volume|write|generate|search|google|youtube|remind|set a reminder)\b")
+_WORD = re.compile(r"[a-z0-9']+")
+
+
+def LooksRealtime(query: str) -> bool:
+    """Cheap guess that a query needs fresh search results (news, dates, people, places)."""
+    text = (query or "").strip()
+    lowered = text.lower().rstrip(".?!")
+    if not lowered or _COMMAND.match(lowered):
+        return False
+    if _REALTIME_WORDS.search(lowered) or _REALTIME_PHRASES.match(lowered):
+        return True
+    # Proper nouns, when the transcript kept capitalization past the first word
+    return any(word[:1].isupper() for word in text.split()[1:] if word.lower() not in ("i", "i'm", "i've", "i'll"))
+
+
+def _words(text):
+    return set(_WORD.findall((text or "").lower()))
+
+
+class _Prefetch:
+    def __init__(self, query):
+        self.query = query
+        self.words = _words(query)
+        self.started_at = time.monotonic()
+        self.finished_at = None
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SearchPrefetcher:
+    """start() a search for the raw query, then consume() or cancel() it once the decision is known."""
+
+    def __init__(self, search, enabled=None):
+        self.search = search
+        self.enabled = SearchPrefetchEnabled if enabled is None else enabled
+        self._lock = threading.Lock()
+        self._current = None
+        self.launched = 0
+        self.consumed = 0
+        self.wasted = 0
+        self.saved_seconds = 0.0
+        self.wasted_seconds = 0.0
+
+    def start(self, query):
+        """Begin a background search if the query looks realtime. Returns True if one was started."""
+        if not self.enabled or not LooksRealtime(query):
+            return False
+        prefetch = _Prefetch(query)
+        with self._lock:
+            previous, self._current = self._current, prefetch
+            self.launched += 1
+        self._discard(previous)
+        threading.Thread(target=self._run, args=(prefetch,), daemon=True).start()
+        return True
+
+    def _run(self, prefetch):
+        try:
+            prefetch.result = self.search(prefetch.query)
+        except Exception as e:
+            prefetch.error = e
+        finally:
+            prefetch.finished_at = time.monotonic()
+            prefetch.done.set()
+
+    def consume(self, prompt, token=NEVER):
+        """
+        Return prefetched results covering prompt, waiting for the search to
+        finish if needed; None if there is no usable prefetch (the caller then
+        searches itself).
+        """
+        with self._lock:
+            prefetch, self._current = self._current, None
+        if prefetch is None:
+            return None
+        wanted = _words(prompt)
+        if not wanted or len(wanted & prefetch.words) / len(wanted) < SearchPrefetchOverlap:
+            self._discard(prefetch)
+            return None
+
+        asked_at = time.monotonic()
+        while not prefetch.done.wait(0.05):
+            if token.cancelled:
+                self._discard(prefetch)
+                return None
+        if prefetch.error is not None or not prefetch.result:
+            self._discard(prefetch)
+            return None
+        with self._lock:
+            self.consumed += 1
+            # Search time that overlapped classification
+            self.saved_seconds += min(asked_at, prefetch.finished_at) - prefetch.started_at
+        return prefetch.result
+
+    def cancel(self):
+        """The decision did not need a search; drop the prefetch (an in-flight request finishes unused)."""
+        with self._lock:
+            prefetch, self._current = self._current, None
+        self._discard(prefetch)
+
+    def _discard(self, prefetch):
+        if prefetch is None:
+            return
+        elapsed = (prefetch.finished_at or time.monotonic()) - prefetch.started_at
+        with self._lock:
+            self.wasted += 1
+            self.wasted_seconds += elapsed
+
+    def stats(self):
+        with self._lock:
+            return {
+                "launched": self.launched,
+                "consumed": self.consumed,
+                "wasted": self.wasted,
+                "saved_s": round(self.saved_seconds, 2),
+                "wasted_search_s": round(self.wasted_seconds, 2),
+            }
@@ -0,0 +1,160 @@
+# === SpeculativeIntent.py ===
+# Starts intent classification (FirstLayerDMM) on interim transcripts while
+# the user is still speaking. Once an interim has stayed unchanged for a
+# short while it is classified in the background; if the final transcript
+# turns out to be the same text, that result is reused instead of paying
+# for a second model round trip.
+
+# === Imports ===
+import re
+import time
+import threading
+from dotenv import dotenv_values
+from Backend.Cancellation import CancellationToken, NEVER
+
+# === Load Environment Variables ===
+env_vars = dotenv_values(".env")
+SpeculativeDMM = env_vars.get("SpeculativeDMM", "True") == "True"         # Classify stable interims early
+SpeculationStableMs = int(env_vars.get("SpeculationStableMs", 350))       # Interim must be unchanged this long
+SpeculationMinWords = int(env_vars.get("SpeculationMinWords", 2))         # Ignore one-word fragments
+
+
+def NormalizeQuery(text: str) -> str:
+    """Compare transcripts without case, spacing or trailing punctuation."""
+    return re.sub(r"\s+", " ", (text or "").lower()).strip().rstrip(".?!").strip()
+
+
+class _Speculation:
+    def __init__(self, key, query):
+        self.key = key
+        self.query = query
+        self.started_at = time.monotonic()
+        self.finished_at = None
+        self.done = threading.Event()
+        self.token = CancellationToken()  # Tripped when superseded or discarded
+        self.result = None
+        self.error = None
+
+    @property
+    def cancelled(self):
+        return self.token.cancelled
+
+
+class SpeculativeClassifier:
+    """
+    observe() each interim transcript, then resolve() the final one.
+    classify(query, token=...) is the expensive call and should stop early once
+    the token is cancelled; prepare(text) turns a raw transcript into the query
+    string classify() would be given. Speculative calls pass store=False so
+    fragments are never persisted; commit(query) is called for a speculation
+    the final transcript actually reused.
+    """
+
+    def __init__(self, classify, prepare=lambda text: text, stable_ms=None, min_words=None, enabled=None, commit=None):
+        self.classify = classify
+        self.prepare = prepare
+        self.commit = commit
+        self.stable = (stable_ms if stable_ms is not None else SpeculationStableMs) / 1000
+        self.min_words = min_words if min_words is not None else SpeculationMinWords
+        self.enabled = SpeculativeDMM if enabled is None else enabled
+        self._lock = threading.Lock()
+        self._timer = None
+        self._current = None  # Latest speculation for this utterance
+        self.hits = 0
+        self.misses = 0
+        self.launched = 0
+        self.saved_seconds = 0.0
+
+    # --- Interim side ---
+    def observe(self, text):
+        """Note an interim transcript; classification starts once it stops changing."""
+        if not self.enabled or len(text.split()) < self.min_words:
+            return
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.stable, self._launch, args=(text,))
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _launch(self, text):
+        key = NormalizeQuery(text)
+        with self._lock:
+            if self._current and self._current.key == key:
+                return  # Already classifying this exact text
+            if self._current:
+                self._current.token.cancel("superseded")  # Its result would be discarded anyway
+            speculation = self._current = _Speculation(key, self.prepare(text))
+            self.launched += 1
+        threading.Thread(target=self._run, args=(speculation,), daemon=True).start()
+
+    def _run(self, speculation):
+        try:
+            speculation.result = self.classify(speculation.query, token=speculation.token, store=False)
+        except Exception as e:
+            speculation.error = e
+        finally:
+            speculation.finished_at = time.monotonic()
+            speculation.done.set()
+
+    # --- Final side ---
+    def reset(self):
+        """Forget the current utterance (call before listening for a new one)."""
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+            if self._current:
+                self._current.token.cancel("reset")
+            self._current = None
+
+    def resolve(self, query, timeout=None, token=NEVER, on_task=None):
+        """
+        Return (decision, was_hit) for the final query. A matching speculation is
+        awaited and reused; anything else is discarded and query is classified now,
+        with on_task(task) called for each task as it streams in.
+        Cancelling token abandons the wait and the classification.
+        """
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+            speculation, self._current = self._current, None
+
+        if speculation and speculation.key == NormalizeQuery(query) and not speculation.cancelled:
+            waited_from = time.monotonic()
+            deadline = None if timeout is None else waited_from + timeout
+            while not speculation.done.wait(0.05):
+                if token.cancelled:
+                    speculation.token.cancel("turn cancelled")
+                    break
+                if deadline is not None and time.monotonic() >= deadline:
+                    break
+            if speculation.done.is_set() and not speculation.cancelled and speculation.error is None and speculation.result:
+                with self._lock:
+                    self.hits += 1
+                    # Classification time that overlapped the user's speech
+                    self.saved_seconds += min(waited_from, speculation.finished_at) - speculation.started_at
+                if self.commit:
+                    self.commit(speculation.query)
+                return speculation.result, True
+
+        if speculation:
+            speculation.token.cancel("discarded")
+        if token.cancelled:
+            return [], False
+        with self._lock:
+            self.misses += 1
+        return self.classify(query, token=token, **({"on_task": on_task} if on_task else {})), False
+
+    def stats(self):
+        with self._lock:
+            resolved = self.hits + self.misses
+            return {
+                "launched": self.launched,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / resolved if resolved else 0.0,
+                "wasted": self.launched - self.hits,
+                "saved_s": round(self.saved_seconds, 2),
+            }
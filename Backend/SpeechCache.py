@@ -0,0 +1,180 @@
+# === SpeechCache.py ===
+# Content-addressed on-disk cache of synthesized speech clips.
+# Clips are keyed by (text, voice, pitch, rate), verified by SHA-256 on
+# read and evicted least-recently-used once the cache exceeds its size cap.
+
+# === Imports ===
+import os
+import json
+import time
+import atexit
+import hashlib
+import threading
+from collections import Counter
+from dotenv import dotenv_values
+from Backend.ChatLogStore import atomic_write
+
+# === Load Environment Variables ===
+env_vars = dotenv_values(".env")
+TTSCacheDir = env_vars.get("TTSCacheDir", os.path.join("Data", "TTSCache"))
+TTSCacheMaxMB = float(env_vars.get("TTSCacheMaxMB", 50))
+TTSCacheMaxChars = int(env_vars.get("TTSCacheMaxChars", 200))  # Longer texts are not worth caching
+TTSCacheIndexSaveSeconds = float(env_vars.get("TTSCacheIndexSaveSeconds", 5))  # Cache hits persist their LRU time at most this often
+
+
+def CacheKey(text, voice, pitch, rate):
+    raw = json.dumps([text.strip(), voice or "", pitch or "", rate or ""], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(65536), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class SpeechCache:
+    """LRU, size-bounded cache of audio files with an index.json manifest."""
+
+    def __init__(self, directory=None, max_bytes=None):
+        self.directory = directory or TTSCacheDir
+        self.max_bytes = int(max_bytes if max_bytes is not None else TTSCacheMaxMB * 1024 * 1024)
+        self.index_path = os.path.join(self.directory, "index.json")
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._checked_out = Counter()  # Keys of clips handed out and not yet released
+        self._dirty = False
+        self._saved_at = 0.0
+        os.makedirs(self.directory, exist_ok=True)
+        self._index = self._load_index()
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            return index if isinstance(index, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self):
+        atomic_write(self.index_path, json.dumps(self._index, ensure_ascii=False).encode("utf-8"))
+        self._dirty = False
+        self._saved_at = time.monotonic()
+
+    def flush(self):
+        """Write pending LRU updates to index.json."""
+        with self._lock:
+            if self._dirty:
+                self._save_index()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.mp3")
+
+    def cacheable(self, text):
+        return 0 < len(text.strip()) <= TTSCacheMaxChars
+
+    def get(self, text, voice, pitch, rate):
+        """
+        Return the path of a verified cached clip, or None.
+        The clip is checked out and will not be evicted until release(path).
+        """
+        key = CacheKey(text, voice, pitch, rate)
+        with self._lock:
+            entry = self._index.get(key)
+            path = self._path(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            try:
+                valid = os.path.getsize(path) == entry["size"] and _sha256_file(path) == entry["sha256"]
+            except OSError:
+                valid = False
+            if not valid:
+                print(f"[SpeechCache] Dropping corrupt clip for: {entry.get('text', '')[:40]}")
+                self._drop(key)
+                self._save_index()
+                self.misses += 1
+                return None
+            entry["last_used"] = time.time()
+            self._checked_out[key] += 1
+            self.hits += 1
+            self._dirty = True
+            if time.monotonic() - self._saved_at >= TTSCacheIndexSaveSeconds:
+                self._save_index()
+            return path
+
+    def release(self, path):
+        """Hand back a clip from get() or put(checkout=True); other paths are ignored."""
+        if os.path.dirname(os.path.abspath(path)) != os.path.abspath(self.directory):
+            return
+        key = os.path.splitext(os.path.basename(path))[0]
+        with self._lock:
+            if self._checked_out[key] > 0:
+                self._checked_out[key] -= 1
+                if not self._checked_out[key]:
+                    del self._checked_out[key]
+
+    def put(self, text, voice, pitch, rate, source_path, checkout=False):
+        """Move a freshly synthesized file into the cache and return its cached path."""
+        key = CacheKey(text, voice, pitch, rate)
+        path = self._path(key)
+        size = os.path.getsize(source_path)
+        sha = _sha256_file(source_path)
+        if size == 0:
+            raise ValueError("refusing to cache an empty clip")
+        os.replace(source_path, path)
+        with self._lock:
+            self._index[key] = {
+                "text": text.strip(), "voice": voice, "pitch": pitch, "rate": rate,
+                "size": size, "sha256": sha, "last_used": time.time(),
+            }
+            if checkout:
+                self._checked_out[key] += 1
+            self._evict(keep=key)
+            self._save_index()
+        return path
+
+    def _drop(self, key):
+        self._index.pop(key, None)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _evict(self, keep=None):
+        total = sum(entry["size"] for entry in self._index.values())
+        for key, entry in sorted(self._index.items(), key=lambda item: item[1]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            if key == keep or key in self._checked_out:
+                continue  # Still being played
+            total -= entry["size"]
+            self._drop(key)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._index),
+                "bytes": sum(entry["size"] for entry in self._index.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def GetSpeechCache():
+    """Return the shared cache instance."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SpeechCache()
+            atexit.register(_cache.flush)
+    return _cache
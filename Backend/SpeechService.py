@@ -0,0 +1,560 @@
+# === SpeechService.py ===
+# One long-lived speech output service shared by every part of the app.
+# A synthesis thread renders queued utterances ahead of playback and a
+# player thread owns a persistent pygame mixer, so nothing re-initializes
+# the audio device or fights over a shared output file.
+
+# === Imports ===
+import os
+import heapq
+import queue
+import io
+import asyncio
+import itertools
+import tempfile
+import threading
+from time import monotonic
+import pygame
+import edge_tts
+from dotenv import dotenv_values
+from Backend.SpeechCache import GetSpeechCache
+from Backend.Mp3Stream import StreamClip, StreamSegments, PlayStreamClip
+
+# === Load Environment Variables ===
+env_vars = dotenv_values(".env")
+AssistantVoice = env_vars.get("AssistantVoice")  # Voice name for the assistant
+TTSLookAhead = int(env_vars.get("TTSLookAhead", 2))  # Chunks synthesized ahead of playback
+TTSPrewarmPhrases = env_vars.get("TTSPrewarmPhrases", "")  # Extra "|"-separated phrases cached at startup
+TTSStreaming = env_vars.get("TTSStreaming", "True") == "True"  # Play edge-tts audio while it downloads
+
+DEFAULT_PITCH = '+5Hz'
+DEFAULT_RATE = '+13%'
+
+# === Priorities (lower plays first) ===
+URGENT = 0   # Prompts the user must hear next: wake acknowledgement, auth prompts, UI sounds
+NORMAL = 1   # Answers
+LOW = 2      # Background announcements
+
+# Fixed phrases spoken by the assistant, as (text, voice, pitch, rate)
+PREWARM_PHRASES = [
+    ("Hello!! How can I assist you?", "en-CA-LiamNeural", "+0Hz", "+0%"),
+    ("Okay, I will stop listening now.", "en-CA-LiamNeural", "+0Hz", "+0%"),
+    ("Generating images. Please wait...", None, DEFAULT_PITCH, DEFAULT_RATE),
+    ("Please login to use image generation.", None, DEFAULT_PITCH, DEFAULT_RATE),
+    ("Wake word listening stopped. You can manually turn on the microphone anytime.", None, DEFAULT_PITCH, DEFAULT_RATE),
+    ("Say your password after beep", None, "+0Hz", "+0%"),
+    ("Please say your password after beep", None, "+0Hz", "+0%"),
+    ("Please try again", None, "+0Hz", "+0%"),
+    ("Try again", None, "+0Hz", "+0%"),
+]
+
+_END = object()
+
+
+# === Synthesis ===
+async def TextToAudioFile(text: str, file_path: str, voice=None, pitch=DEFAULT_PITCH, rate=DEFAULT_RATE) -> None:
+    """Create a speech MP3 from text using edge-tts."""
+    if os.path.exists(file_path):
+        os.remove(file_path)
+    communicate = edge_tts.Communicate(text, voice or AssistantVoice, pitch=pitch, rate=rate)
+    await communicate.save(file_path)
+
+
+def _remove_quietly(file_path):
+    try:
+        os.remove(file_path)
+    except OSError:
+        pass
+
+
+def _release_clip(clip):
+    """Delete a temporary clip after use, or hand a cached one back to the cache."""
+    if isinstance(clip, StreamClip):
+        return
+    file_path, temporary = clip
+    if temporary:
+        _remove_quietly(file_path)
+    else:
+        GetSpeechCache().release(file_path)
+
+
+def SynthesizeClip(text: str, voice=None, pitch=DEFAULT_PITCH, rate=DEFAULT_RATE):
+    """
+    Return (file_path, is_temporary) for the spoken text.
+    Short texts are served from, and added to, the speech cache.
+    """
+    voice = voice or AssistantVoice
+    cache = GetSpeechCache()
+    cacheable = cache.cacheable(text)
+    if cacheable:
+        cached_path = cache.get(text, voice, pitch, rate)
+        if cached_path:
+            return cached_path, False
+
+    fd, file_path = tempfile.mkstemp(prefix="speech_", suffix=".mp3", dir="Data")
+    os.close(fd)
+    try:
+        asyncio.run(TextToAudioFile(text, file_path, voice, pitch, rate))
+    except Exception:
+        _remove_quietly(file_path)
+        raise
+
+    if cacheable:
+        try:
+            return cache.put(text, voice, pitch, rate, file_path, checkout=True), False
+        except (OSError, ValueError) as e:
+            print(f"[SpeechCache] Could not cache clip: {e}")
+    return file_path, True
+
+
+def _cache_audio(text, voice, pitch, rate, audio: bytes):
+    """Store streamed audio in the speech cache after playback data is complete."""
+    fd, file_path = tempfile.mkstemp(prefix="speech_", suffix=".mp3", dir="Data")
+    with os.fdopen(fd, "wb") as f:
+        f.write(audio)
+    try:
+        GetSpeechCache().put(text, voice or AssistantVoice, pitch, rate, file_path)
+    except (OSError, ValueError) as e:
+        _remove_quietly(file_path)
+        print(f"[SpeechCache] Could not cache clip: {e}")
+
+
+def SplitIntoChunks(text: str, max_length: int = 300):
+    """Split long text into chunks of at most max_length characters, preferring sentence ends."""
+    chunks = []
+
+    remaining_text = text.strip()
+    while len(remaining_text) > max_length:
+        split_idx = remaining_text.rfind('.', 0, max_length)
+        if split_idx == -1:
+            split_idx = max_length
+        chunk = remaining_text[:split_idx + 1].strip()
+        chunks.append(chunk)
+        remaining_text = remaining_text[split_idx + 1:].strip()
+
+    if remaining_text:
+        chunks.append(remaining_text)
+    return chunks
+
+
+# === Utterance ===
+class Utterance:
+    """
+    A unit of speech output. Text can be fed incrementally until close().
+    interrupt_check() returning False, or cancel(), stops playback and drops
+    pending synthesis.
+    """
+
+    def __init__(self, priority=NORMAL, interrupt_check=None, voice=None, pitch=DEFAULT_PITCH, rate=DEFAULT_RATE, lookahead=None):
+        self.priority = priority
+        self.interrupt_check = interrupt_check or (lambda: True)
+        self.voice, self.pitch, self.rate = voice, pitch, rate
+        self.texts = queue.Queue()
+        self.clips = queue.Queue(maxsize=max(1, lookahead or TTSLookAhead))
+        self.cancelled = threading.Event()
+        self.synthesized = threading.Event()  # Synthesis thread has moved past this utterance
+        self.done = threading.Event()
+        self.submitted_at = monotonic()
+        self.first_audio_at = None
+
+    def feed(self, text: str):
+        """Queue text for synthesis; returns immediately."""
+        if text and text.strip() and not self.cancelled.is_set():
+            for chunk in SplitIntoChunks(text):
+                self.texts.put(chunk)
+
+    def close(self):
+        """Signal that no more text will be fed."""
+        self.texts.put(_END)
+
+    def cancel(self):
+        """Stop playback and discard queued and in-flight synthesis."""
+        self.cancelled.set()
+        self.texts.put(_END)  # Unblock the synthesis thread
+        self._drain_clips()
+
+    def _drain_clips(self):
+        while True:
+            try:
+                clip = self.clips.get_nowait()
+            except queue.Empty:
+                return
+            if clip is not _END:
+                _release_clip(clip)
+
+    def active(self):
+        return not self.cancelled.is_set() and self.interrupt_check()
+
+    def wait(self, timeout=None):
+        """Block until played, cancelled or timed out. Returns True once finished."""
+        return self.done.wait(timeout)
+
+
+# === Service ===
+class SpeechService:
+    """Owns the mixer and a prioritized queue of utterances."""
+
+    def __init__(self, lookahead=None):
+        self.lookahead = lookahead or TTSLookAhead
+        self.streaming = TTSStreaming
+        self._cond = threading.Condition()
+        self._pending = []  # Heap of (priority, seq, utterance) not yet picked up for synthesis
+        self._seq = itertools.count()
+        self._play_queue = queue.Queue()
+        self._preempt = queue.Queue()  # Higher-priority utterances to slot in between the current one's clips
+        self._threads = []
+        self._started = False
+        self._closed = False
+        self._current = None
+        self._live = set()  # Submitted and not yet finished
+        self._ttfa = []
+        self._underruns = 0
+        self._completed = 0
+        self._preemptions = 0
+
+    # --- Lifecycle ---
+    def start(self):
+        with self._cond:
+            if self._started:
+                return
+            self._started = True
+        for target, name in ((self._synth_loop, "SpeechSynth"), (self._play_loop, "SpeechPlayer")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def shutdown(self):
+        """Cancel everything, stop the threads and release the mixer. Later utterances finish unplayed."""
+        self.cancel_all()
+        with self._cond:
+            self._closed = True
+            heapq.heappush(self._pending, (-1, next(self._seq), None))
+            self._cond.notify_all()
+
+    # --- Submission ---
+    def submit(self, utterance):
+        self.start()
+        with self._cond:
+            if self._closed:
+                utterance.cancel()
+                utterance.done.set()  # Nothing will play it; don't leave wait() hanging
+                return utterance
+            self._live.add(utterance)
+            heapq.heappush(self._pending, (utterance.priority, next(self._seq), utterance))
+            self._cond.notify_all()
+        return utterance
+
+    def say(self, text, priority=NORMAL, interrupt_check=None, **voice_options):
+        """Queue text to be spoken and return its Utterance."""
+        utterance = Utterance(priority, interrupt_check, lookahead=self.lookahead, **voice_options)
+        utterance.feed(text)
+        utterance.close()
+        return self.submit(utterance)
+
+    def open_stream(self, priority=NORMAL, interrupt_check=None, **voice_options):
+        """Return a submitted Utterance to feed() sentences into as they are produced; close() when done."""
+        return self.submit(Utterance(priority, interrupt_check, lookahead=self.lookahead, **voice_options))
+
+    def play_file(self, file_path, priority=URGENT, interrupt_check=None):
+        """Queue an existing audio file (chimes, beeps) through the same mixer."""
+        utterance = Utterance(priority, interrupt_check, lookahead=self.lookahead)
+        utterance.clips.put((file_path, False))
+        utterance.close()
+        return self.submit(utterance)
+
+    def cancel_all(self):
+        with self._cond:
+            live = list(self._live)
+        for utterance in live:
+            utterance.cancel()
+
+    # --- Synthesis thread ---
+    def _synth_loop(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending)
+                _, _, utterance = heapq.heappop(self._pending)
+                if utterance is None:
+                    self._release_pending()
+            if utterance is None:
+                self._play_queue.put(None)
+                return
+
+            self._play_queue.put(utterance)
+            self._synthesize_all(utterance, preemptible=True)
+
+    def _release_pending(self):
+        """On shutdown: finish everything still queued, unplayed, so no wait() hangs. Called with _cond held."""
+        while self._pending:
+            _, _, utterance = heapq.heappop(self._pending)
+            if utterance is None:
+                continue
+            utterance.cancel()
+            utterance.synthesized.set()
+            self._live.discard(utterance)
+            utterance.done.set()
+
+    def _synthesize_all(self, utterance, preemptible=False):
+        """
+        Synthesize an utterance until it is closed or cancelled. While a
+        preemptible one waits for text (a streamed answer between sentences),
+        higher-priority utterances submitted meanwhile are synthesized for the
+        player to slot in.
+        """
+        try:
+            while True:
+                text = self._next_text(utterance, preemptible)
+                if text is _END or utterance.cancelled.is_set():
+                    break
+                if not self._synthesize_into(utterance, text, preemptible):
+                    break
+            self._put_clip(utterance, _END, preemptible)
+        finally:
+            utterance.synthesized.set()
+
+    def _next_text(self, utterance, preemptible):
+        while True:
+            try:
+                return utterance.texts.get(timeout=0.05 if preemptible else None)
+            except queue.Empty:
+                self._serve_preemption(utterance)
+
+    def _serve_preemption(self, current):
+        """Take queued utterances that outrank current off the heap and synthesize them now."""
+        while True:
+            with self._cond:
+                if not self._pending or self._pending[0][2] is None or self._pending[0][0] >= current.priority:
+                    return
+                _, _, utterance = heapq.heappop(self._pending)
+                self._preemptions += 1
+            self._preempt.put(utterance)
+            self._synthesize_all(utterance)
+
+    def _synthesize_into(self, utterance, text, preemptible=False):
+        """Synthesize one chunk into the utterance's clip queue. Returns False once cancelled."""
+        voice = utterance.voice or AssistantVoice
+        cache = GetSpeechCache()
+        cached_path = None
+        if self.streaming and cache.cacheable(text):
+            cached_path = cache.get(text, voice, utterance.pitch, utterance.rate)
+
+        if not self.streaming or cached_path:
+            try:
+                clip = (cached_path, False) if cached_path else SynthesizeClip(text, voice, utterance.pitch, utterance.rate)
+            except Exception as e:
+                print(f"Error in TTS: {e}")
+                return True
+            if not self._put_clip(utterance, clip, preemptible):
+                _release_clip(clip)
+                return False
+            return True
+
+        # Streaming: hand the clip to the player first, then fill it as audio arrives
+        clip = StreamClip()
+        if not self._put_clip(utterance, clip, preemptible):
+            return False
+        try:
+            communicate = edge_tts.Communicate(text, voice, pitch=utterance.pitch, rate=utterance.rate)
+            audio = asyncio.run(StreamSegments(communicate.stream(), clip, utterance.cancelled.is_set))
+        except Exception as e:
+            print(f"Error in TTS: {e}")
+            clip.finish(failed=True)
+            return True
+        clip.finish()
+        if audio and cache.cacheable(text) and not utterance.cancelled.is_set():
+            _cache_audio(text, voice, utterance.pitch, utterance.rate, audio)
+        return True
+
+    def _put_clip(self, utterance, clip, preemptible=False):
+        while not utterance.cancelled.is_set():
+            try:
+                utterance.clips.put(clip, timeout=0.1)
+                return True
+            except queue.Full:
+                if preemptible:
+                    self._serve_preemption(utterance)  # Player is busy with the look-ahead; get urgent audio ready
+        return False
+
+    # --- Player thread ---
+    def _play_loop(self):
+        try:
+            pygame.mixer.init()
+            pygame.mixer.set_reserved(1)  # Channel 0 is kept for streamed speech
+        except Exception as e:
+            print(f"[Speech] Mixer init failed: {e}")
+
+        while True:
+            self._play_preempting()
+            try:
+                utterance = self._play_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if utterance is None:
+                break
+            self._run_utterance(utterance)
+
+        try:
+            if pygame.mixer.get_init():
+                pygame.mixer.music.stop()
+                pygame.mixer.quit()
+        except Exception as e:
+            print(f"Cleanup error: {e}")
+
+    def _run_utterance(self, utterance):
+        with self._cond:
+            previous, self._current = self._current, utterance
+        try:
+            self._play_utterance(utterance)
+        except Exception as e:
+            print(f"Error in TTS: {e}")
+            utterance.cancel()
+        finally:
+            utterance._drain_clips()
+            with self._cond:
+                self._current = previous
+                self._live.discard(utterance)
+                self._completed += 1
+            utterance.done.set()
+
+    def _play_preempting(self):
+        """Play every urgent utterance that was slotted in, each to the end."""
+        while True:
+            try:
+                utterance = self._preempt.get_nowait()
+            except queue.Empty:
+                return
+            self._run_utterance(utterance)
+
+    def _play_utterance(self, utterance):
+        clock = pygame.time.Clock()
+        starving = False
+        while True:
+            self._play_preempting()  # Between clips (sentences) of this utterance
+            try:
+                clip = utterance.clips.get(timeout=0.1)
+            except queue.Empty:
+                if not utterance.active():
+                    utterance.cancel()
+                if utterance.cancelled.is_set() and utterance.synthesized.is_set():
+                    return
+                if utterance.first_audio_at is not None and not starving:
+                    starving = True  # Playback is waiting on synthesis mid-utterance
+                    self._count_underrun()
+                continue
+
+            starving = False
+            if clip is _END:
+                return
+            try:
+                if not utterance.active():
+                    utterance.cancel()
+                    continue
+                if isinstance(clip, StreamClip):
+                    self._play_stream(utterance, clip)
+                    continue
+                pygame.mixer.music.load(clip[0])
+                pygame.mixer.music.play()
+                self._mark_first_audio(utterance)
+                while pygame.mixer.music.get_busy():
+                    if not utterance.active():  # Stop playback if interrupted
+                        pygame.mixer.music.stop()
+                        utterance.cancel()
+                        break
+                    clock.tick(10)
+                pygame.mixer.music.unload()
+            finally:
+                _release_clip(clip)
+
+    def _play_stream(self, utterance, clip):
+        played = PlayStreamClip(
+            clip,
+            pygame.mixer,
+            active=utterance.active,
+            on_first_audio=lambda: self._mark_first_audio(utterance),
+            on_underrun=self._count_underrun,
+        )
+        if played:
+            if not utterance.active():
+                utterance.cancel()
+            return
+
+        # This SDL build can't decode MP3 segments; play the finished clip from memory instead
+        self.streaming = False
+        while not clip.finished.wait(0.1):
+            if not utterance.active():
+                utterance.cancel()
+                return
+        if clip.failed or not clip.data:
+            return
+        pygame.mixer.music.load(io.BytesIO(clip.audio()))
+        pygame.mixer.music.play()
+        self._mark_first_audio(utterance)
+        clock = pygame.time.Clock()
+        while pygame.mixer.music.get_busy():
+            if not utterance.active():
+                pygame.mixer.music.stop()
+                utterance.cancel()
+                break
+            clock.tick(10)
+        pygame.mixer.music.unload()
+
+    def _mark_first_audio(self, utterance):
+        if utterance.first_audio_at is None:
+            utterance.first_audio_at = monotonic()
+            with self._cond:
+                self._ttfa.append(utterance.first_audio_at - utterance.submitted_at)
+                del self._ttfa[:-200]
+
+    def _count_underrun(self):
+        with self._cond:
+            self._underruns += 1
+
+    # --- Stats ---
+    def stats(self):
+        """Queue depth, time-to-first-audio (ms) and underrun counts."""
+        with self._cond:
+            last = self._ttfa[-1] if self._ttfa else None
+            ttfa = sorted(self._ttfa)
+            depth = len(self._live)
+            underruns = self._underruns
+            completed = self._completed
+            preemptions = self._preemptions
+        return {
+            "queue_depth": depth,
+            "utterances": completed,
+            "preemptions": preemptions,
+            "ttfa_ms_last": round(last * 1000, 1) if last is not None else None,
+            "ttfa_ms_p50": round(ttfa[len(ttfa) // 2] * 1000, 1) if ttfa else None,
+            "ttfa_ms_p95": round(ttfa[min(len(ttfa) - 1, int(len(ttfa) * 0.95))] * 1000, 1) if ttfa else None,
+            "underruns": underruns,
+        }
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def GetSpeechService():
+    """Return the process-wide speech service."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = SpeechService()
+    return _service
+
+
+def PrewarmSpeechCache():
+    """Synthesize the fixed phrases into the cache on a background thread."""
+    phrases = list(PREWARM_PHRASES)
+    phrases += [(p.strip(), None, DEFAULT_PITCH, DEFAULT_RATE) for p in TTSPrewarmPhrases.split("|") if p.strip()]
+
+    def warm():
+        for text, voice, pitch, rate in phrases:
+            try:
+                _release_clip(SynthesizeClip(text, voice, pitch, rate))
+            except Exception as e:
+                print(f"[SpeechCache] Prewarm failed for '{text}': {e}")
+
+    thread = threading.Thread(target=warm, name="TTSPrewarm", daemon=True)
+    thread.start()
+    return thread
@@ -1,12 +1,25 @@
 # === Imports ===
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
+# Selenium and webdriver_manager are imported on first use so that importing
+# this module stays cheap and never launches a browser.
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from dotenv import dotenv_values
 import os
+import hmac
+import json
+import time
+import queue
+import secrets
+import threading
+from urllib.parse import urlsplit, parse_qs
 import mtranslate as mt
+from Backend.Recognizers import (
+    CreateRecognizer,
+    Hypothesis,
+    NoSpeechError,
+    RecognitionError,
+    listen,
+)
+from Backend.Cancellation import NEVER
 
 # === Global Variables & Override ===
 _override_text = None  # Used to manually override speech input
@@ -19,8 +32,15 @@ def SetSpeechOverride(text):
 # === Load Environment Variables ===
 env_vars = dotenv_values(".env")
 InputLanguage = env_vars.get("InputLanguage", "en")  # Default input language is English
+SpeechSilenceTimeout = int(env_vars.get("SpeechSilenceTimeout", 1500))  # ms of silence that ends an utterance
 
-# === Create HTML File for Web-Based Speech Recognition ===
+# === Web-Based Speech Recognition Page ===
+# The page is served from a local HTTP server and stays loaded between
+# utterances. Interim transcripts are POSTed to /interim as the user speaks
+# and the committed transcript to /result, so Python blocks on a queue
+# instead of polling the DOM. The server only accepts requests that carry
+# this session's random token and come from the page's own origin, so other
+# web pages and local processes cannot inject voice commands.
 HtmlCode = '''<!DOCTYPE html>
 <html lang="en">
 <head>
@@ -33,50 +53,256 @@ HtmlCode = '''<!DOCTYPE html>
     <script>
         const output = document.getElementById('output');
         let recognition;
+        let armed = false;
+        let finalText = "";
+        let speechEnded = false;
+        let silenceTimer = null;
+        const token = new URLSearchParams(location.search).get('token') || '';
 
-        function startRecognition() {
+        function send(path, text) {
+            fetch(path, {method: 'POST', headers: {'X-Speech-Token': token}, body: text});
+        }
+
+        function commit() {
+            const text = output.textContent.trim();
+            if (!armed || !text) return;
+            stopRecognition();  // One utterance per arm; Python re-arms for the next
+            send('/result', text);
+        }
+
+        function restartSilenceTimer() {
+            clearTimeout(silenceTimer);
+            silenceTimer = setTimeout(commit, {silence});
+        }
+
+        function createRecognition() {
             recognition = new (window.SpeechRecognition || window.webkitSpeechRecognition)();
             recognition.lang = '{lang}';
             recognition.continuous = true;
+            recognition.interimResults = true;
 
             recognition.onresult = function(event) {
-                const transcript = event.results[event.results.length - 1][0].transcript;
-                output.textContent += transcript;
+                if (!armed) return;
+                let interim = "";
+                for (let i = event.resultIndex; i < event.results.length; i++) {
+                    const result = event.results[i];
+                    if (result.isFinal) finalText += result[0].transcript;
+                    else interim += result[0].transcript;
+                }
+                const text = (finalText + interim).trim();
+                if (!text) return;
+                output.textContent = text;
+                send('/interim', text);
+                // Commit once the recognizer has finalized everything said before end of speech
+                if (speechEnded && !interim) commit();
+                else restartSilenceTimer();
+            };
+
+            recognition.onspeechend = function() {
+                speechEnded = true;
+                restartSilenceTimer();
             };
 
             recognition.onend = function() {
-                recognition.start();
+                if (armed) recognition.start();
             };
-            recognition.start();
+        }
+
+        function startRecognition() {
+            if (!recognition) createRecognition();
+            output.textContent = "";
+            finalText = "";
+            speechEnded = false;
+            armed = true;
+            try { recognition.start(); } catch (e) {}  // Already running
         }
 
         function stopRecognition() {
-            recognition.stop();
-            output.innerHTML = "";
+            armed = false;
+            clearTimeout(silenceTimer);
+            if (recognition) recognition.stop();
         }
     </script>
 </body>
-</html>'''.replace('{lang}', InputLanguage)  # Inject language
+</html>'''.replace('{lang}', InputLanguage).replace('{silence}', str(SpeechSilenceTimeout))  # Inject settings
+
+# === Local Result Server ===
+SpeechServerPort = int(env_vars.get("SpeechServerPort", 0))  # 0 picks a free port
+_results = queue.Queue()
+_session_token = secrets.token_urlsafe(32)  # New every run; only the page opened by _get_driver() knows it
+
+
+class _SpeechPageHandler(BaseHTTPRequestHandler):
+    def _origin(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _reject(self):
+        self.send_response(403)
+        self.end_headers()
+
+    def do_GET(self):
+        token = parse_qs(urlsplit(self.path).query).get("token", [""])[0]
+        if not hmac.compare_digest(token, _session_token):
+            return self._reject()
+        body = HtmlCode.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        # Cross-origin pages can't send the custom header without a preflight, which this server never grants
+        if self.headers.get("Origin") != self._origin() or not hmac.compare_digest(self.headers.get("X-Speech-Token", ""), _session_token):
+            return self._reject()
+        length = int(self.headers.get("Content-Length", 0))
+        text = self.rfile.read(length).decode("utf-8", errors="replace").strip()
+        if self.path in ("/interim", "/result") and text:
+            _results.put((self.path == "/result", text))
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass  # Keep the console quiet
+
+
+# === Lazy Recognizer Backend ===
+DriverPathCache = os.path.join("Data", "ChromeDriverPath.json")  # Resolved chromedriver, reused across runs
+
+_backend_lock = threading.Lock()
+_server = None
+_driver = None
+Link = None
+
+
+def _resolve_driver_path(refresh=False):
+    """Return a chromedriver path, asking ChromeDriverManager only when the cached one is unusable."""
+    if not refresh:
+        try:
+            with open(DriverPathCache, "r", encoding="utf-8") as f:
+                cached = json.load(f).get("path")
+            if cached and os.path.isfile(cached):
+                return cached
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    from webdriver_manager.chrome import ChromeDriverManager
+    path = ChromeDriverManager().install()
+    os.makedirs(os.path.dirname(DriverPathCache), exist_ok=True)
+    with open(DriverPathCache, "w", encoding="utf-8") as f:
+        json.dump({"path": path}, f)
+    return path
+
+
+def _launch_driver(driver_path):
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+    from selenium.webdriver.chrome.options import Options
+
+    chrome_options = Options()
+    chrome_options.add_argument(f'user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/89.0.4389.82 Safari/537.36')
+    chrome_options.add_argument("--use-fake-ui-for-media-stream")       # Auto grant mic permission
+    chrome_options.add_argument("--use-fake-device-for-media-stream")   # Prevent device errors
+    chrome_options.add_argument("--headless=new")                       # Run in background
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-logging"])
+    return webdriver.Chrome(service=Service(driver_path), options=chrome_options)
+
+
+def _get_driver():
+    """Start the result server and headless Chrome on first use; later calls reuse them."""
+    global _server, _driver, Link
+    with _backend_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer(("127.0.0.1", SpeechServerPort), _SpeechPageHandler)
+            threading.Thread(target=_server.serve_forever, daemon=True).start()
+            Link = f"http://127.0.0.1:{_server.server_address[1]}/?token={_session_token}"
+
+        if _driver is None:
+            try:
+                _driver = _launch_driver(_resolve_driver_path())
+            except Exception as e:
+                # The cached driver may no longer match the installed Chrome
+                print(f"[SpeechToText] Cached ChromeDriver failed ({e}), resolving a fresh one.")
+                _driver = _launch_driver(_resolve_driver_path(refresh=True))
+            _driver.get(Link)
+        return _driver
+
+
+def warmup():
+    """Build the recognizer backend in a background thread (call while the GUI paints)."""
+    def _warm():
+        try:
+            if GetRecognizer().name == "chrome":
+                _get_driver()
+        except Exception as e:
+            print(f"[SpeechToText] Warmup failed: {e}")
+
+    thread = threading.Thread(target=_warm, daemon=True)
+    thread.start()
+    return thread
 
-# === Save HTML File ===
-html_path = os.path.join("Data", "Voice.html")
-os.makedirs("Data", exist_ok=True)
-with open(html_path, "w", encoding="utf-8") as f:
-    f.write(HtmlCode)
 
-# === Selenium Driver Setup ===
-current_dir = os.getcwd()
-Link = f"file:///{current_dir.replace(os.sep, '/')}/Data/Voice.html"
+def shutdown():
+    """Quit Chrome and stop the result server."""
+    global _server, _driver
+    with _backend_lock:
+        if _driver is not None:
+            try:
+                _driver.quit()
+            except Exception as e:
+                print(f"[SpeechToText] Error closing Chrome: {e}")
+            _driver = None
+        if _server is not None:
+            _server.shutdown()
+            _server.server_close()
+            _server = None
 
-chrome_options = Options()
-chrome_options.add_argument(f'user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/89.0.4389.82 Safari/537.36')
-chrome_options.add_argument("--use-fake-ui-for-media-stream")       # Auto grant mic permission
-chrome_options.add_argument("--use-fake-device-for-media-stream")   # Prevent device errors
-chrome_options.add_argument("--headless=new")                       # Run in background
-chrome_options.add_experimental_option("excludeSwitches", ["enable-logging"])
+# === Recognizer Adapter ===
+class ChromeWebSpeechRecognizer:
+    """Recognizer protocol adapter for the Web Speech page running in headless Chrome."""
+
+    name = "chrome"
+
+    def __init__(self):
+        self._cancel = threading.Event()
+        self.cancelled = False
+
+    def stream(self, timeout=None, phrase_time_limit=None):
+        if self._cancel.is_set():
+            self.cancelled = True
+            return
+        driver = _get_driver()
+        while not _results.empty():
+            _results.get_nowait()  # Drop results that arrived while nobody was listening
+        driver.execute_script("startRecognition();")
+
+        deadline = time.monotonic() + timeout if timeout else None
+        while True:
+            if self._cancel.is_set():
+                driver.execute_script("stopRecognition();")
+                self.cancelled = True
+                return
+            if deadline and time.monotonic() >= deadline:
+                driver.execute_script("stopRecognition();")
+                raise NoSpeechError("no speech before timeout")
+            try:
+                is_final, text = _results.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if is_final:
+                yield Hypothesis(text, True)
+                return
+            deadline = None  # Speech has started; only the silence timeout applies now
+            yield Hypothesis(text, False)
+
+    def cancel(self):
+        self._cancel.set()
+
+    def reset(self):
+        self._cancel.clear()
+        self.cancelled = False
 
-service = Service(ChromeDriverManager().install())
-driver = webdriver.Chrome(service=service, options=chrome_options)
 
 # === Assistant Status Handler (for GUI) ===
 def SetAssistantStatus(Status):
@@ -102,7 +328,24 @@ def UniversalTranslator(Text):
     return english_translation.capitalize()
 
 # === Main Speech Recognition ===
-def SpeechRecognition():
+_recognizer = None
+
+
+def GetRecognizer():
+    """Return the query recognizer selected by SpeechBackend (created on first use)."""
+    global _recognizer
+    with _backend_lock:
+        if _recognizer is None:
+            _recognizer = CreateRecognizer()
+    return _recognizer
+
+
+def SpeechRecognition(on_partial=None, token=NEVER):
+    """
+    Block until the user finishes an utterance and return it as a query.
+    on_partial(text) receives the interim transcript while the user is still speaking.
+    Returns "" if token is cancelled before the utterance is complete.
+    """
     global _override_text
 
     # Handle override if set
@@ -115,24 +358,32 @@ def SpeechRecognition():
             SetAssistantStatus("Translating...")
             return QueryModifier(UniversalTranslator(text))
 
-    # Launch local speech HTML interface
-    driver.get(Link)
-    driver.find_element(by=By.ID, value="start").click()
+    recognizer = GetRecognizer()
+    recognizer.reset()  # New turn; a cancel from here on is kept until the next reset
+    unregister = token.on_cancel(recognizer.cancel)
+    try:
+        while True:
+            if token.cancelled:
+                return ""
+            try:
+                Text = listen(recognizer, on_partial=on_partial)
+            except NoSpeechError:
+                time.sleep(0.5)
+                continue
+            except RecognitionError as e:
+                print(f"[SpeechToText] {recognizer.name}: {e}")
+                time.sleep(0.5)
+                continue
+            if not Text:
+                continue
 
-    while True:
-        try:
-            # Get recognized text from browser
-            Text = driver.find_element(by=By.ID, value="output").text.strip()
-
-            if Text:
-                driver.find_element(by=By.ID, value="end").click()
-                if InputLanguage.lower().startswith("en"):
-                    return QueryModifier(Text)
-                else:
-                    SetAssistantStatus("Translating...")
-                    return QueryModifier(UniversalTranslator(Text))
-        except Exception:
-            pass  # Ignore occasional read failures
+            if InputLanguage.lower().startswith("en"):
+                return QueryModifier(Text)
+            else:
+                SetAssistantStatus("Translating...")
+                return QueryModifier(UniversalTranslator(Text))
+    finally:
+        unregister()
 
 # === Test Entry Point ===
 if __name__ == "__main__":
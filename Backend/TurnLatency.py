@@ -0,0 +1,152 @@
+# === TurnLatency.py ===
+# End-to-end latency of voice turns. Recorded utterances (Data/Replay/*.wav,
+# transcripts in a .txt next to each) are fed through the replay recognizer
+# into Main.MainExecution, the same code path a live microphone turn takes:
+# recognition, intent routing and the decision model, dispatch, the streamed
+# answer and speech output. Every stage is timed from the moment the
+# recording ends, i.e. when the user would stop speaking.
+#
+# All services run for real (Groq, Cohere, edge-tts, the pygame mixer, and
+# any automation the recordings ask for), so record harmless queries.
+# --transcribe runs recognize_google on the audio instead of reading the
+# .txt, which makes the recognition stage a real measurement too.
+#
+# Usage: python -m Backend.TurnLatency [--dir PATH] [--transcribe]
+
+# === Imports ===
+import os
+import sys
+import time
+import threading
+from Backend.Recognizers import ReplayDir, WavReplayRecognizer
+
+STAGES = ("stt", "decide", "first_token", "first_audio", "turn")
+
+
+class TurnTimer:
+    """Stage timestamps (time.monotonic()) for the turn in progress."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.marks = {}
+        self.utterances = []
+
+    def reset(self):
+        with self._lock:
+            self.marks = {}
+            self.utterances = []
+
+    def mark(self, stage):
+        with self._lock:
+            self.marks.setdefault(stage, time.monotonic())
+
+
+def Instrument(main, timer):
+    """Wrap Main's stage boundaries so each one records a timestamp; behaviour is unchanged."""
+    from Backend.SpeechService import GetSpeechService
+
+    resolve = main.speculator.resolve
+
+    def timed_resolve(*args, **kwargs):
+        result = resolve(*args, **kwargs)
+        timer.mark("decided")
+        return result
+
+    stream_answer = main.StreamAnswerToUser
+
+    def timed_stream_answer(deltas, token):
+        def timed_deltas():
+            for delta in deltas:
+                timer.mark("first_token")
+                yield delta
+        return stream_answer(timed_deltas(), token)
+
+    service = GetSpeechService()
+    submit = service.submit
+
+    def timed_submit(utterance):
+        with timer._lock:
+            timer.utterances.append(utterance)
+        return submit(utterance)
+
+    main.speculator.resolve = timed_resolve
+    main.StreamAnswerToUser = timed_stream_answer
+    service.submit = timed_submit
+
+
+def StageTimes(recognizer, timer, finished_at):
+    """Milliseconds per stage for the last turn; None where the turn had no such stage."""
+    marks = timer.marks
+    audio_end = recognizer.audio_end_at
+    first_audio = min((u.first_audio_at for u in timer.utterances if u.first_audio_at), default=None)
+
+    def ms(later, earlier):
+        return (later - earlier) * 1000 if later and earlier else None
+
+    return {
+        "stt": ms(recognizer.final_at, audio_end),
+        "decide": ms(marks.get("decided"), recognizer.final_at),
+        "first_token": ms(marks.get("first_token"), marks.get("decided")),
+        "first_audio": ms(first_audio, audio_end),
+        "turn": ms(finished_at, audio_end),
+    }
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def _cell(value):
+    return f"{value:>11.0f}" if value is not None else f"{'-':>11}"
+
+
+def _argument(name, default=None):
+    if name in sys.argv:
+        index = sys.argv.index(name)
+        if index + 1 < len(sys.argv):
+            return sys.argv[index + 1]
+    return default
+
+
+def Main():
+    directory = _argument("--dir", ReplayDir)
+    paths = sorted(os.path.join(directory, f) for f in os.listdir(directory) if f.lower().endswith(".wav")) \
+        if os.path.isdir(directory) else []
+    if not paths:
+        print(f"No recordings in {directory}. Add WAV files of spoken queries, each with a .txt transcript.")
+        sys.exit(1)
+
+    import Main as main
+    from Backend import SpeechToText, BargeIn
+
+    BargeIn.BargeIn = "off"  # The replayed user is not at the microphone; room noise must not cut turns short
+
+    recognizer = WavReplayRecognizer(paths, speed=1.0, transcribe="--transcribe" in sys.argv)
+    with SpeechToText._backend_lock:
+        SpeechToText._recognizer = recognizer  # MainExecution's SpeechRecognition() now hears the recordings
+    timer = TurnTimer()
+    Instrument(main, timer)
+
+    print(f"{len(paths)} recordings, recognition from {'recognize_google' if recognizer.transcribe else 'transcripts'}")
+    print("ms after the user stops speaking (decide and first_token are relative to the previous stage)")
+    print(f"{'file':<16} |" + "|".join(f"{stage:>11}" for stage in STAGES))
+    results = []
+    while recognizer.remaining:
+        timer.reset()
+        main.MainExecution()
+        times = StageTimes(recognizer, timer, time.monotonic())
+        results.append(times)
+        print(f"{os.path.basename(recognizer.path):<16} |" + "|".join(_cell(times[stage]) for stage in STAGES))
+
+    for label, fraction in (("p50", 0.5), ("p95", 0.95)):
+        cells = []
+        for stage in STAGES:
+            values = [times[stage] for times in results if times[stage] is not None]
+            cells.append(_cell(_percentile(values, fraction) if values else None))
+        print(f"{label:<16} |" + "|".join(cells))
+    print(f"{main.speculator.stats()}  {main.classifier.stats()}")
+
+
+if __name__ == "__main__":
+    Main()
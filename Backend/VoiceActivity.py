@@ -0,0 +1,238 @@
+# === VoiceActivity.py ===
+# Voice-activity detection in front of every recognizer. Frames from the
+# shared capture are compared with a rolling noise floor (a low percentile
+# of recent frame energies, so it follows the room as it gets louder or
+# quieter); only frames that belong to speech are forwarded.
+# Benchmark: python -m Backend.VoiceActivity --bench
+
+# === Imports ===
+import sys
+import threading
+from collections import deque
+import numpy as np
+from dotenv import dotenv_values
+
+# === Load Environment Variables ===
+env_vars = dotenv_values(".env")
+NoiseWindowSeconds = float(env_vars.get("NoiseWindowSeconds", 10))    # History used for the noise floor
+NoisePercentile = float(env_vars.get("NoisePercentile", 20))          # Quietest share of that history = floor
+SpeechEnergyRatio = float(env_vars.get("SpeechEnergyRatio", 3.0))     # Speech threshold as a multiple of the floor
+MinEnergyThreshold = float(env_vars.get("MinEnergyThreshold", 150))   # Floor for very quiet rooms
+VadOnsetMs = int(env_vars.get("VadOnsetMs", 120))                     # Loud audio needed to open a segment
+VadHangoverMs = int(env_vars.get("VadHangoverMs", 300))               # Quiet audio that closes a segment
+VadPrerollMs = int(env_vars.get("VadPrerollMs", 200))                 # Audio kept from before the onset
+VadMinSpeechMs = int(env_vars.get("VadMinSpeechMs", 250))             # Shorter bursts are dropped
+
+
+def FrameEnergy(frame: bytes) -> float:
+    """RMS energy of 16-bit little-endian PCM, in the same units as speech_recognition's energy_threshold."""
+    samples = np.frombuffer(frame, dtype="<i2")
+    if samples.size == 0:
+        return 0.0
+    return float(np.sqrt(np.mean(samples.astype(np.float64) ** 2)))
+
+
+# === Noise Floor ===
+class NoiseFloorTracker:
+    """Rolling percentile of frame energies, recomputed about once a second."""
+
+    def __init__(self, window_seconds=None, percentile=None, update_seconds=1.0):
+        self.window_seconds = window_seconds or NoiseWindowSeconds
+        self.percentile = percentile or NoisePercentile
+        self.update_seconds = update_seconds
+        self._energies = deque()
+        self._since_update = 0.0
+        self._maxlen = None
+        self.floor = None
+        self.recalibrations = 0
+
+    def add(self, energy, seconds):
+        if self._maxlen is None:
+            self._maxlen = max(int(self.window_seconds / seconds), 1)
+            self._energies = deque(maxlen=self._maxlen)
+        self._energies.append(energy)
+        self._since_update += seconds
+        if self.floor is None:
+            self.floor = energy
+        if self._since_update >= self.update_seconds:
+            self._since_update = 0.0
+            floor = float(np.percentile(self._energies, self.percentile))
+            if self.floor and abs(floor - self.floor) > 0.2 * self.floor:
+                self.recalibrations += 1  # Room got noticeably louder or quieter
+            self.floor = floor
+
+    def threshold(self) -> float:
+        return max((self.floor or 0.0) * SpeechEnergyRatio, MinEnergyThreshold)
+
+
+# === Detector ===
+class VoiceActivityDetector:
+    """Turns a stream of capture frames into speech segments and counts what it drops."""
+
+    def __init__(self, tracker):
+        self.tracker = tracker
+        self._lock = threading.Lock()
+        self.frames_dropped = 0
+        self.frames_forwarded = 0
+        self.segments = 0
+        self.segments_rejected = 0
+
+    def _count(self, dropped=0, forwarded=0, segment=False, rejected=False):
+        with self._lock:
+            self.frames_dropped += dropped
+            self.frames_forwarded += forwarded
+            self.segments += segment
+            self.segments_rejected += rejected
+
+    def segments_from(self, read_frame, frame_seconds, max_seconds=None, start_timeout=None, active=lambda: True):
+        """
+        Yield PCM for each speech segment in the frames returned by read_frame().
+        A segment is closed by VadHangoverMs of quiet or by max_seconds.
+        Raises TimeoutError if no speech starts within start_timeout seconds.
+        """
+        onset_frames = max(1, round(VadOnsetMs / 1000 / frame_seconds))
+        hangover_frames = max(1, round(VadHangoverMs / 1000 / frame_seconds))
+        preroll = deque(maxlen=max(1, round(VadPrerollMs / 1000 / frame_seconds)))
+        min_speech = VadMinSpeechMs / 1000
+        waited = 0.0
+
+        while active():
+            # --- Wait for onset ---
+            loud = 0
+            while True:
+                if not active():
+                    return
+                frame = read_frame()
+                if FrameEnergy(frame) >= self.tracker.threshold():
+                    loud += 1
+                else:
+                    loud = 0
+                if len(preroll) == preroll.maxlen:
+                    self._count(dropped=1)
+                preroll.append(frame)
+                waited += frame_seconds
+                if loud >= onset_frames:
+                    break
+                if start_timeout is not None and waited >= start_timeout:
+                    raise TimeoutError("no speech before timeout")
+
+            # --- Collect until hangover ---
+            segment = list(preroll)
+            preroll.clear()
+            speech_seconds = loud * frame_seconds
+            quiet = 0
+            while quiet < hangover_frames:
+                if max_seconds and len(segment) * frame_seconds >= max_seconds:
+                    break
+                if not active():
+                    self._count(dropped=len(segment))
+                    return
+                frame = read_frame()
+                segment.append(frame)
+                if FrameEnergy(frame) >= self.tracker.threshold():
+                    quiet = 0
+                    speech_seconds += frame_seconds
+                else:
+                    quiet += 1
+
+            if speech_seconds < min_speech:
+                self._count(dropped=len(segment), rejected=True)
+                continue
+            self._count(forwarded=len(segment), segment=True)
+            waited = 0.0
+            yield b"".join(segment)
+
+    def stats(self):
+        with self._lock:
+            total = self.frames_dropped + self.frames_forwarded
+            return {
+                "frames_dropped": self.frames_dropped,
+                "frames_forwarded": self.frames_forwarded,
+                "forwarded_ratio": self.frames_forwarded / total if total else 0.0,
+                "segments": self.segments,
+                "segments_rejected": self.segments_rejected,
+                "noise_floor": round(self.tracker.floor or 0.0, 1),
+                "recalibrations": self.tracker.recalibrations,
+            }
+
+
+def CaptureSegments(capture, max_seconds=None, start_timeout=None, active=lambda: True, reader=None):
+    """
+    Speech segments from the shared capture, gated by the reader's voice-activity detector.
+    Closing the reader (from any thread) ends the generator.
+    """
+    from Backend.AudioCapture import CaptureClosed
+
+    reader = reader or capture.reader(preroll=0)
+    chunk_bytes = capture.CHUNK * capture.SAMPLE_WIDTH
+    try:
+        yield from reader.vad.segments_from(
+            lambda: reader.read(chunk_bytes),
+            capture.CHUNK / capture.SAMPLE_RATE,
+            max_seconds=max_seconds,
+            start_timeout=start_timeout,
+            active=lambda: active() and not reader.closed,
+        )
+    except CaptureClosed:
+        return
+    finally:
+        reader.close()
+
+
+# === Benchmark ===
+def _synthetic_room(rng, seconds=300, rate=16000, chunk=1024):
+    """Quiet room, then a TV comes on at varying volume; a short spoken phrase every 30 s."""
+    frames = []
+    t = 0.0
+    step = chunk / rate
+    while t < seconds:
+        tv = 0 if t < 20 else 400 + 300 * np.sin(2 * np.pi * t / 60)   # Background TV, drifting volume
+        speech = 4000 if (t % 30) > 25 and (t % 30) < 26.2 else 0       # 1.2 s phrase every 30 s
+        samples = rng.normal(0, 30 + tv, chunk) + speech * np.sin(np.arange(chunk) / 4)
+        frames.append(np.clip(samples, -32768, 32767).astype("<i2").tobytes())
+        t += step
+    return frames, step
+
+
+def Benchmark():
+    """Recognition calls with a one-time calibration (old listener) vs. the rolling-floor VAD."""
+    rng = np.random.default_rng(3)
+    frames, step = _synthetic_room(rng)
+
+    # Old behaviour: threshold calibrated once in the quiet first second, every loud 3 s window is sent
+    calibrated = max(np.mean([FrameEnergy(f) for f in frames[:int(1 / step)]]) * 1.5, 300)
+    old_calls, i = 0, 0
+    while i < len(frames):
+        if FrameEnergy(frames[i]) > calibrated:
+            old_calls += 1
+            i += int(3 / step)  # phrase_time_limit=3
+        else:
+            i += 1
+
+    tracker = NoiseFloorTracker()
+    vad = VoiceActivityDetector(tracker)
+    source = iter(frames)
+
+    def read_frame():
+        frame = next(source)
+        tracker.add(FrameEnergy(frame), step)
+        return frame
+
+    new_calls = 0
+    try:
+        for _ in vad.segments_from(read_frame, step, max_seconds=3):
+            new_calls += 1
+    except RuntimeError:
+        pass  # Frame source exhausted inside the generator
+
+    phrases = int(len(frames) * step // 30)
+    print(f"{len(frames) * step:.0f} s of audio, {phrases} spoken phrases")
+    print(f"one-time calibration: {old_calls} recognition calls")
+    print(f"rolling-floor VAD:    {new_calls} recognition calls  {vad.stats()}")
+
+
+if __name__ == "__main__":
+    if "--bench" in sys.argv:
+        Benchmark()
+    else:
+        print("Usage: python -m Backend.VoiceActivity --bench")
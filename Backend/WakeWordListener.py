@@ -1,9 +1,8 @@
 # === WakeWordListener.py ===
 
 # === Imports ===
-import speech_recognition as sr
 from time import sleep
-import pygame
+from dotenv import dotenv_values
 from Frontend.GUI import (
     SetAssistantStatus,
     ShowTextToScreen,
@@ -11,6 +10,15 @@ from Frontend.GUI import (
     GetMicrophoneStatus,
     GetWakeTriggerEnabled
 )
+from Backend.EventBus import bus, MIC, WAKE_TRIGGER
+from Backend.WakeWordSpotter import (
+    LoadWakeWordSpotter, LoadStopSpotter, WaitForWakeWord, WakeWordEngine, WakeWordDir, WakeWordPhrase, StopPhrase,
+)
+from Backend.Recognizers import CreateCommandRecognizer, NoSpeechError, UnintelligibleError, BackendUnavailableError, listen
+
+# === Load Environment Variables ===
+env_vars = dotenv_values(".env")
+WakeWordFallback = env_vars.get("WakeWordFallback", "recognizer").lower()  # Without the offline spotter: "recognizer" or "off"
 
 # === Wake Word Listening State ===
 wake_word_enabled = True  # Global flag to control wake word behavior
@@ -19,11 +27,20 @@ def toggle_wake_word_listening(enable: bool):
     """Enable or disable the wake word listener."""
     global wake_word_enabled
     wake_word_enabled = enable
+    bus.notify()  # Wake the listener so it re-checks the flag
 
 def is_wake_word_enabled():
     """Return current state of wake word listener."""
     return wake_word_enabled
 
+def _ready_to_listen(state):
+    """True when the GUI toggle, the internal flag and the mic state all allow listening."""
+    return (
+        state.get(WAKE_TRIGGER, "True") == "True"
+        and wake_word_enabled
+        and state.get(MIC, "False").lower() != "true"
+    )
+
 # === Wake Word Sound (Optional) ===
 # def play_wake_up_sound():
 #     """Play a wake-up chime (currently unused)."""
@@ -34,54 +51,116 @@ def is_wake_word_enabled():
 #     except Exception as e:
 #         print(f"[WakeWord] Failed to play sound: {e}")
 
+# === Voice Commands ===
+def _stop_listening():
+    """Handle "stop listening": turn the wake word listener off until re-enabled."""
+    ShowTextToScreen("Wake word disabled.")
+    SetAssistantStatus("Wake Word Disabled")
+    texttospeech("Okay, I will stop listening now.")
+    toggle_wake_word_listening(False)
+
+# === Wake Response ===
+def _wake_up(callback):
+    # play_wake_up_sound()  # Optionally play chime
+    ShowTextToScreen("Hello!! How can I assist you?")
+    SetAssistantStatus("Waking up...")
+    texttospeech("Hello!! How can I assist you?")
+    if callback:
+        callback()  # Trigger callback to Main.py
+    sleep(0.5)
+
+# === Offline Wake Word Loop ===
+def _listen_locally(spotter, callback):
+    """Spot the wake word on the shared capture without any network calls."""
+    from Backend.AudioCapture import CaptureClosed, CaptureRetrySeconds, GetAudioCapture
+    capture = GetAudioCapture()
+    active = lambda: _ready_to_listen(bus.snapshot())
+    stop_spotter = LoadStopSpotter()
+    if stop_spotter is None:
+        print(f'[WakeWord] Say "{WakeWordPhrase}, {StopPhrase}" to turn listening off; for "{StopPhrase}" alone, '
+              "run python -m Backend.WakeWordSpotter --enroll-stop")
+
+    while True:
+        if not active():
+            bus.wait_until(_ready_to_listen)
+            continue
+
+        try:
+            reader = capture.reader(preroll=0)  # Reopens the microphone if it dropped out
+        except CaptureClosed as e:
+            print(f"[WakeWord] {e}; retrying in {CaptureRetrySeconds:.0f} s")
+            sleep(CaptureRetrySeconds)
+            continue
+        print("[WakeWord] Listening for wake word (offline)...")
+        heard = WaitForWakeWord(spotter, capture, active, reader=reader, stop_spotter=stop_spotter)
+        if heard == StopPhrase:
+            print(f"[WakeWord] Heard stop phrase {stop_spotter.stats()}")
+            _stop_listening()
+        elif heard:
+            print(f"[WakeWord] Heard wake word {spotter.stats()} {reader.vad.stats()}")
+            _wake_up(callback)
+
+# === Fallback Notice ===
+def _announce_fallback(reason):
+    """Tell the user why idle listening is not offline, instead of switching silently."""
+    if WakeWordFallback == "off":
+        message = f"Wake word is off: {reason}. Use the mic button, or run python -m Backend.WakeWordSpotter --enroll."
+    else:
+        message = f"Wake word is using online recognition: {reason}. Run python -m Backend.WakeWordSpotter --enroll to keep it offline."
+    print(f"[WakeWord] {message}")
+    ShowTextToScreen(message)
+    return WakeWordFallback != "off"
+
 # === Main Wake Word Listener Loop ===
 def listen_for_wake_word(callback=None, wake_words=None):
     """Continuously listen for the wake word and trigger a callback."""
     if wake_words is None:
         wake_words = ["hey jarvis"]
 
-    recognizer = sr.Recognizer()
-    mic = sr.Microphone()
+    spotter = LoadWakeWordSpotter()
+    if spotter:
+        try:
+            _listen_locally(spotter, callback)
+        except Exception as e:
+            if not _announce_fallback(f"the offline spotter stopped ({e})"):
+                return
+    elif WakeWordEngine.lower() == "local" and not _announce_fallback("no wake word recordings in " + WakeWordDir):
+        return
+
+    recognizer = CreateCommandRecognizer()
 
     # Adjust mic for ambient noise
-    with mic as source:
-        recognizer.adjust_for_ambient_noise(source)
+    if hasattr(recognizer, "calibrate"):
+        recognizer.calibrate()
 
     while True:
         # Respect toggles from GUI or internal flags
         if not GetWakeTriggerEnabled() or not wake_word_enabled or GetMicrophoneStatus().lower() == "true":
-            sleep(0.5)
+            bus.wait_until(_ready_to_listen)
             continue
 
         try:
             print("[WakeWord] Listening for wake word...")
-            with mic as source:
-                audio = recognizer.listen(source, timeout=None, phrase_time_limit=3)
-
-            query = recognizer.recognize_google(audio).lower()
+            query = listen(recognizer, timeout=None, phrase_time_limit=3).lower()
+            if not query:
+                continue
             print(f"[WakeWord] Heard: {query}")
 
             # Command to stop listening
-            if "stop listening" in query:
-                ShowTextToScreen("Wake word disabled.")
-                SetAssistantStatus("Wake Word Disabled")
-                texttospeech("Okay, I will stop listening now.")
-                toggle_wake_word_listening(False)
+            if StopPhrase in query:
+                _stop_listening()
                 continue
 
             # Wake word matched
             if any(wake_word in query for wake_word in wake_words):
-                # play_wake_up_sound()  # Optionally play chime
-                ShowTextToScreen("Hello!! How can I assist you?")
-                SetAssistantStatus("Waking up...")
-                texttospeech("Hello!! How can I assist you?")
-                if callback:
-                    callback()  # Trigger callback to Main.py
-                sleep(0.5)
-
-        except sr.UnknownValueError:
+                _wake_up(callback)
+
+        except UnintelligibleError:
             continue  # Could not understand audio
-        except sr.RequestError as e:
+        except NoSpeechError:
+            sleep(0.5)  # Replay backend ran out of recordings
+            continue
+        except BackendUnavailableError as e:
             print(f"[WakeWord] API error: {e}")
             continue
         except Exception as e:
@@ -0,0 +1,330 @@
+# === WakeWordSpotter.py ===
+# Offline wake word detection. Speech segments found by the voice-activity
+# detector on the shared microphone capture are turned into MFCC features and compared
+# with recorded templates of the wake word (Data/WakeWord/*.wav) using
+# dynamic time warping. Nothing leaves the machine while idle. A second
+# spotter, enrolled on "stop listening" (Data/StopListening), lets the user
+# turn the listener off by voice without any transcription.
+# Enrollment: python -m Backend.WakeWordSpotter --enroll [count] | --enroll-stop [count]
+# Benchmark: python -m Backend.WakeWordSpotter --record-fixtures, then --bench [fixtures_dir]
+
+# === Imports ===
+import os
+import sys
+import time
+import wave
+import functools
+import numpy as np
+from dotenv import dotenv_values
+
+# === Load Environment Variables ===
+env_vars = dotenv_values(".env")
+WakeWordDir = env_vars.get("WakeWordDir", os.path.join("Data", "WakeWord"))  # Template recordings
+WakeWordSensitivity = float(env_vars.get("WakeWordSensitivity", 0.5))       # 0 = strict, 1 = permissive
+WakeWordDistance = float(env_vars.get("WakeWordDistance", 0))               # Fixed DTW threshold; 0 derives it from the templates
+WakeWordEngine = env_vars.get("WakeWordEngine", "local")                    # "local" spotter or "recognizer"
+WakeWordPhrase = env_vars.get("WakeWordPhrase", "hey " + env_vars.get("Assistantname", "Jarvis").lower())
+WakeWordFixtureDir = env_vars.get("WakeWordFixtureDir", os.path.join("Data", "WakeWordFixtures"))  # Benchmark clips
+StopPhraseDir = env_vars.get("StopPhraseDir", os.path.join("Data", "StopListening"))  # "stop listening" recordings
+StopPhrase = "stop listening"
+
+FEATURE_RATE = 16000        # Audio is resampled to this rate before feature extraction
+MAX_SEGMENT_SECONDS = 2.0   # Longer speech is a sentence, not a wake word
+
+
+# === Audio Helpers ===
+def LoadWav(path):
+    """Return (float samples in [-1, 1], sample_rate) for a 16-bit PCM WAV (channels are averaged)."""
+    with wave.open(path, "rb") as w:
+        rate, channels, width = w.getframerate(), w.getnchannels(), w.getsampwidth()
+        raw = w.readframes(w.getnframes())
+    if width != 2:
+        raise ValueError(f"{path}: only 16-bit PCM is supported")
+    samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples, rate
+
+
+def PcmToFloat(pcm: bytes):
+    return np.frombuffer(pcm, dtype="<i2").astype(np.float32) / 32768.0
+
+
+def Resample(samples, rate, target=FEATURE_RATE):
+    if rate == target or len(samples) == 0:
+        return samples
+    duration = len(samples) / rate
+    positions = np.linspace(0, len(samples) - 1, int(duration * target))
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+# === MFCC Features ===
+@functools.lru_cache(maxsize=4)
+def _mel_filterbank(rate, n_fft, n_mels):
+    def hz_to_mel(hz):
+        return 2595 * np.log10(1 + hz / 700.0)
+
+    def mel_to_hz(mel):
+        return 700 * (10 ** (mel / 2595.0) - 1)
+
+    mel_points = np.linspace(hz_to_mel(0), hz_to_mel(rate / 2), n_mels + 2)
+    bins = np.floor((n_fft + 1) * mel_to_hz(mel_points) / rate).astype(int)
+    bank = np.zeros((n_mels, n_fft // 2 + 1))
+    for m in range(1, n_mels + 1):
+        left, center, right = bins[m - 1], bins[m], bins[m + 1]
+        for k in range(left, center):
+            bank[m - 1, k] = (k - left) / max(center - left, 1)
+        for k in range(center, right):
+            bank[m - 1, k] = (right - k) / max(right - center, 1)
+    return bank
+
+
+@functools.lru_cache(maxsize=4)
+def _dct_matrix(n_in, n_out):
+    n = np.arange(n_in)
+    k = np.arange(n_out)[:, None]
+    return np.cos(np.pi * k * (2 * n + 1) / (2 * n_in)) * np.sqrt(2.0 / n_in)
+
+
+def Mfcc(samples, rate=FEATURE_RATE, n_mfcc=13, n_mels=26, frame_ms=25, hop_ms=10, n_fft=512):
+    """MFCC matrix (frames x n_mfcc) with cepstral mean normalization."""
+    samples = Resample(np.asarray(samples, dtype=np.float32), rate)
+    frame_len = int(FEATURE_RATE * frame_ms / 1000)
+    hop = int(FEATURE_RATE * hop_ms / 1000)
+    if len(samples) < frame_len:
+        samples = np.pad(samples, (0, frame_len - len(samples)))
+    emphasized = np.append(samples[0], samples[1:] - 0.97 * samples[:-1])
+    n_frames = 1 + (len(emphasized) - frame_len) // hop
+    index = np.arange(frame_len)[None, :] + hop * np.arange(n_frames)[:, None]
+    frames = emphasized[index] * np.hamming(frame_len)
+    power = np.abs(np.fft.rfft(frames, n_fft)) ** 2 / n_fft
+    mel = np.log(np.maximum(power @ _mel_filterbank(FEATURE_RATE, n_fft, n_mels).T, 1e-10))
+    features = mel @ _dct_matrix(n_mels, n_mfcc).T
+    return features - features.mean(axis=0)
+
+
+def DtwDistance(a, b, band=0.4):
+    """Length-normalized DTW distance between two feature sequences, within a Sakoe-Chiba band."""
+    n, m = len(a), len(b)
+    cost = np.sqrt(((a[:, None, :] - b[None, :, :]) ** 2).sum(axis=2))
+    width = max(int(band * max(n, m)), abs(n - m) + 1)
+    acc = np.full((n + 1, m + 1), np.inf)
+    acc[0, 0] = 0.0
+    for i in range(1, n + 1):
+        center = int(i * m / n)
+        lo, hi = max(1, center - width), min(m, center + width)
+        row, prev = acc[i], acc[i - 1]
+        for j in range(lo, hi + 1):
+            row[j] = cost[i - 1, j - 1] + min(prev[j], row[j - 1], prev[j - 1])
+    return acc[n, m] / (n + m)
+
+
+# === Spotter ===
+class WakeWordSpotter:
+    """Template matcher: a segment is the wake word if it is close enough to any template."""
+
+    def __init__(self, templates, sensitivity=None, distance=None):
+        if not templates:
+            raise ValueError("at least one wake word template is required")
+        self.templates = templates
+        self.sensitivity = WakeWordSensitivity if sensitivity is None else sensitivity
+        self.base_distance = distance or WakeWordDistance or self._spread()
+        self.segments = 0
+        self.accepts = 0
+        self.last_distance = None
+        self.busy_seconds = 0.0
+
+    @classmethod
+    def from_directory(cls, directory=None, **options):
+        directory = directory or WakeWordDir
+        paths = sorted(os.path.join(directory, f) for f in os.listdir(directory) if f.lower().endswith(".wav"))
+        return cls([Mfcc(*LoadWav(path)) for path in paths], **options)
+
+    def _spread(self):
+        """Typical distance between two utterances of the wake word, from the templates themselves."""
+        pairs = [
+            DtwDistance(a, b) for i, a in enumerate(self.templates) for b in self.templates[i + 1:]
+        ]
+        return float(np.mean(pairs)) * 1.25 if pairs else 2.0  # Single template: typical MFCC-DTW spread
+
+    @property
+    def threshold(self):
+        return self.base_distance * (0.6 + 0.8 * self.sensitivity)
+
+    def score(self, samples, rate):
+        """Smallest DTW distance between the segment and any template."""
+        started = time.thread_time()
+        features = Mfcc(samples, rate)
+        distance = min(float(DtwDistance(features, template)) for template in self.templates)
+        self.busy_seconds += time.thread_time() - started
+        return distance
+
+    def matches(self, samples, rate):
+        self.segments += 1
+        self.last_distance = float(self.score(samples, rate))
+        accepted = self.last_distance <= self.threshold
+        self.accepts += accepted
+        return accepted
+
+    def stats(self):
+        return {
+            "segments": self.segments,
+            "accepts": self.accepts,
+            "last_distance": None if self.last_distance is None else round(self.last_distance, 2),
+            "threshold": round(self.threshold, 2),
+            "cpu_s": round(self.busy_seconds, 3),
+        }
+
+
+def LoadStopSpotter():
+    """Return a spotter for the "stop listening" recordings, or None if none were enrolled."""
+    try:
+        return WakeWordSpotter.from_directory(StopPhraseDir)
+    except (OSError, ValueError):
+        return None
+
+
+def LoadWakeWordSpotter():
+    """Return a spotter built from Data/WakeWord templates, or None if disabled or there are none."""
+    if WakeWordEngine.lower() != "local":
+        return None
+    try:
+        return WakeWordSpotter.from_directory()
+    except (OSError, ValueError) as e:
+        print(f"[WakeWord] Local spotter unavailable ({e}); enroll with: python -m Backend.WakeWordSpotter --enroll")
+        return None
+
+
+# === Listening on the Shared Capture ===
+def WaitForWakeWord(spotter, capture, active=lambda: True, reader=None, stop_spotter=None):
+    """
+    Block until the wake word is heard (True) or active() turns false (False).
+    With stop_spotter, each segment is checked for "stop listening" first and
+    StopPhrase is returned when it matches.
+    """
+    from Backend.VoiceActivity import CaptureSegments
+
+    segment_bytes = int(MAX_SEGMENT_SECONDS * capture.SAMPLE_RATE) * capture.SAMPLE_WIDTH
+    for pcm in CaptureSegments(capture, max_seconds=MAX_SEGMENT_SECONDS, active=active, reader=reader):
+        if len(pcm) >= segment_bytes:
+            continue  # Cut off at the cap: a sentence, not a wake word
+        samples = PcmToFloat(pcm)
+        if stop_spotter and stop_spotter.matches(samples, capture.SAMPLE_RATE):
+            return StopPhrase
+        if spotter.matches(samples, capture.SAMPLE_RATE):
+            return True
+    return False
+
+
+# === Enrollment ===
+def SaveWav(path, pcm: bytes, rate, width=2):
+    """Write mono 16-bit PCM to a WAV file."""
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(width)
+        w.setframerate(rate)
+        w.writeframes(pcm)
+
+
+def RecordClips(directory, count, prefix, max_seconds=MAX_SEGMENT_SECONDS):
+    """
+    Record count speech segments from the shared microphone capture into
+    directory as WAV files, using the same voice-activity gating as the
+    listener. Returns the saved paths.
+    """
+    from Backend.AudioCapture import GetAudioCapture
+    from Backend.VoiceActivity import CaptureSegments
+
+    capture = GetAudioCapture().start()
+    os.makedirs(directory, exist_ok=True)
+    segment_bytes = int(max_seconds * capture.SAMPLE_RATE) * capture.SAMPLE_WIDTH
+    first = len([f for f in os.listdir(directory) if f.startswith(prefix)])
+    saved = []
+    for pcm in CaptureSegments(capture, max_seconds=max_seconds):
+        if len(pcm) >= segment_bytes:
+            print(f"  too long (over {max_seconds:.0f} s), not saved; try again")
+            continue
+        path = os.path.join(directory, f"{prefix}_{first + len(saved) + 1:02d}.wav")
+        SaveWav(path, pcm, capture.SAMPLE_RATE, capture.SAMPLE_WIDTH)
+        saved.append(path)
+        print(f"  saved {path} ({len(pcm) / capture.SAMPLE_WIDTH / capture.SAMPLE_RATE:.2f} s) [{len(saved)}/{count}]")
+        if len(saved) >= count:
+            break
+    return saved
+
+
+def Enroll(count=5, directory=None, phrase=None, prefix="wakeword"):
+    """Record wake word templates into Data/WakeWord and report the resulting threshold."""
+    directory = directory or WakeWordDir
+    print(f'Say "{phrase or WakeWordPhrase}" {count} times, pausing for a second after each.')
+    RecordClips(directory, count, prefix)
+    spotter = WakeWordSpotter.from_directory(directory)
+    print(f"[WakeWord] {len(spotter.templates)} templates in {directory}, threshold {spotter.threshold:.2f}")
+
+
+def RecordFixtures(directory=None, positives=20, negatives=40):
+    """Record positive/ and negative/ clips for the benchmark."""
+    directory = directory or WakeWordFixtureDir
+    print(f'Say "{WakeWordPhrase}" {positives} times, in different tones and distances from the microphone.')
+    RecordClips(os.path.join(directory, "positive"), positives, "positive")
+    print(f"Now say {negatives} short phrases that are NOT the wake word (similar-sounding words, names, commands).")
+    RecordClips(os.path.join(directory, "negative"), negatives, "negative")
+
+
+# === Benchmark ===
+def _load_clips(folder):
+    if not os.path.isdir(folder):
+        return []
+    return [LoadWav(os.path.join(folder, f)) for f in sorted(os.listdir(folder)) if f.lower().endswith(".wav")]
+
+
+def Benchmark(directory=None):
+    """
+    False-accept / false-reject rates across sensitivities on recorded clips.
+    The fixtures directory holds positive/ and negative/ WAV folders
+    (recorded with --record-fixtures) and optionally templates/; otherwise
+    the enrolled templates in Data/WakeWord are used.
+    """
+    directory = directory or WakeWordFixtureDir
+    positives = _load_clips(os.path.join(directory, "positive"))
+    negatives = _load_clips(os.path.join(directory, "negative"))
+    raw_templates = _load_clips(os.path.join(directory, "templates")) or _load_clips(WakeWordDir)
+    if not raw_templates or not positives or not negatives:
+        print(f"Need recorded templates, positive/ and negative/ clips under {directory}.")
+        print("Record them with: python -m Backend.WakeWordSpotter --enroll, then --record-fixtures")
+        sys.exit(1)
+
+    spotter = WakeWordSpotter([Mfcc(*item) for item in raw_templates])
+    started = time.thread_time()
+    pos_scores = [spotter.score(*item) for item in positives]
+    neg_scores = [spotter.score(*item) for item in negatives]
+    cpu = time.thread_time() - started
+    audio_seconds = sum(len(s) / r for s, r in positives + negatives)
+
+    print(f"{len(raw_templates)} templates, {len(positives)} positive / {len(negatives)} negative clips, "
+          f"base distance {spotter.base_distance:.2f}")
+    print(f"{'sensitivity':>11} | {'threshold':>9} | {'false reject':>12} | {'false accept':>12}")
+    for sensitivity in (0.0, 0.25, 0.5, 0.75, 1.0):
+        spotter.sensitivity = sensitivity
+        fr = sum(d > spotter.threshold for d in pos_scores) / len(pos_scores)
+        fa = sum(d <= spotter.threshold for d in neg_scores) / len(neg_scores)
+        print(f"{sensitivity:>11.2f} | {spotter.threshold:>9.2f} | {fr:>11.1%} | {fa:>11.1%}")
+    print(f"Matching cost: {cpu / audio_seconds:.1%} of one core per second of gated speech")
+
+
+def _argument(flag, default=None):
+    i = sys.argv.index(flag)
+    return sys.argv[i + 1] if len(sys.argv) > i + 1 else default
+
+
+if __name__ == "__main__":
+    if "--enroll" in sys.argv:
+        Enroll(int(_argument("--enroll", 5)))
+    elif "--enroll-stop" in sys.argv:
+        Enroll(int(_argument("--enroll-stop", 5)), StopPhraseDir, StopPhrase, "stop")
+    elif "--record-fixtures" in sys.argv:
+        RecordFixtures(_argument("--record-fixtures"))
+    elif "--bench" in sys.argv:
+        Benchmark(_argument("--bench"))
+    else:
+        print("Usage: python -m Backend.WakeWordSpotter --enroll [count] | --enroll-stop [count] | --record-fixtures [dir] | --bench [fixtures_dir]")
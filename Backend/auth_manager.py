@@ -8,11 +8,9 @@ import json
 import cv2
 import numpy as np
 import face_recognition
-import speech_recognition as sr
-import asyncio
-import pygame
-from edge_tts import Communicate
 from dotenv import dotenv_values
+from Backend.TextToSpeech import TextToSpeech, PlaySound, URGENT
+from Backend.Recognizers import CreateCommandRecognizer, listen
 
 # === Load environment variables ===
 env_vars = dotenv_values(".env")
@@ -34,31 +32,16 @@ ACTIVE_USER_FILE = "UserData/active_user.json"
 # Section: Text-to-Speech Handling
 # ============================================
 
-async def generate_tts(text: str, filepath="Data/speech.mp3", voice=JARVIS_VOICE_NAME):
-    """Generate TTS audio using edge-tts and save to file."""
-    try:
-        communicate = Communicate(text=text, voice=voice)
-        await communicate.save(filepath)
-    except Exception as e:
-        print(f"⚠️ TTS generation error: {e}")
-
 def play_audio(filepath):
-    """Play the given audio file using pygame."""
+    """Play the given audio file through the shared speech service."""
     try:
-        pygame.mixer.init()
-        pygame.mixer.music.load(filepath)
-        pygame.mixer.music.play()
-        while pygame.mixer.music.get_busy():
-            pygame.time.Clock().tick(10)
+        PlaySound(filepath)
     except Exception as e:
         print(f"⚠️ Playback error: {e}")
-    finally:
-        pygame.mixer.quit()
 
 def speak(text: str):
-    """Convert text to speech and play it along with a beep sound."""
-    asyncio.run(generate_tts(text))
-    play_audio("Data/speech.mp3")
+    """Convert text to speech (cached for the fixed prompts) and play it along with a beep sound."""
+    TextToSpeech(text, priority=URGENT, voice=JARVIS_VOICE_NAME, pitch="+0Hz", rate="+0%")
     play_audio("Data/beep.mp3")
 
 # ============================================
@@ -139,20 +122,20 @@ def signup_flow(username):
     cv2.destroyAllWindows()
 
     # === Step 2: Capture Voice Password ===
-    recognizer = sr.Recognizer()
+    recognizer = CreateCommandRecognizer()
     password = None
     for attempt in range(3):
         speak("Say your password after beep")
-        with sr.Microphone() as source:
-            recognizer.adjust_for_ambient_noise(source, duration=1)
-            try:
-                audio = recognizer.listen(source, timeout=5)
-                password = recognizer.recognize_google(audio).strip()
-                print(f"✅ Password captured: {password}")
-                break
-            except:
-                print("❌ Try again.")
-                speak("Please try again")
+        try:
+            password = listen(recognizer, timeout=5).strip()
+            if not password:
+                raise ValueError("empty password")
+            print(f"✅ Password captured: {password}")
+            break
+        except:
+            password = None
+            print("❌ Try again.")
+            speak("Please try again")
 
     if not password:
         print("❌ Failed to capture password.")
@@ -223,22 +206,19 @@ def login_flow(username):
     with open(pass_path, "r") as f:
         stored_password = f.read().strip()
 
-    recognizer = sr.Recognizer()
+    recognizer = CreateCommandRecognizer()
     for attempt in range(3):
         speak("Please say your password after beep")
-        with sr.Microphone() as source:
-            recognizer.adjust_for_ambient_noise(source, duration=1)
-            try:
-                audio = recognizer.listen(source, timeout=5)
-                spoken = recognizer.recognize_google(audio).strip()
-                print(f"🔐 You said: {spoken}")
-                if spoken.lower() == stored_password.lower():
-                    print("✅ Password matched.")
-                    set_active_user(username)
-                    return True
-            except:
-                print("❌ Try again.")
-                speak("Try again")
+        try:
+            spoken = listen(recognizer, timeout=5).strip()
+            print(f"🔐 You said: {spoken}")
+            if spoken.lower() == stored_password.lower():
+                print("✅ Password matched.")
+                set_active_user(username)
+                return True
+        except:
+            print("❌ Try again.")
+            speak("Try again")
 
     print("❌ Voice verification failed.")
     return False
@@ -9,10 +9,10 @@ import getpass
 import datetime
 import re
 import pyautogui
-import pyttsx3
-import speech_recognition as sr
 from time import sleep
 from pathlib import Path
+from Backend.TextToSpeech import TextToSpeech, URGENT
+from Backend.Recognizers import CreateCommandRecognizer, NoSpeechError, UnintelligibleError, BackendUnavailableError, listen as recognize
 
 
 
@@ -26,30 +26,27 @@ except ImportError:
 DEFAULT_FOLDER_LOCATION = os.path.join(os.path.expanduser("~"), "Desktop")
 
 def speak(text):
-    engine = pyttsx3.init()
-    engine.say(text)
-    engine.runAndWait()
+    """Ask a confirmation question through the shared speech service."""
+    TextToSpeech(text, priority=URGENT)
 
 def listen():
-    recognizer = sr.Recognizer()
-    with sr.Microphone() as source:
-        print("🎤 Listening for confirmation...")
-        try:
-            audio = recognizer.listen(source, timeout=5, phrase_time_limit=5)
-            response = recognizer.recognize_google(audio).lower()
-            print(f"👂 You said: {response}")
-            return response
-        except sr.WaitTimeoutError:
-            print("⌛ Timeout: No speech detected.")
-            speak("I didn't hear anything. Please try again.")
-            return "timeout"
-        except sr.UnknownValueError:
-            print("🤔 Could not understand audio.")
-            speak("I could not understand. Please say yes or no.")
-            return "unknown"
-        except sr.RequestError as e:
-            print(f"❌ API error: {e}")
-            return f"error: {e}"
+    recognizer = CreateCommandRecognizer()
+    print("🎤 Listening for confirmation...")
+    try:
+        response = recognize(recognizer, timeout=5, phrase_time_limit=5).lower()
+        print(f"👂 You said: {response}")
+        return response
+    except NoSpeechError:
+        print("⌛ Timeout: No speech detected.")
+        speak("I didn't hear anything. Please try again.")
+        return "timeout"
+    except UnintelligibleError:
+        print("🤔 Could not understand audio.")
+        speak("I could not understand. Please say yes or no.")
+        return "unknown"
+    except BackendUnavailableError as e:
+        print(f"❌ API error: {e}")
+        return f"error: {e}"
 
 
 # ---------------------------
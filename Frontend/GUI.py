@@ -5,21 +5,30 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtWidgets import QDialog, QLabel, QPushButton, QVBoxLayout, QHBoxLayout
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QIcon, QPainter, QMovie, QColor, QTextCharFormat, QFont, QPixmap, QTextBlockFormat
-from PyQt5.QtCore import Qt, QSize, QTimer,QPropertyAnimation
+from PyQt5.QtCore import Qt, QSize, QTimer,QPropertyAnimation, QObject, QFileSystemWatcher, pyqtSignal
 from dotenv import dotenv_values
 import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 import subprocess
-import pygame
 import json
+import time
+import threading
+from collections import deque
 from pathlib import Path
 from Backend.Settings import show_settings_menu
 from Backend.auth_manager import get_active_user
+from Backend.TextToSpeech import TextToSpeech, URGENT
+from Backend.SpeechService import GetSpeechService
+from Backend.SpeechToText import shutdown as ShutdownSpeechRecognition
+from Backend.EventBus import bus, MIC, STATUS, WAKE_TRIGGER, RESPONSE, PARTIAL
+from Backend.Cancellation import CancelTurn
 
 
 env_vars = dotenv_values(".env")
 Assistantname = env_vars.get("Assistantname")
+GuiRefreshMode = env_vars.get("GuiRefreshMode", "signal").lower()  # "signal" or legacy "poll"
+GuiProfile = env_vars.get("GuiProfile", "False") == "True"        # Log GUI CPU time and redraws per minute
 current_dir = os.getcwd()
 old_chat_message = ""
 TempDirPath = rf"{current_dir}\Frontend\Files"
@@ -57,30 +66,71 @@ def QueryModifier(Query):
     return new_query.capitalize()
 
 
+_MirroredValues = {}  # Path -> values this process wrote recently, so the file watcher can ignore them
+
+
+def _MirrorToFile(Filename):
+    """
+    Return a bus subscriber that mirrors a topic to Frontend/Files for out-of-process readers.
+    The file is replaced in one step, so readers never see it empty or half written.
+    """
+    path = rf'{TempDirPath}\{Filename}'
+    written = _MirroredValues.setdefault(path, deque(maxlen=8))
+
+    def write(value):
+        tmp_path = f"{path}.tmp{os.getpid()}.{threading.get_ident()}"  # Topics are published from several threads
+        try:
+            written.append(value)
+            with open(tmp_path, "w", encoding='utf-8') as file:
+                file.write(value)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"[GUI] Failed to mirror {Filename}: {e}")
+    return write
+
+
+def _IsOwnMirrorWrite(path, value):
+    """True if value is one of the last few values this process mirrored to path."""
+    return value in _MirroredValues.get(path, ())
+
+
+def _SeedFromFile(Filename, Topic):
+    try:
+        with open(rf'{TempDirPath}\{Filename}', "r", encoding='utf-8') as file:
+            value = file.read().strip()
+        if value:
+            bus.publish(Topic, value)
+    except FileNotFoundError:
+        pass
+
+
+# Wake trigger is the only state that should survive a restart
+_SeedFromFile('WakeTrigger.data', WAKE_TRIGGER)
+bus.subscribe(MIC, _MirrorToFile('Mic.data'))
+bus.subscribe(STATUS, _MirrorToFile('Status.data'))
+bus.subscribe(WAKE_TRIGGER, _MirrorToFile('WakeTrigger.data'))
+bus.subscribe(RESPONSE, _MirrorToFile('Responses.data'))
+
+
 def SetMicrophoneStatus(Command):
-    with open(rf'{TempDirPath}\Mic.data', "w", encoding='utf-8') as file:
-        file.write(Command)
+    bus.publish(MIC, Command)
 
 
 def GetMicrophoneStatus():
-    with open(rf'{TempDirPath}\Mic.data', "r", encoding='utf-8') as file:
-        Status = file.read()
-    return Status
+    return bus.get(MIC)
 
 
 def SetAssistantStatus(Status):
-    with open(rf'{TempDirPath}\Status.data', "w", encoding='utf-8') as file:
-        file.write(Status)
+    bus.publish(STATUS, Status)
 
 
 def GetAssistantStatus():
-    with open(rf'{TempDirPath}\Status.data', "r", encoding='utf-8') as file:
-        Status = file.read()
-    return Status
+    return bus.get(STATUS)
 
 
 def MicButtonInitialed():
     SetMicrophoneStatus("False")
+    CancelTurn("mic off")  # Stop whatever the current turn is doing: listening, thinking or speaking
 
 
 def MicButtonClosed():
@@ -88,44 +138,21 @@ def MicButtonClosed():
 
 
 def SetWakeTriggerStatus(status):
-    with open(rf'{TempDirPath}\WakeTrigger.data', "w", encoding='utf-8') as file:
-        file.write(status)
+    bus.publish(WAKE_TRIGGER, status)
 
 
 def GetWakeTriggerStatus():
-    try:
-        with open(rf'{TempDirPath}\WakeTrigger.data', "r", encoding='utf-8') as file:
-            return file.read().strip()
-    except FileNotFoundError:
-        return "True"  # Default to wake trigger ON
+    return bus.get(WAKE_TRIGGER).strip() or "True"  # Default to wake trigger ON
 
 # Existing imports and code above...
 
 def texttospeech(text):
     """
-    Generates speech using edge-tts, saves it to Data/speech.mp3, then plays it.
-    This avoids edge-tts playback errors by separating generation and playback.
+    Speak text in the wake word voice. Fixed phrases come straight from the
+    speech cache, so they play without an edge-tts round trip.
     """
     try:
-        import asyncio
-        from edge_tts import Communicate
-        import pygame
-        import os
-
-        async def generate_and_play():
-            filepath = "Data/speech.mp3"
-            communicate = Communicate(text=text, voice="en-CA-LiamNeural")
-            await communicate.save(filepath)
-
-            if os.path.exists(filepath):
-                pygame.mixer.init()
-                pygame.mixer.music.load(filepath)
-                pygame.mixer.music.play()
-                while pygame.mixer.music.get_busy():
-                    pygame.time.Clock().tick(10)
-                pygame.mixer.quit()
-
-        asyncio.run(generate_and_play())
+        TextToSpeech(text, priority=URGENT, voice="en-CA-LiamNeural", pitch="+0Hz", rate="+0%")
 
     except Exception as e:
         print(f"⚠️ TTS Error: {e}")
@@ -152,8 +179,145 @@ def TempDirectoryPath(Filename):
 
 
 def ShowTextToScreen(Text):
-    with open(rf'{TempDirPath}\Responses.data', "w", encoding='utf-8') as file:
-        file.write(Text)
+    bus.publish(RESPONSE, Text)
+
+
+def ShowPartialTextToScreen(Text):
+    """Show an answer that is still streaming in; pass "" to remove it."""
+    bus.publish(PARTIAL, Text)
+
+
+# === GUI Refresh Bridge ===
+class RefreshProfiler:
+    """Counts redraws and GUI-thread CPU time, reported once a minute when GuiProfile=True."""
+
+    def __init__(self, interval_ms=60000):
+        self.redraws = 0
+        self.interval_ms = interval_ms
+        self._cpu_start = time.thread_time()
+        self._wall_start = time.monotonic()
+        self.timer = None
+
+    def start(self):
+        self.timer = QTimer()
+        self.timer.timeout.connect(self.report)
+        self.timer.start(self.interval_ms)
+
+    def count(self):
+        self.redraws += 1
+
+    def report(self):
+        cpu = time.thread_time() - self._cpu_start
+        minutes = max((time.monotonic() - self._wall_start) / 60, 1e-9)
+        print(f"[GUI Profile] mode={GuiRefreshMode} cpu={cpu / minutes:.3f}s/min redraws={self.redraws / minutes:.1f}/min")
+        self.redraws = 0
+        self._cpu_start = time.thread_time()
+        self._wall_start = time.monotonic()
+
+
+class GuiBridge(QObject):
+    """
+    Forwards bus updates to the GUI thread as Qt signals.
+    Updates arriving within one frame are coalesced into a single repaint.
+    """
+    statusChanged = pyqtSignal(str)
+    responseAdded = pyqtSignal(str)
+    partialChanged = pyqtSignal(str)
+    _dirty = pyqtSignal()
+
+    FRAME_MS = 16
+
+    def __init__(self, profiler=None):
+        super().__init__()
+        self.profiler = profiler
+        self._lock = threading.Lock()
+        self._pending_status = None
+        self._pending_chat = []  # Ordered (kind, text); consecutive partials collapse to the latest
+
+        self._frame = QTimer(self)
+        self._frame.setSingleShot(True)
+        self._frame.timeout.connect(self._flush)
+        self._dirty.connect(self._schedule)
+
+        bus.subscribe(STATUS, self._on_status)
+        bus.subscribe(RESPONSE, self._on_response)
+        bus.subscribe(PARTIAL, self._on_partial)
+
+        # Fallback for writers in other processes that still touch Frontend/Files
+        self._watched = {TempDirectoryPath('Status.data'): STATUS, TempDirectoryPath('Responses.data'): RESPONSE}
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.addPaths([path for path in self._watched if os.path.exists(path)])
+        self.watcher.fileChanged.connect(self._on_file_changed)
+
+    # Called on the publishing thread
+    def _on_status(self, value):
+        with self._lock:
+            self._pending_status = value
+        self._dirty.emit()
+
+    def _on_response(self, value):
+        with self._lock:
+            self._pending_chat.append(("response", value))
+        self._dirty.emit()
+
+    def _on_partial(self, value):
+        with self._lock:
+            if self._pending_chat and self._pending_chat[-1][0] == "partial":
+                self._pending_chat[-1] = ("partial", value)
+            else:
+                self._pending_chat.append(("partial", value))
+        self._dirty.emit()
+
+    # Called on the GUI thread
+    def _schedule(self):
+        if not self._frame.isActive():
+            self._frame.start(self.FRAME_MS)
+
+    def _flush(self):
+        with self._lock:
+            status, self._pending_status = self._pending_status, None
+            chat, self._pending_chat = self._pending_chat, []
+        if status is not None:
+            self.statusChanged.emit(status)
+        for kind, text in chat:
+            if kind == "partial":
+                self.partialChanged.emit(text)
+            else:
+                self.responseAdded.emit(text)
+
+    def _on_file_changed(self, path):
+        # Editors and atomic writers replace the file, which drops it from the watch list
+        if path not in self.watcher.files() and os.path.exists(path):
+            self.watcher.addPath(path)
+        try:
+            with open(path, "r", encoding='utf-8') as file:
+                value = file.read()
+        except OSError:
+            return
+        topic = self._watched[path]
+        if value == bus.get(topic) or _IsOwnMirrorWrite(path, value):
+            return  # Our own mirror write (possibly an older one), not another process
+        bus.publish(topic, value)
+
+
+_bridge = None
+_profiler = None
+
+
+def GetGuiBridge():
+    """Return the shared bridge, creating it on first use (requires a QApplication)."""
+    global _bridge, _profiler
+    if _bridge is None:
+        if GuiProfile:
+            _profiler = RefreshProfiler()
+            _profiler.start()
+        _bridge = GuiBridge(_profiler)
+    return _bridge
+
+
+def CountRedraw():
+    if _profiler is not None:
+        _profiler.count()
 
 
 class ChatSection(QWidget):
@@ -195,10 +359,19 @@ class ChatSection(QWidget):
         font = QFont()
         font.setPointSize(13)
         self.chat_text_edit.setFont(font)
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.loadMessages)
-        self.timer.timeout.connect(self.SpeechRecogText)
-        self.timer.start(5)
+        if GuiRefreshMode == "poll":
+            self.timer = QTimer(self)
+            self.timer.timeout.connect(self.loadMessages)
+            self.timer.timeout.connect(self.SpeechRecogText)
+            self.timer.start(5)
+        else:
+            bridge = GetGuiBridge()
+            self.partial_start = None
+            bridge.responseAdded.connect(self.onResponse)
+            bridge.partialChanged.connect(self.onPartial)
+            bridge.statusChanged.connect(self.onStatus)
+            self.onStatus(GetAssistantStatus())
+            self.onResponse(bus.get(RESPONSE))
         self.chat_text_edit.viewport().installEventFilter(self)
         self.setStyleSheet("""
               QScrollBar:vertical {
@@ -262,6 +435,33 @@ class ChatSection(QWidget):
         with open(TempDirectoryPath('Status.data'), "r", encoding='utf-8') as file:
             messages = file.read()
             self.label.setText(messages)
+            CountRedraw()
+
+    def onResponse(self, message):
+        global old_chat_message
+        self.onPartial("")
+        if len(message) <= 1 or message == old_chat_message:
+            return
+        self.addMessage(message=message, color='White')
+        old_chat_message = message
+
+    def onPartial(self, message):
+        """Replace the in-progress answer block at the end of the chat with the latest text."""
+        cursor = self.chat_text_edit.textCursor()
+        if self.partial_start is not None:
+            cursor.setPosition(self.partial_start)
+            cursor.movePosition(cursor.End, cursor.KeepAnchor)
+            cursor.removeSelectedText()
+            self.chat_text_edit.setTextCursor(cursor)
+            self.partial_start = None
+        if message:
+            cursor.movePosition(cursor.End)
+            self.partial_start = cursor.position()
+            self.addMessage(message=message, color='White')
+
+    def onStatus(self, status):
+        self.label.setText(status)
+        CountRedraw()
 
     def load_icon(self, path, width=60, height=60):
         pixmap = QPixmap(path)
@@ -289,6 +489,7 @@ class ChatSection(QWidget):
         cursor.setBlockFormat(formatm)
         cursor.insertText(message + "\n")
         self.chat_text_edit.setTextCursor(cursor)
+        CountRedraw()
 
 class InitialScreen(QWidget):
     def __init__(self, parent=None):
@@ -358,15 +559,14 @@ class InitialScreen(QWidget):
         self.setFixedWidth(screen_width)
         self.setStyleSheet("background-color: black;")
 
-        # === TIMER ===
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.SpeechRecogText)
-        self.timer.start(5)
-
-        # === SETTINGS BUTTON ===
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.SpeechRecogText)
-        self.timer.start(5)
+        # === STATUS UPDATES ===
+        if GuiRefreshMode == "poll":
+            self.timer = QTimer(self)
+            self.timer.timeout.connect(self.SpeechRecogText)
+            self.timer.start(5)
+        else:
+            GetGuiBridge().statusChanged.connect(self.onStatus)
+            self.onStatus(GetAssistantStatus())
 
         # === SETTINGS BUTTON ===
         self.settings_button = QPushButton(self)
@@ -427,6 +627,11 @@ class InitialScreen(QWidget):
         with open(TempDirectoryPath('Status.data'), "r", encoding='utf-8') as file:
             messages = file.read()
             self.label.setText(messages)
+            CountRedraw()
+
+    def onStatus(self, status):
+        self.label.setText(status)
+        CountRedraw()
 
     def toggle_icon(self, event=None):
         if self.toggled:
@@ -450,9 +655,7 @@ class InitialScreen(QWidget):
         self.movie.start()
 
         try:
-            pygame.mixer.init()
-            pygame.mixer.music.load("Data/snap.mp3")
-            pygame.mixer.music.play()
+            GetSpeechService().play_file("Data/snap.mp3")
         except Exception as e:
             print(f"[Startup Sound] Failed to play snap.mp3: {e}")
 
@@ -744,8 +947,8 @@ class MainWindow(QMainWindow):
         dialog = ExitDialog(self)
         if dialog.exec_() == QDialog.Accepted:
             try:
-                if pygame.mixer.get_init():
-                    pygame.mixer.quit()
+                GetSpeechService().shutdown()
+                ShutdownSpeechRecognition()
                 QApplication.quit()
                 event.accept()
             except Exception as e:
@@ -759,6 +962,10 @@ class MainWindow(QMainWindow):
 
 def GraphicalUserInterface():
     app = QApplication(sys.argv)
+    if GuiRefreshMode == "poll" and GuiProfile:
+        global _profiler
+        _profiler = RefreshProfiler()
+        _profiler.start()
     window = MainWindow()
     window.show()
     app.exec_()
@@ -8,19 +8,34 @@ from Frontend.GUI import (
     QueryModifier,
     GetMicrophoneStatus,
     GetAssistantStatus,
-    GetWakeTriggerEnabled
+    GetWakeTriggerEnabled,
+    ShowPartialTextToScreen
 )
 from Backend.Model import FirstLayerDMM
-from Backend.RealtimeSearchEngine import RealtimeSearchEngine
+from Backend.RealtimeSearchEngine import RealtimeSearchEngineStream, GoogleSearch
 from Backend.Automation import Automation
-from Backend.SpeechToText import SpeechRecognition
-from Backend.Chatbot import ChatBot
-from Backend.TextToSpeech import TextToSpeech
+from Backend.SpeechToText import SpeechRecognition, QueryModifier as SpeechQueryModifier, warmup as WarmupSpeechRecognition, shutdown as ShutdownSpeechRecognition
+from Backend.Chatbot import ChatBot, ChatBotStream
+from Backend.TextToSpeech import TextToSpeech, OpenSpeechStream
+from Backend.SpeechService import PrewarmSpeechCache
 from Backend.WakeWordListener import listen_for_wake_word
 from Backend.laptop import perform_laptop_command
+from Backend.EventBus import bus, MIC
+from Backend.ChatLogStore import open_chat_log
+from Backend.AnswerStream import SpeakAnswerStream
+from Backend.SpeculativeIntent import SpeculativeClassifier
+from Backend.IntentMatcher import IntentRouter
+from Backend.DecisionCache import CachedClassifier
+from Backend.SearchPrefetch import SearchPrefetcher
+from Backend.Cancellation import BeginTurn
+from Backend.BargeIn import BargeInMonitor
+from Backend.Scheduler import (
+    GetScheduler, VOICE, AUTOMATION, IMAGE, DONE, FAILED, EXPIRED, CANCELLED,
+    AutomationDeadlineSeconds, ImageDeadlineSeconds
+)
 from dotenv import dotenv_values
 from asyncio import run
-from time import sleep
+from time import monotonic
 import threading
 import json
 import os
@@ -34,8 +49,15 @@ Assistantname = env_vars.get("Assistantname", "Jarvis")
 
 # Global state
 mic_triggered_by_wakeword = False
-execution_lock = threading.Lock()
+scheduler = GetScheduler()  # Voice turns, automation and image jobs, each with its own priority and limit
+decision_cache = CachedClassifier(FirstLayerDMM, user=lambda: GetActiveUsername())  # Repeated queries skip the DMM
+classifier = IntentRouter(decision_cache)  # Obvious commands are routed locally, the rest by the (cached) DMM
+speculator = SpeculativeClassifier(classifier, prepare=SpeechQueryModifier, commit=decision_cache.commit)  # Classify stable interim transcripts
+prefetcher = SearchPrefetcher(GoogleSearch)  # Web search for likely-realtime queries, overlapped with classification
 Functions = ["open", "close", "play", "system", "content", "google search", "youtube search"]
+LongRunningTasks = ("content", "generate")  # Not waited for before the spoken summary
+SystemPhrases = {"mute": "muted", "unmute": "unmuted", "volume up": "turned the volume up", "volume down": "turned the volume down"}
+DispatchJoinSeconds = float(env_vars.get("DispatchJoinSeconds", 5))  # Longest wait for quick automation before summarizing
 DefaultMessage = f"""{Username} : Hello {Assistantname}, How are you?
 {Assistantname} : Welcome {Username}. I am doing well. How may I help you?"""
 
@@ -43,36 +65,32 @@ DefaultMessage = f"""{Username} : Hello {Assistantname}, How are you?
 # Utility Functions
 # -------------------------------------------
 
+def GetActiveUsername():
+    """Return the logged-in username, or "" when nobody is logged in."""
+    try:
+        with open("UserData/active_user.json", "r", encoding="utf-8") as f:
+            return json.load(f).get("username", "").strip()
+    except Exception:
+        return ""
+
 def GetCurrentChatLogPath():
-    path = "UserData/active_user.json"
-    if os.path.exists(path):
-        try:
-            with open(path, "r") as f:
-                data = json.load(f)
-                username = data.get("username", "").strip()
-                if username:
-                    return f"Data/ChatLog_{username}.json"
-        except Exception:
-            pass
+    """Return the legacy JSON path for the active user; open_chat_log maps it to JSONL."""
+    username = GetActiveUsername()
+    if username:
+        return f"Data/ChatLog_{username}.json"
     return "Data/ChatLog.json"
 
 def sanitize_for_tts(text):
     return re.sub(r"[^a-zA-Z0-9\s.,!?]", "", text)
 
 def ShowDefaultChatIfNoChats():
-    file_path = GetCurrentChatLogPath()
-    if not os.path.exists(file_path) or os.path.getsize(file_path) < 5:
+    if len(open_chat_log(GetCurrentChatLogPath())) == 0:
         with open(TempDirectoryPath('Database.data'), "w", encoding='utf-8') as file:
             file.write("")
-        with open(TempDirectoryPath('Responses.data'), "w", encoding='utf-8') as file:
-            file.write(DefaultMessage)
+        ShowTextToScreen(DefaultMessage)
 
 def ReadChatLogJson():
-    path = GetCurrentChatLogPath()
-    if not os.path.exists(path):
-        return []
-    with open(path, 'r', encoding='utf-8') as file:
-        return json.load(file)
+    return open_chat_log(GetCurrentChatLogPath()).read_all()
 
 def ChatLogIntegration():
     json_data = ReadChatLogJson()
@@ -89,8 +107,39 @@ def ShowChatsOnGUI():
     with open(TempDirectoryPath('Database.data'), "r", encoding='utf-8') as f:
         data = f.read()
     if data.strip():
-        with open(TempDirectoryPath('Responses.data'), "w", encoding='utf-8') as f:
-            f.write(data)
+        ShowTextToScreen(data)
+
+def SpeakToUser(text, token):
+    """Speak a short reply; the user can talk over it."""
+    with BargeInMonitor(token):
+        TextToSpeech(sanitize_for_tts(text), interrupt_check=token.is_active)
+
+def StreamAnswerToUser(deltas, token):
+    """Show the answer as it streams in and speak it sentence by sentence until the user barges in."""
+    def on_partial(text):
+        if GetAssistantStatus() != "Answering...":
+            SetAssistantStatus("Answering...")  # First tokens have arrived
+        ShowPartialTextToScreen(f"{Assistantname} : {text}")
+
+    # One utterance for the whole answer so sentence N+1 is synthesized while N plays
+    speech = OpenSpeechStream(interrupt_check=token.is_active)
+    unregister = token.on_cancel(speech.cancel)  # Silence output the moment the turn is cancelled
+    with BargeInMonitor(token):
+        try:
+            Answer = SpeakAnswerStream(
+                deltas,
+                on_partial=on_partial,
+                speak=lambda sentence: speech.feed(sanitize_for_tts(sentence)),
+            )
+        finally:
+            speech.close()
+        speech.wait()
+    unregister()
+    ShowPartialTextToScreen("")
+    if Answer.strip():
+        suffix = " ..." if token.cancelled else ""  # Cut short by barge-in
+        ShowTextToScreen(f"{Assistantname} : {AnswerModifier(Answer)}{suffix}")
+    return Answer
             
 def InitialExecution():
     SetMicrophoneStatus("False")
@@ -103,17 +152,37 @@ def InitialExecution():
 # AI Logic
 # -------------------------------------------
 
-def MainExecution():
+def OnInterimTranscript(text):
+    SetAssistantStatus(f"Listening... {text}")
+    speculator.observe(text)
+
+def AutomationJob(command):
+    def job(token):
+        return run(Automation([command]))
+    return job
+
+def ImageJob(prompt):
+    def job(token):
+        from Backend.ImageGeneration import generate_and_open_images  # Needs HuggingFaceAPIKey; loaded on first use
+        if not generate_and_open_images(prompt):
+            raise RuntimeError(f"no image could be generated for '{prompt}'")  # Marks the task FAILED
+    return job
+
+def MainExecution(token=None):
     global mic_triggered_by_wakeword
 
-    Query = SpeechRecognition()
+    turn = BeginTurn(token)  # Cancelled by barge-in; every stage below stops early once it trips
+    speculator.reset()
+    Query = SpeechRecognition(on_partial=OnInterimTranscript, token=turn)
+    if not Query:
+        return
     ShowTextToScreen(f"{Username} : {Query}")
 
     if mic_triggered_by_wakeword and "stop listening" in Query.lower():
         mic_triggered_by_wakeword = False
         SetMicrophoneStatus("False")
         SetAssistantStatus("Available...")
-        TextToSpeech("Wake word listening stopped. You can manually turn on the microphone anytime.")
+        SpeakToUser("Wake word listening stopped. You can manually turn on the microphone anytime.", turn)
         return
 
     # Check for laptop command
@@ -124,73 +193,121 @@ def MainExecution():
         result = perform_laptop_command(Query)
         ShowTextToScreen(f"{Assistantname} : {result}")
         SetAssistantStatus("Answering...")
-        TextToSpeech(sanitize_for_tts(result))
+        SpeakToUser(result, turn)
         return
 
     SetAssistantStatus("Thinking...")
-    Decision = FirstLayerDMM(Query)
-    print(f"\nDecision : {Decision}\n")
-
-    G = any(i.startswith("general") for i in Decision)
-    R = any(i.startswith("realtime") for i in Decision)
-    Merged_query = " and ".join([" ".join(i.split()[1:]) for i in Decision if i.startswith("general") or i.startswith("realtime")])
-
-    for q in Decision:
-        if "generate " in q:
-            # Check for active user
-            try:
-                with open("UserData/active_user.json", "r", encoding="utf-8") as f:
-                    user = json.load(f).get("username", "").strip()
-            except Exception:
-                user = ""
-
-            if not user:
-                msg = "Please login to use image generation."
-                ShowTextToScreen(f"{Assistantname} : {msg}")
-                SetAssistantStatus("Answering...")
-                TextToSpeech(sanitize_for_tts(msg))
-                return
-
-            with open("Frontend/Files/ImageGeneration.data", "w") as file:
-                file.write(f"{q},True")
-            msg = "Generating images. Please wait..."
-            ShowTextToScreen(f"{Assistantname} : {msg}")
-            SetAssistantStatus("Answering...")
-            TextToSpeech(sanitize_for_tts(msg))
+    with BargeInMonitor(turn):  # From here on the user can talk over classification, the answer and speech
+        prefetcher.start(Query)
+        started = []  # (task, job) dispatched while the decision was still streaming in
+
+        def on_task(task):
+            job = SubmitTask(task)
+            if job:
+                started.append((task, job))
+
+        Decision, speculated = speculator.resolve(Query, token=turn, on_task=on_task)
+        if turn.cancelled:
+            prefetcher.cancel()
             return
+        print(f"\nDecision : {Decision}{' (speculative)' if speculated else ''}  {speculator.stats()}  {classifier.stats()}  {decision_cache.stats()}\n")
 
+        DispatchDecision(Decision, turn, started)
 
+    if any(q.startswith("exit") for q in Decision) and not any(q.startswith(("general", "realtime")) for q in Decision):
+        Answer = ChatBot(QueryModifier("Okay, Bye!"), chatlog_path=GetCurrentChatLogPath())
+        ShowTextToScreen(f"{Assistantname} : {Answer}")
+        SetAssistantStatus("Answering...")
+        TextToSpeech(sanitize_for_tts(Answer))
+        ShutdownSpeechRecognition()
+        os._exit(0)
+
+def SubmitTask(task):
+    """Start an automation or image task as a scheduler job; None if it isn't one (or needs a login)."""
+    if any(task.startswith(func) for func in Functions):
+        return scheduler.submit(AUTOMATION, AutomationJob(task), name=task, deadline=AutomationDeadlineSeconds)
+    if task.startswith("generate image") and GetActiveUsername():
+        return scheduler.submit(IMAGE, ImageJob(task), name=task, deadline=ImageDeadlineSeconds)
+    return None
+
+def DispatchDecision(Decision, turn, started=()):
+    """
+    Run every part of a decision at once: automation and images as scheduler
+    jobs, general/realtime as one streamed answer (searched only when a realtime
+    part is present, otherwise straight from the chatbot). Quick jobs are then joined
+    and reported in one spoken summary, so a compound request takes as long
+    as its slowest part. started holds (task, job) pairs already submitted
+    while the decision streamed in; those are not submitted again.
+    """
+    answers = [q for q in Decision if q.startswith(("general", "realtime"))]
+
+    started = list(started)
+    jobs, notes = [], []
     for q in Decision:
-        if any(q.startswith(func) for func in Functions):
-            run(Automation(Decision))
-            return
-
-    Answer = ""
-
-    if G or R:
+        job = next((job for task, job in started if task == q), None)
+        if job:
+            started.remove((q, job))
+        else:
+            job = SubmitTask(q)
+        if job:
+            jobs.append((q, job))
+        elif q.startswith("generate image") and not notes:
+            notes.append("please login to use image generation")
+    if jobs:
+        print(f"[Scheduler] {scheduler.stats()}")
+
+    Merged_query = QueryModifier(" and ".join(" ".join(q.split()[1:]) for q in answers)) if answers else ""
+    if any(q.startswith("realtime") for q in answers):
         SetAssistantStatus("Searching...")
-        Answer = RealtimeSearchEngine(QueryModifier(Merged_query))
+        search_results = prefetcher.consume(Merged_query, token=turn)
+        print(f"[SearchPrefetch] {'used' if search_results else 'not used'} {prefetcher.stats()}")
+        StreamAnswerToUser(RealtimeSearchEngineStream(Merged_query, chatlog_path=GetCurrentChatLogPath(), token=turn, search_results=search_results), turn)
+    elif answers:
+        prefetcher.cancel()  # General questions are answered without a web search
+        StreamAnswerToUser(ChatBotStream(Merged_query, chatlog_path=GetCurrentChatLogPath(), token=turn), turn)
     else:
-        for q in Decision:
-            if "general" in q:
-                QueryFinal = q.replace("general", "")
-                Answer = ChatBot(QueryModifier(QueryFinal), chatlog_path=GetCurrentChatLogPath())
-                break
-            elif "realtime" in q:
-                QueryFinal = q.replace("realtime ", "")
-                Answer = RealtimeSearchEngine(QueryModifier(QueryFinal))
-                break
-            elif "exit" in q or "bye" in q:
-                Answer = ChatBot(QueryModifier("Okay, Bye!"), chatlog_path=GetCurrentChatLogPath())
-                ShowTextToScreen(f"{Assistantname} : {Answer}")
-                SetAssistantStatus("Answering...")
-                TextToSpeech(sanitize_for_tts(Answer))
-                os._exit(0)
-
-    if Answer:
-        ShowTextToScreen(f"{Assistantname} : {Answer}")
+        prefetcher.cancel()
+
+    # Wait for the quick jobs; content writing and images report progress instead of holding the turn
+    deadline = monotonic() + DispatchJoinSeconds
+    for q, job in jobs:
+        if q.startswith(LongRunningTasks):
+            continue
+        while not job.wait(0.1) and not turn.cancelled and monotonic() < deadline:
+            pass
+
+    phrases = [DescribeTask(q, job.state) for q, job in jobs] + notes
+    if phrases and not turn.cancelled:
+        summary = JoinPhrases(phrases)
+        ShowTextToScreen(f"{Assistantname} : {summary}")
         SetAssistantStatus("Answering...")
-        TextToSpeech(sanitize_for_tts(Answer))
+        SpeakToUser(summary, turn)
+
+def DescribeTask(task, state):
+    """Short phrase about one dispatched task for the spoken summary."""
+    func = next((f for f in sorted(Functions + ["generate image"], key=len, reverse=True) if task.startswith(f)), None)
+    if state in (FAILED, EXPIRED, CANCELLED):
+        return f"I couldn't {task}"
+    subject = task[len(func or ""):].strip()
+    if func == "generate image":
+        return f"generated images of {subject}" if state == DONE else f"generating images of {subject}"
+    if func is None:
+        return f"done: {task}" if state == DONE else f"still working on {task}"
+    if state != DONE:
+        return f"writing {subject}" if func == "content" else f"still working on {task}"
+    return {
+        "open": f"opened {subject}",
+        "close": f"closed {subject}",
+        "play": f"playing {subject}",
+        "system": SystemPhrases.get(subject, f"done: {subject}"),
+        "content": f"wrote {subject}",
+        "google search": f"searched Google for {subject}",
+        "youtube search": f"searched YouTube for {subject}",
+    }[func]
+
+def JoinPhrases(phrases):
+    text = phrases[0] if len(phrases) == 1 else ", ".join(phrases[:-1]) + " and " + phrases[-1]
+    return text[0].upper() + text[1:] + "."
 
 # -------------------------------------------
 # Wake Word Callback
@@ -208,20 +325,19 @@ def on_wake_word_detected():
 def MicListenerThread():
     global mic_triggered_by_wakeword
     while True:
-        if GetMicrophoneStatus().lower() == "true":
-            if execution_lock.locked():
-                sleep(0.1)
-                continue
-            SetAssistantStatus("Listening...")
-            with execution_lock:
-                MainExecution()
-                if mic_triggered_by_wakeword:
-                    SetMicrophoneStatus("False")
-                    mic_triggered_by_wakeword = False
-        else:
-            if "Available..." not in GetAssistantStatus():
-                SetAssistantStatus("Available...")
-            sleep(0.1)
+        # Block until the mic is switched on instead of polling its state
+        if GetMicrophoneStatus().lower() != "true":
+            SetAssistantStatus("Available...")
+            bus.wait_for_value(MIC, "True")
+
+        SetAssistantStatus("Listening...")
+        turn = scheduler.submit(VOICE, MainExecution, name="voice turn")
+        turn.wait()
+        if turn.token.reason == "barge-in":
+            continue  # The user is already talking; keep the mic open for them
+        if mic_triggered_by_wakeword:
+            SetMicrophoneStatus("False")
+            mic_triggered_by_wakeword = False
 
 def GUIThread():
     GraphicalUserInterface()
@@ -235,8 +351,9 @@ def WakeWordThread():
 
 if __name__ == "__main__":
     InitialExecution()
+    PrewarmSpeechCache()
+    WarmupSpeechRecognition()  # Chrome starts in the background while the GUI paints
 
-    threading.Thread(target=lambda: os.system("python Backend/ImageGeneration.py"), daemon=True).start()
     threading.Thread(target=MicListenerThread, daemon=True).start()
     threading.Thread(target=WakeWordThread, daemon=True).start()
 